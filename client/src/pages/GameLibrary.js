@@ -31,20 +31,27 @@ export default function GameLibrary({ user, isStorePage = false }) {
   };
 
   // Wunschliste-Funktionen
-  const fetchWishlist = async () => {
+  const fetchWishlist = async (gameIds) => {
+    if (gameIds.length === 0) {
+      setWishlistGames(new Set());
+      return;
+    }
     try {
-      const response = await fetch('/api/wishlist/', {
+      // Nur der Status der angezeigten Spiele, in einer Anfrage
+      const response = await fetch('/api/wishlist/check', {
+        method: 'POST',
         headers: {
+          'Content-Type': 'application/json',
           'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
+        },
+        body: JSON.stringify({ game_ids: gameIds })
       });
 
       console.log('🔧 fetchWishlist - Response:', response.status);
 
       if (response.ok) {
-        const wishlistGamesData = await response.json();
-        console.log('🔧 fetchWishlist - Raw response:', wishlistGamesData);
-        const wishlistIds = new Set(wishlistGamesData.map(game => game.id));
+        const membership = await response.json();
+        const wishlistIds = new Set(membership.game_ids.filter((id, index) => membership.in_wishlist[index]));
         console.log('🔧 fetchWishlist - Geladene IDs:', Array.from(wishlistIds));
         setWishlistGames(wishlistIds);
       }
@@ -125,7 +132,7 @@ export default function GameLibrary({ user, isStorePage = false }) {
       
       // Lade auch die Wunschliste-Status
       if (user) {
-        fetchWishlist();
+        fetchWishlist(gamesData.map(game => game.id));
       }
     } catch (error) {
       console.error('Fehler beim Laden der Spiele:', error);
@@ -42,28 +42,17 @@ export default function Library({ user }) {
         return;
       }
 
-      // Lade Wunschliste
-      const response = await fetch('/api/wishlist/', {
+      // Lade Wunschliste und Statistiken in einer Anfrage
+      const response = await fetch('/api/wishlist/overview', {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
 
       if (response.ok) {
-        const games = await response.json();
-        setWishlistGames(games);
-        
-        // Lade Statistiken
-        const statsResponse = await fetch('/api/wishlist/stats', {
-          headers: {
-            'Authorization': `Bearer ${token}`
-          }
-        });
-        
-        if (statsResponse.ok) {
-          const statsData = await statsResponse.json();
-          setStats(statsData);
-        }
+        const overview = await response.json();
+        setWishlistGames(overview.games);
+        setStats(overview.stats);
       } else if (response.status === 401) {
         showModal('Sitzung abgelaufen', 'Bitte loggen Sie sich erneut ein.', 'warning');
       } else {
@@ -81,6 +81,7 @@ class AdminManager:
             SET is_admin = 1, is_developer = 1
             WHERE id = ?
         """, (user['id'],))
+        self.bump_token_version(user['id'])
         self.conn.commit()
         
         # Log-Eintrag
@@ -112,6 +113,7 @@ class AdminManager:
             SET is_admin = 0
             WHERE id = ?
         """, (user['id'],))
+        self.bump_token_version(user['id'])
         self.conn.commit()
         
         # Log-Eintrag
@@ -120,6 +122,16 @@ class AdminManager:
         print(f"✅ Administrator-Rechte erfolgreich von '{user['username']}' entzogen!")
         return True
     
+    def bump_token_version(self, user_id):
+        """Token-Version erhöhen, damit ausgestellte Tokens ihre Rollen-Claims verlieren"""
+        self.conn.execute("""
+            INSERT INTO user_token_versions (user_id, version, updated_at)
+            VALUES (?, 1, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                version = version + 1,
+                updated_at = excluded.updated_at
+        """, (user_id, datetime.utcnow().isoformat(sep=" ")))
+    
     def create_admin_user(self):
         """Neuen Administrator-Benutzer erstellen"""
         print("\n👑 Neuen Administrator erstellen:")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Async-Varianten der heißen Lesepfade aus game_crud und crud
+Mit DB_ASYNC=true laufen die Abfragen über eine AsyncSession, sodass ein Worker
+viele Datenbank-Wartezeiten gleichzeitig bedienen kann. Ohne DB_ASYNC werden die
+synchronen Funktionen im Threadpool ausgeführt - die Endpunkte bleiben dieselben.
+
+Alle Funktionen erwarten die Session aus database.get_read_db.
+"""
+
+from typing import List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import game_crud
+import models
+from database import ASYNC_DB_ENABLED
+from pagination import Keyset, keyset_before, order_desc, total_counts
+import facets
+import projections
+import search_index
+import library_stats
+
+# ===== USER =====
+
+async def get_user_by_username(db, username: str) -> Optional[models.User]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(crud.get_user_by_username, db, username)
+    result = await db.execute(select(models.User).where(models.User.username == username).limit(1))
+    return result.scalars().first()
+
+async def get_user_by_email(db, email: str) -> Optional[models.User]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(crud.get_user_by_email, db, email)
+    result = await db.execute(select(models.User).where(models.User.email == email).limit(1))
+    return result.scalars().first()
+
+# ===== GAMES =====
+
+def _games_with_developer():
+    # Entwickler immer mitladen: in Async-Sessions gibt es kein Lazy Loading
+    return select(models.Game).options(joinedload(models.Game.developer))
+
+async def _fetch_games(db, query, columns: Optional[list]) -> list:
+    result = await db.execute(query)
+    return list(result.all() if columns is not None else result.scalars().all())
+
+def _games_query(columns: Optional[list] = None):
+    if columns is None:
+        return _games_with_developer()
+    return projections.from_games(select(*columns), columns)
+
+async def get_game_by_id(db, game_id: int) -> Optional[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_game_by_id, db, game_id)
+    result = await db.execute(_games_with_developer().where(models.Game.id == game_id))
+    return result.scalars().first()
+
+def _release_page(query, skip: int, limit: int, after: Optional[Keyset]):
+    query = query.order_by(*order_desc(models.Game.release_date, models.Game.id))
+    if after is not None:
+        query = query.where(keyset_before(models.Game.release_date, models.Game.id, after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+async def get_games(db, skip: int = 0, limit: int = 100, published_only: bool = True,
+                    after: Optional[Keyset] = None, columns: Optional[list] = None) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_games, db, skip, limit, published_only, after, columns)
+    query = _games_query(columns)
+    if published_only:
+        query = query.where(models.Game.is_published == True)
+    return await _fetch_games(db, _release_page(query, skip, limit, after), columns)
+
+async def get_latest_games(db, limit: int = 10, columns: Optional[list] = None) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_latest_games, db, limit, columns)
+    query = _games_query(columns).order_by(models.Game.id.desc()).limit(limit)
+    return await _fetch_games(db, query, columns)
+
+async def get_games_by_ids(db, game_ids: List[int], published_only: bool = True) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_games_by_ids, db, game_ids, published_only)
+    query = _games_with_developer().where(models.Game.id.in_(game_ids))
+    if published_only:
+        query = query.where(models.Game.is_published == True)
+    return list((await db.execute(query)).scalars().all())
+
+async def get_games_by_genre(db, genre: str, skip: int = 0, limit: int = 50,
+                             after: Optional[Keyset] = None) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_games_by_genre, db, genre, skip, limit, after)
+    query = _games_with_developer().where(
+        models.Game.genre == genre,
+        models.Game.is_published == True
+    )
+    return list((await db.execute(_release_page(query, skip, limit, after))).scalars().all())
+
+async def search_games(db, search_term: str, skip: int = 0, limit: int = 50,
+                       after: Optional[Keyset] = None) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.search_games, db, search_term, skip, limit, after)
+    statement = search_index.ranked_statement(search_term, skip, limit, after)
+    if statement is not None:
+        ranked = (await db.execute(statement)).all()
+        result = await db.execute(_games_with_developer().where(models.Game.id.in_([row.id for row in ranked])))
+        return search_index.order_by_rank(result.scalars().all(), ranked)
+    query = _games_with_developer().where(
+        game_crud.search_condition(search_term),
+        models.Game.is_published == True
+    )
+    return list((await db.execute(_release_page(query, skip, limit, after))).scalars().all())
+
+async def browse_games(db, browse_filter: facets.BrowseFilter, search: Optional[str] = None,
+                       skip: int = 0, limit: int = 50, after: Optional[Keyset] = None):
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.browse_games, db, browse_filter, search, skip, limit, after)
+    base = [game_crud.search_condition(search)] if search else []
+    base += browse_filter.tag_conditions()
+    query = _games_with_developer().where(models.Game.is_published == True, *base, *browse_filter.conditions())
+    games = list((await db.execute(_release_page(query, skip, limit, after))).scalars().all())
+    total, facet_counts = facets.count_rows(browse_filter, await db.execute(facets.facet_statement(browse_filter, base)))
+    return games, total, facet_counts
+
+async def count_published_games(db, genre: Optional[str] = None, search: Optional[str] = None) -> int:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.count_published_games, db, genre, search)
+    key = ("published_games", genre, search)
+    total = total_counts.get(key)
+    if total is None:
+        query = select(func.count(models.Game.id)).where(models.Game.is_published == True)
+        if search:
+            query = query.where(game_crud.search_condition(search))
+        elif genre:
+            query = query.where(models.Game.genre == genre)
+        total = await db.scalar(query)
+        total_counts.put(key, total)
+    return total
+
+async def get_wishlist_games(db, user_id: int) -> List[models.Game]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_wishlist_games, db, user_id)
+    query = _games_with_developer().join(
+        models.wishlist_table, models.wishlist_table.c.game_id == models.Game.id
+    ).where(models.wishlist_table.c.user_id == user_id)
+    return list((await db.execute(query)).scalars().all())
+
+async def get_wishlist_membership(db, user_id: int, game_ids: List[int]) -> Set[int]:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_wishlist_membership, db, user_id, game_ids)
+    wishlist = models.wishlist_table
+    return set((await db.execute(select(wishlist.c.game_id).where(
+        wishlist.c.user_id == user_id, wishlist.c.game_id.in_(game_ids)
+    ))).scalars())
+
+async def get_wishlist_stats(db, user_id: int) -> dict:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_wishlist_stats, db, user_id)
+    row = (await db.execute(game_crud.wishlist_stats_statement(user_id))).one()
+    return game_crud.format_wishlist_stats(*row)
+
+# ===== STATISTICS =====
+
+async def get_catalog_fingerprint(db) -> tuple:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_catalog_fingerprint, db)
+    published = (await db.execute(
+        select(func.count(models.Game.id), func.max(models.Game.updated_at), func.sum(models.Game.id))
+        .where(models.Game.is_published == True)
+    )).one()
+    developers = await db.scalar(
+        select(func.count(models.User.id)).where(models.User.is_developer == True)
+    )
+    return tuple(published) + (developers,)
+
+async def get_latest_games_fingerprint(db) -> tuple:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_latest_games_fingerprint, db)
+    return tuple((await db.execute(
+        select(func.count(models.Game.id), func.max(models.Game.updated_at), func.sum(models.Game.id))
+    )).one())
+
+async def get_wishlist_fingerprint(db, user_id: int) -> list:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_wishlist_fingerprint, db, user_id)
+    result = await db.execute(
+        select(models.Game.id, models.Game.updated_at, models.User.username).join(
+            models.wishlist_table, models.wishlist_table.c.game_id == models.Game.id
+        ).outerjoin(models.User, models.User.id == models.Game.developer_id)
+        .where(models.wishlist_table.c.user_id == user_id).order_by(models.Game.id)
+    )
+    return [tuple(row) for row in result]
+
+async def get_library_stats(db) -> dict:
+    if not ASYNC_DB_ENABLED:
+        return await run_in_threadpool(game_crud.get_library_stats, db)
+    counter = models.StatCounter
+    rows = (await db.execute(
+        select(counter.scope, counter.name, counter.value).where(counter.scope.in_(library_stats.LIBRARY_SCOPES))
+        .order_by(counter.scope, counter.name)
+    )).all()
+    return library_stats.format_library_stats(rows)
@@ -1,42 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
 from jose import JWTError, jwt
 
 import crud
 import schemas
-from database import get_db
-from security import create_access_token, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
+from database import get_db, SessionLocal
+from auth_cache import principal_cache, snapshot_user
+from security import (
+    bcrypt_rounds, create_access_token, identity_claims, needs_rehash, SIMPLE_HASH_PREFIX,
+    ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM, TOKEN_IDENTITY_CLAIMS,
+)
+import token_versions
+from password_pool import password_pool, PasswordPoolFull
+from rate_limit import login_rate_limiter, client_ip
+import session_store
+from revocation import revocation_store
+
+logger = logging.getLogger("auth")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 router = APIRouter()
 
 @router.post("/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # DB-Zugriffe im Threadpool, bcrypt im eigenen Passwort-Pool
+    db_user_by_email = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="Email already registered")
-    db_user_by_username = crud.get_user_by_username(db, username=user.username)
+    db_user_by_username = await run_in_threadpool(crud.get_user_by_username, db, username=user.username)
     if db_user_by_username:
         raise HTTPException(status_code=400, detail="Username already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await password_pool.get_password_hash(user.password)
+    return await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
 
 @router.post("/login", response_model=schemas.Token)
-def login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
+):
+    # Versuch vorab zählen und gesperrte Benutzernamen/IPs abweisen, bevor DB oder bcrypt beansprucht werden
+    ip = client_ip(request)
+    attempt = await run_in_threadpool(login_rate_limiter.begin, form_data.username, ip)
+    user = await run_in_threadpool(crud.get_user_by_username, db, username=form_data.username)
+    if not user or not await password_pool.verify_password(form_data.password, user.hashed_password):
+        # Der Fehlversuch ist bereits in begin gezählt
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await run_in_threadpool(login_rate_limiter.record_success, attempt)
+    schedule_rehash(background_tasks, user, form_data.password)
+    access_token = await run_in_threadpool(create_user_access_token, db, user)
+    refresh_token = await run_in_threadpool(session_store.create_refresh_session, db, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(refresh_request: schemas.RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Access-Token über ein Refresh-Token erneuern (ohne Passwort, Refresh-Token wird rotiert)"""
+    try:
+        user, refresh_token = session_store.rotate_refresh_session(db, refresh_request.refresh_token)
+    except session_store.InvalidRefreshToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_user_access_token(db, user)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+def schedule_rehash(background_tasks: BackgroundTasks, user, password: str):
+    """Veralteten Hash nach erfolgreichem Login im Hintergrund erneuern"""
+    if needs_rehash(user.hashed_password):
+        background_tasks.add_task(rehash_password, user.id, user.hashed_password, password)
+
+async def rehash_password(user_id: int, old_hash: str, password: str):
+    try:
+        new_hash = await password_pool.get_password_hash(password)
+    except PasswordPoolFull:
+        # Beim nächsten Login erneut versuchen
+        return
+    if new_hash.startswith(SIMPLE_HASH_PREFIX):
+        # bcrypt nicht verfügbar - kein Fortschritt möglich
+        return
+    old_rounds = bcrypt_rounds(old_hash)
+    if old_rounds is not None and bcrypt_rounds(new_hash) < old_rounds:
+        # Kostenfaktor wurde inzwischen gesenkt - vorhandenen stärkeren Hash behalten
+        return
+
+    def _store():
+        db = SessionLocal()
+        try:
+            return crud.update_password_hash(db, user_id, old_hash, new_hash)
+        finally:
+            db.close()
+
+    try:
+        if await run_in_threadpool(_store):
+            logger.info(f"Passwort-Hash für Benutzer {user_id} erneuert")
+    except Exception as e:
+        logger.warning(f"Rehash für Benutzer {user_id} fehlgeschlagen: {e}")
+
+def create_user_access_token(db: Session, user) -> str:
+    """Access-Token für einen Benutzer ausstellen (mit Identitäts-Claims, falls aktiviert)"""
+    data = {"sub": user.username}
+    if TOKEN_IDENTITY_CLAIMS:
+        data.update(identity_claims(user, token_versions.get_version(db, user.id)))
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+    return create_access_token(data=data, expires_delta=access_token_expires)
+
+def principal_from_claims(payload: dict) -> schemas.TokenPrincipal:
+    """Benutzer-Snapshot direkt aus den Identitäts-Claims eines Tokens (ohne Profildaten)"""
+    return schemas.TokenPrincipal(
+        id=payload["uid"],
+        username=payload["sub"],
+        is_developer=payload.get("dev", False),
+        is_admin=False,
+        is_active=payload.get("act", True),
     )
-    return {"access_token": access_token, "token_type": "bearer"}
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
@@ -44,6 +133,16 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Bereits verifiziertes Token: weder JWT-Prüfung noch DB-Abfrage nötig
+    cached = principal_cache.get(token)
+    if cached is not None:
+        if revocation_store.is_revoked(db, cached.claims.get("jti")):
+            principal_cache.invalidate_token(token)
+            raise credentials_exception
+        # Rollen- oder Profiländerung auf einem beliebigen Prozess erhöht die Token-Version
+        if token_versions.get_version(db, cached.user.id) == cached.version:
+            return cached.user
+        principal_cache.invalidate_token(token)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -52,7 +151,39 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
+    # Gesperrte Tokens: Bloom-Filter im Speicher, Datenbank nur bei Treffer
+    if revocation_store.is_revoked(db, payload.get("jti")):
+        raise credentials_exception
+    # Zustandsloser Pfad: Claims sind maßgeblich, solange die Token-Version aktuell ist.
+    # Admin-Rechte werden nie allein aus dem Token übernommen, sondern immer gegen die DB geprüft.
+    if "uid" in payload and "ver" in payload and not payload.get("adm"):
+        version = token_versions.get_version(db, payload["uid"])
+        if version == payload["ver"]:
+            principal = principal_from_claims(payload)
+            principal_cache.put(token, payload, principal, version)
+            return principal
+    # Legacy-Token, Admin oder veraltete Version: Benutzer aus der Datenbank laden
     user = crud.get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
-    return user
+    principal = snapshot_user(user)
+    principal_cache.put(token, payload, principal, token_versions.get_version(db, user.id))
+    return principal
+
+@router.post("/logout")
+def logout(
+    refresh_request: Optional[schemas.RefreshTokenRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Aktuelles Access-Token sperren und optional die zugehörige Refresh-Sitzung beenden"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    jti = payload.get("jti")
+    if jti:
+        expires_at = datetime.utcfromtimestamp(payload["exp"])
+        revocation_store.revoke(db, jti, expires_at, user_id=current_user.id)
+    principal_cache.invalidate_token(token)
+    if refresh_request is not None:
+        session_store.revoke_refresh_token(db, refresh_request.refresh_token)
+    return {"message": "Logged out"}
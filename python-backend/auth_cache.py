@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Principal-Cache für die Authentifizierung
+Hält verifizierte Token-Claims und einen schlanken Benutzer-Snapshot im Speicher,
+damit nicht jede geschützte Anfrage den Benutzer erneut aus der Datenbank lädt
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import schemas
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Administratoren nur kurz cachen: ein Entzug wirkt so auch auf anderen Workern schnell
+AUTH_CACHE_PRIVILEGED_TTL_SECONDS = float(os.getenv("AUTH_CACHE_PRIVILEGED_TTL_SECONDS", "5"))
+
+
+def snapshot_user(user) -> schemas.User:
+    """Erstellt einen unveränderlichen Snapshot eines User-Models (ohne Passwort-Hash)"""
+    return schemas.User.model_validate(user)
+
+
+class _CacheEntry:
+    __slots__ = ("expires_at", "claims", "user", "version")
+
+    def __init__(self, expires_at: float, claims: dict, user: schemas.User, version: int):
+        self.expires_at = expires_at
+        self.claims = claims
+        self.user = user
+        self.version = version
+
+
+class PrincipalCache:
+    """
+    Begrenzter LRU-Cache mit TTL, Schlüssel ist der SHA-256-Hash des Tokens
+
+    Einträge verfallen spätestens mit dem Ablauf des Tokens (``exp``-Claim).
+    Jeder Eintrag merkt sich die Token-Version des Benutzers beim Speichern; der
+    Aufrufer verwirft ihn, sobald die gespeicherte Version davon abweicht. So wirkt
+    eine Änderung auch auf anderen Prozessen, nicht nur über ``invalidate_user``.
+    """
+
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+                 privileged_ttl_seconds: float = AUTH_CACHE_PRIVILEGED_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.privileged_ttl_seconds = privileged_ttl_seconds
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[_CacheEntry]:
+        """Liefert den Eintrag zu einem Token oder None (zählt Treffer/Fehlschläge)"""
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, token: str, claims: dict, user: schemas.User, version: int):
+        """Speichert Claims, Benutzer-Snapshot und Token-Version für ein verifiziertes Token"""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if user.is_admin:
+            ttl = min(ttl, self.privileged_ttl_seconds)
+        exp = claims.get("exp")
+        if exp is not None:
+            # Nie länger cachen, als das Token selbst gültig ist
+            ttl = min(ttl, float(exp) - time.time())
+        if ttl <= 0:
+            return
+        entry = _CacheEntry(time.monotonic() + ttl, claims, user, version)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_token(self, token: str):
+        """Entfernt den Eintrag eines einzelnen Tokens"""
+        with self._lock:
+            if self._entries.pop(self._key(token), None) is not None:
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Entfernt alle Einträge eines Benutzers (z.B. nach Profil- oder Rollenänderung)"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.user.id == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Zähler für Monitoring"""
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "privileged_ttl_seconds": self.privileged_ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache()
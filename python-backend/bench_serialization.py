@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Benchmark der JSON-Serialisierung für Listen-Endpunkte
+Vergleicht die Kosten pro Spiel zwischen dem Standardweg (Pydantic-Modelle je Zeile,
+anschließend Validierung gegen response_model durch FastAPI) und fast_json.
+
+Verwendung: python bench_serialization.py [--items 500] [--rounds 50]
+Benötigt keine Datenbank; die Spiele werden als ORM-Objekte im Speicher erzeugt.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+import fast_json
+import models
+import schemas
+
+
+def build_games(count: int) -> List[models.Game]:
+    """Spiele mit wenigen gemeinsamen Entwicklern, wie in der Bibliothek üblich"""
+    developers = [
+        models.User(id=index, username=f"dev{index}", email=f"dev{index}@example.com",
+                    is_active=True, is_developer=True, is_admin=False)
+        for index in range(1, 21)
+    ]
+    start = datetime(2024, 1, 1)
+    games = []
+    for index in range(1, count + 1):
+        developer = developers[index % len(developers)]
+        games.append(models.Game(
+            id=index, title=f"Spiel {index}", description="Beschreibung " * 20, genre="Action",
+            version="1.0.0", price=9.99, usk_rating="USK 12", download_url=None, tags="indie,pixel",
+            platform="Windows", image_url=None, is_free=False, developer_id=developer.id,
+            developer=developer, is_published=True, release_date=start + timedelta(hours=index),
+            created_at=start, updated_at=start,
+        ))
+    return games
+
+
+def standard_summaries(games) -> bytes:
+    # Wie get_public_games: GameSummary je Zeile, dann Validierung und Serialisierung durch FastAPI
+    summaries = [schemas.GameSummary(
+        id=game.id, title=game.title, genre=game.genre, usk_rating=game.usk_rating, price=game.price,
+        developer_name=game.developer.username, is_published=game.is_published, release_date=game.release_date,
+    ) for game in games]
+    return _fastapi_render(List[schemas.GameSummary], summaries)
+
+
+def standard_games(games) -> bytes:
+    return _fastapi_render(List[schemas.Game], games)
+
+
+_ADAPTERS = {}
+
+
+def _fastapi_render(annotation, content) -> bytes:
+    # Nachbau von serialize_response + JSONResponse.render
+    adapter = _ADAPTERS.get(annotation)
+    if adapter is None:
+        adapter = _ADAPTERS[annotation] = TypeAdapter(annotation)
+    validated = adapter.validate_python(content, from_attributes=True)
+    data = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(label: str, function, games, rounds: int) -> float:
+    function(games)  # Aufwärmen (Schema-Kompilierung, Caches)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function(games)
+    elapsed = time.perf_counter() - started
+    per_item = elapsed / (rounds * len(games)) * 1_000_000
+    print(f"  {label:<28} {per_item:8.2f} µs/Spiel")
+    return per_item
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON-Serialisierung der Listen-Endpunkte messen")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    games = build_games(args.items)
+    encoder = "orjson" if fast_json.orjson is not None else "pydantic_core"
+    print(f"📊 {args.items} Spiele x {args.rounds} Durchläufe (fast_json mit {encoder})")
+
+    overrides = {"developer_name": lambda game: game.developer.username}
+    cases = [
+        ("GameSummary (/library/)", standard_summaries,
+         lambda items: fast_json.dump_list(schemas.GameSummary, items, overrides)),
+        ("Game (/games/, Admin-Listen)", standard_games,
+         lambda items: fast_json.dump_list(schemas.Game, items)),
+    ]
+    for title, standard, fast in cases:
+        if json.loads(standard(games)) != json.loads(fast(games)):
+            print(f"⚠️ {title}: Ausgaben unterscheiden sich")
+        print(f"\n{title}")
+        before = measure("Standard (response_model)", standard, games, args.rounds)
+        after = measure("fast_json", fast, games, args.rounds)
+        print(f"  Faktor {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Katalog-Snapshot aller veröffentlichten Spiele
+Die öffentlichen Listen (/library/, /library/{id}) ändern sich nur, wenn ein
+Entwickler ein Spiel veröffentlicht, bearbeitet oder löscht. Der Snapshot hält diese
+Spiele samt aufgelöstem Entwickler im Speicher und wird bei solchen Änderungen über
+game_events inkrementell aktualisiert: nur die geänderten Spiele werden nachgeladen
+und per bisect in die sortierten Listen eingefügt. Das geschieht noch im committenden
+Request, damit dieser Prozess direkt danach den neuen Stand ausliefert.
+
+Jeder neue Stand bekommt eine fortlaufende Versionsnummer (Header X-Catalog-Version).
+Sie zählt nur prozesslokal; ETags bauen daher auf dem Inhalts-Fingerabdruck auf, der
+nach Neustarts und auf allen Replikaten für denselben Inhalt gleich ist.
+Ein Hintergrund-Thread vergleicht regelmäßig einen Fingerabdruck der Tabelle (inklusive
+Entwicklernamen), um Änderungen anderer Worker-Prozesse oder Massen-Updates nachzuziehen.
+
+Abgeleitete Strukturen (z.B. der Vorschlagsindex) melden sich über on_publish an und
+werden nach jedem neuen Stand im selben Thread nachgeführt.
+"""
+
+import bisect
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
+
+import game_events
+import models
+import schemas
+from auth_cache import snapshot_user
+from database import SessionLocal
+from game_tags import parse_tags
+from pagination import Keyset
+
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").lower() in ("1", "true", "yes")
+CATALOG_VERIFY_SECONDS = float(os.getenv("CATALOG_VERIFY_SECONDS", "60"))
+
+logger = logging.getLogger("catalog")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+# Spalten, die unverändert aus models.Game übernommen werden
+_COLUMNS = (
+    "id", "title", "description", "genre", "version", "price", "usk_rating", "download_url",
+    "tags", "platform", "image_url", "is_free", "developer_id", "release_date", "created_at", "updated_at",
+)
+
+
+class CatalogGame:
+    """Schlanke, unveränderliche Kopie eines veröffentlichten Spiels"""
+
+    __slots__ = _COLUMNS + ("developer", "developer_name", "is_published", "sort_key", "tag_set",
+                            "content_hash", "source_hash")
+
+    def __init__(self, game: models.Game, developer: schemas.User):
+        for name in _COLUMNS:
+            setattr(self, name, getattr(game, name))
+        self.developer = developer
+        self.developer_name = developer.username
+        self.is_published = True
+        self.tag_set = frozenset(parse_tags(game.tags))
+        # Aufsteigend sortiert ergibt das "neueste zuerst" nach (release_date, id)
+        self.sort_key = _sort_key((game.release_date, game.id))
+        # Entwicklerdaten gehören zum Inhalt, ändern aber nicht games.updated_at
+        self.content_hash = _hash((game.id, game.updated_at, developer))
+        # Gegenstück zu PublishedCatalog._compute_fingerprint (nur aus der DB ablesbare Werte)
+        self.source_hash = source_hash(game.id, game.updated_at, developer.username)
+
+
+def _hash(value) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def source_hash(game_id: int, updated_at: Optional[datetime], developer_name: str) -> int:
+    return _hash((game_id, updated_at, developer_name))
+
+
+def _sort_key(after: Keyset) -> Tuple[float, int]:
+    release, game_id = after
+    if release is None:
+        # Wie pagination.order_desc: Spiele ohne Datum stehen am Ende
+        return (float("inf"), -game_id)
+    return (-(release - _EPOCH).total_seconds(), -game_id)
+
+
+class _Listing:
+    """Nach (release_date, id) absteigend sortierte Spiele mit Schlüsseln für bisect"""
+
+    __slots__ = ("games", "keys")
+
+    def __init__(self, games: List[CatalogGame], keys: Optional[List[Tuple[float, int]]] = None):
+        if keys is None:
+            games.sort(key=lambda game: game.sort_key)
+            keys = [game.sort_key for game in games]
+        self.games = games
+        self.keys = keys
+
+    def replace(self, removed: Iterable[CatalogGame], added: Iterable[CatalogGame]) -> "_Listing":
+        """Kopie mit entfernten und eingefügten Spielen, ohne die Liste neu zu sortieren"""
+        games, keys = list(self.games), list(self.keys)
+        for game in removed:
+            index = bisect.bisect_left(keys, game.sort_key)
+            if index < len(keys) and keys[index] == game.sort_key:
+                del games[index]
+                del keys[index]
+        for game in added:
+            index = bisect.bisect_left(keys, game.sort_key)
+            games.insert(index, game)
+            keys.insert(index, game.sort_key)
+        return _Listing(games, keys)
+
+    def start(self, skip: int, after: Optional[Keyset]) -> int:
+        """Index des ersten Eintrags nach dem Cursor bzw. nach skip Einträgen"""
+        return bisect.bisect_right(self.keys, _sort_key(after)) if after is not None else skip
+
+    def page(self, skip: int, limit: int, after: Optional[Keyset]) -> List[CatalogGame]:
+        start = self.start(skip, after)
+        return list(self.games[start:start + limit])
+
+
+def _last_modified(games: Iterable[CatalogGame]) -> Optional[datetime]:
+    return max((game.updated_at for game in games if game.updated_at), default=None)
+
+
+class CatalogSnapshot:
+    __slots__ = ("version", "built_at", "last_modified", "checksum", "source_checksum", "fingerprint",
+                 "changed", "by_id", "all", "by_genre")
+
+    def __init__(self, version: int, games: Dict[int, CatalogGame], changed: Optional[frozenset] = None):
+        self.version = version
+        # IDs, die sich gegenüber version - 1 geändert haben; None nach vollständigem Neuaufbau
+        self.changed = changed
+        self.built_at = datetime.utcnow()
+        # Reihenfolgeunabhängige Prüfsumme über alle Einträge - Grundlage der ETags
+        self._set_content(games, _last_modified(games.values()),
+                          sum(game.content_hash for game in games.values()),
+                          sum(game.source_hash for game in games.values()))
+        self.all = _Listing(list(games.values()))
+        genres: Dict[str, List[CatalogGame]] = {}
+        for game in games.values():
+            if game.genre:
+                genres.setdefault(game.genre, []).append(game)
+        self.by_genre = {genre: _Listing(items) for genre, items in genres.items()}
+
+    def _set_content(self, games: Dict[int, CatalogGame], last_modified: Optional[datetime],
+                     checksum: int, source_checksum: int):
+        self.by_id = games
+        self.last_modified = last_modified
+        self.checksum = checksum & 0xFFFFFFFFFFFFFFFF
+        self.source_checksum = source_checksum & 0xFFFFFFFFFFFFFFFF
+        self.fingerprint = (len(games), last_modified, self.checksum)
+
+    @property
+    def source_fingerprint(self) -> Tuple[int, Optional[datetime], int]:
+        """Erwarteter Wert von PublishedCatalog._compute_fingerprint für diesen Inhalt"""
+        return len(self.by_id), self.last_modified, self.source_checksum
+
+    def apply(self, game_ids: Set[int], loaded: Dict[int, CatalogGame]) -> "CatalogSnapshot":
+        """
+        Nachfolger mit den neu geladenen Spielen; alle übrigen game_ids werden entfernt
+
+        Listen, Prüfsumme und Last-Modified werden aus diesem Snapshot fortgeschrieben
+        statt den ganzen Katalog neu zu sortieren.
+        """
+        removed = [self.by_id[game_id] for game_id in game_ids if game_id in self.by_id]
+        added = list(loaded.values())
+        games = dict(self.by_id)
+        for game in removed:
+            del games[game.id]
+        games.update(loaded)
+
+        snapshot = CatalogSnapshot.__new__(CatalogSnapshot)
+        snapshot.version = self.version + 1
+        snapshot.changed = frozenset(game_ids)
+        snapshot.built_at = datetime.utcnow()
+        if any(game.updated_at == self.last_modified for game in removed):
+            # Das jüngste Spiel wurde ersetzt oder entfernt - Maximum neu bestimmen
+            last_modified = _last_modified(games.values())
+        else:
+            last_modified = max(filter(None, [self.last_modified, _last_modified(added)]), default=None)
+        checksum = self.checksum - sum(game.content_hash for game in removed) + sum(game.content_hash for game in added)
+        source_checksum = (self.source_checksum - sum(game.source_hash for game in removed)
+                           + sum(game.source_hash for game in added))
+        snapshot._set_content(games, last_modified, checksum, source_checksum)
+        snapshot.all = self.all.replace(removed, added)
+        by_genre = dict(self.by_genre)
+        for genre in {game.genre for game in removed + added if game.genre}:
+            listing = by_genre.get(genre) or _Listing([], [])
+            listing = listing.replace([game for game in removed if game.genre == genre],
+                                      [game for game in added if game.genre == genre])
+            if listing.games:
+                by_genre[genre] = listing
+            else:
+                by_genre.pop(genre, None)
+        snapshot.by_genre = by_genre
+        return snapshot
+
+    def get(self, game_id: int) -> Optional[CatalogGame]:
+        return self.by_id.get(game_id)
+
+    def games(self, skip: int = 0, limit: int = 100, genre: Optional[str] = None,
+              after: Optional[Keyset] = None) -> Tuple[List[CatalogGame], int]:
+        """Seite und Gesamtzahl, gefiltert nach Genre"""
+        listing = self.by_genre.get(genre) if genre else self.all
+        if listing is None:
+            return [], 0
+        return listing.page(skip, limit, after), len(listing.games)
+
+
+class PublishedCatalog:
+    def __init__(self, session_factory=SessionLocal, verify_seconds: float = CATALOG_VERIFY_SECONDS):
+        self._session_factory = session_factory
+        self.verify_seconds = verify_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        # Serialisiert Schreiber (Neuaufbau, Nachladen); Leser greifen ohne Sperre auf _snapshot zu
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._publish_listeners: List[Callable] = []
+        self.rebuilds = 0
+        self.incremental_updates = 0
+        self.verifications = 0
+
+    # ----- Laden -----
+
+    def _load(self, db: Session, game_ids: Optional[Iterable[int]] = None) -> Dict[int, CatalogGame]:
+        query = db.query(models.Game).options(joinedload(models.Game.developer)).filter(
+            models.Game.is_published == True
+        )
+        if game_ids is not None:
+            query = query.filter(models.Game.id.in_(list(game_ids)))
+        developers: Dict[int, schemas.User] = {}
+        games = {}
+        for game in query:
+            developer = developers.get(game.developer_id)
+            if developer is None:
+                developer = developers[game.developer_id] = snapshot_user(game.developer)
+            games[game.id] = CatalogGame(game, developer)
+        return games
+
+    def _compute_fingerprint(self, db: Session):
+        """
+        Fingerabdruck der veröffentlichten Spiele samt Entwicklernamen
+
+        Umbenennungen ändern games.updated_at nicht; deshalb fließen die Namen über
+        eine reihenfolgeunabhängige Prüfsumme ein.
+        """
+        rows = db.query(models.Game.id, models.Game.updated_at, models.User.username).join(
+            models.User, models.Game.developer_id == models.User.id
+        ).filter(models.Game.is_published == True)
+        count, last_modified, checksum = 0, None, 0
+        for game_id, updated_at, username in rows:
+            count += 1
+            if updated_at is not None and (last_modified is None or updated_at > last_modified):
+                last_modified = updated_at
+            checksum += source_hash(game_id, updated_at, username)
+        return count, last_modified, checksum & 0xFFFFFFFFFFFFFFFF
+
+    def rebuild(self):
+        """Snapshot vollständig aus der Datenbank neu aufbauen"""
+        db = self._session_factory()
+        try:
+            with self._lock:
+                games = self._load(db)
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                self._snapshot = CatalogSnapshot(version, games)
+                self.rebuilds += 1
+        finally:
+            db.close()
+        logger.info(f"Katalog v{version} mit {len(games)} Spielen aufgebaut")
+        self._publish()
+
+    def refresh_games(self, game_ids: Iterable[int]):
+        """Nur die angegebenen Spiele nachladen (veröffentlicht -> ersetzen, sonst entfernen)"""
+        game_ids = set(game_ids)
+        if self._snapshot is None or not game_ids:
+            return
+        db = self._session_factory()
+        try:
+            # Laden unter der Sperre: ein späterer Schreiber sieht mindestens diesen Stand,
+            # ältere Daten können einen neueren Snapshot nicht überschreiben
+            with self._lock:
+                loaded = self._load(db, game_ids)
+                snapshot = self._snapshot
+                if not loaded and not any(game_id in snapshot.by_id for game_id in game_ids):
+                    # Nur Entwürfe betroffen - Katalog bleibt unverändert
+                    return
+                self._snapshot = snapshot.apply(game_ids, loaded)
+                self.incremental_updates += 1
+        finally:
+            db.close()
+        self._publish()
+
+    def refresh_developer(self, developer_id: int):
+        """Nach Profiländerungen eines Entwicklers dessen Spiele neu laden"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        game_ids = [game.id for game in snapshot.by_id.values() if game.developer_id == developer_id]
+        if game_ids:
+            self.refresh_games(game_ids)
+
+    def verify(self) -> bool:
+        """Fingerabdruck prüfen und bei Abweichung neu aufbauen; True wenn neu aufgebaut"""
+        db = self._session_factory()
+        try:
+            fingerprint = self._compute_fingerprint(db)
+        finally:
+            db.close()
+        self.verifications += 1
+        snapshot = self._snapshot
+        if snapshot is not None and fingerprint == snapshot.source_fingerprint:
+            return False
+        self.rebuild()
+        return True
+
+    def on_publish(self, listener: Callable):
+        """listener(snapshot) nach jedem neuen Stand; bekommt immer den aktuellsten Snapshot"""
+        self._publish_listeners.append(listener)
+        return listener
+
+    def _publish(self):
+        # Außerhalb der Sperre: ein langsamer Listener hält keine weiteren Schreiber auf
+        snapshot = self._snapshot
+        for listener in self._publish_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.warning(f"Listener für Katalog v{snapshot.version} fehlgeschlagen: {e}")
+
+    # ----- Zugriff -----
+
+    def current(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.rebuild()
+            snapshot = self._snapshot
+        return snapshot
+
+    async def current_async(self) -> CatalogSnapshot:
+        """Wie current(), baut einen fehlenden Snapshot aber im Threadpool statt auf der Event-Loop"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = await run_in_threadpool(self.current)
+        return snapshot
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._snapshot.version if self._snapshot else None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": CATALOG_ENABLED,
+            "version": snapshot.version if snapshot else None,
+            "games": len(snapshot.by_id) if snapshot else 0,
+            "built_at": snapshot.built_at.isoformat() if snapshot else None,
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.incremental_updates,
+            "verifications": self.verifications,
+        }
+
+    # ----- Hintergrund-Thread -----
+
+    def _verify_loop(self):
+        while not self._stop.wait(self.verify_seconds):
+            try:
+                self.verify()
+            except Exception as e:
+                logger.warning(f"Katalog-Prüfung fehlgeschlagen: {e}")
+
+    def start(self):
+        """Snapshot aufbauen und die periodische Prüfung starten"""
+        if not CATALOG_ENABLED:
+            return
+        self.rebuild()
+        if self.verify_seconds > 0:
+            threading.Thread(target=self._verify_loop, name="catalog-verify", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+published_catalog = PublishedCatalog()
+
+
+@game_events.on_commit
+def _refresh_changed_games(game_ids):
+    # Synchron im committenden Thread: der schreibende Client liest danach seinen eigenen Stand
+    if CATALOG_ENABLED:
+        published_catalog.refresh_games(game_ids)
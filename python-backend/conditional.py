@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Bedingte Antworten (ETag / Last-Modified)
+Die Endpunkte berechnen ihren ETag aus einem billigen Inhalts-Fingerabdruck (aus dem
+Katalog-Snapshot oder der Datenbank), bevor Daten geladen oder serialisiert werden.
+Stimmt er mit If-None-Match überein, wird sofort mit 304 ohne Body geantwortet.
+Prozesslokale Zähler taugen dafür nicht: nach Neustarts und auf Replikaten wiederholen sie sich.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Response, status
+from starlette.requests import Request
+
+
+def make_etag(*parts) -> str:
+    """Starker ETag über alle Bestandteile, die den Inhalt der Antwort bestimmen"""
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match (Vorrang) bzw. If-Modified-Since gegen den aktuellen Stand prüfen"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match vergleicht schwach: W/"x" passt auf "x"
+        return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime], private: bool) -> dict:
+    headers = {
+        "ETag": etag,
+        # Immer neu validieren lassen, der Browser schickt dann If-None-Match
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, private: bool = False) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers=_validator_headers(etag, last_modified, private))
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None,
+                   private: bool = False):
+    response.headers.update(_validator_headers(etag, last_modified, private))
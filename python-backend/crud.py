@@ -2,7 +2,11 @@ from sqlalchemy.orm import Session
 import models
 import schemas
 from security import get_password_hash
+from auth_cache import principal_cache
+from catalog import published_catalog
+import token_versions
 from datetime import date
+from typing import Optional
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -10,8 +14,10 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    # Hash kann vorab (z.B. im Passwort-Pool) berechnet worden sein
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     
     db_user = models.User(
         username=user.username,
@@ -47,10 +53,27 @@ def update_user_profile(db: Session, user_id: int, user_update: schemas.UserUpda
     if user_update.birth_date is not None:
         db_user.birth_date = user_update.birth_date
     
+    # Identitäts-Claims bereits ausgestellter Tokens entwerten
+    token_version = token_versions.bump_version(db, user_id)
+    
     db.commit()
     db.refresh(db_user)
+    token_versions.remember(user_id, token_version)
+    # Gecachte Principals dieses Benutzers sind jetzt veraltet
+    principal_cache.invalidate_user(user_id)
+    # Katalog zeigt Entwicklerdaten seiner Spiele
+    published_catalog.refresh_developer(user_id)
     return db_user
 
 def get_all_users(db: Session):
     """Alle Nutzer aus der Datenbank abrufen"""
     return db.query(models.User).all()
+
+def update_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """Passwort-Hash ersetzen, sofern er sich seit dem Lesen nicht geändert hat"""
+    updated = db.query(models.User).filter(
+        models.User.id == user_id,
+        models.User.hashed_password == old_hash
+    ).update({models.User.hashed_password: new_hash}, synchronize_session=False)
+    db.commit()
+    return updated > 0
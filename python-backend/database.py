@@ -1,20 +1,72 @@
-
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from starlette.requests import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from security import ALGORITHM, SECRET_KEY
+
 load_dotenv()
 
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("database")
 
+# Pool-Einstellungen für PostgreSQL (per Umgebungsvariablen anpassbar)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite-Profil: WAL erlaubt parallele Leser neben einem Schreiber
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Optionales Lese-Replikat (nur PostgreSQL): DATABASE_REPLICA_URL oder DB_REPLICA_HOST
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+# Nach einem Fehler wird das Replikat so lange übersprungen
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# Read-your-writes: so lange nach einer eigenen Änderung liest ein Client vom Primary
+DB_REPLICA_RYW_SECONDS = float(os.getenv("DB_REPLICA_RYW_SECONDS", "5"))
+
 # Standard-SQLite-Konfiguration für lokale Entwicklung
 DATABASE_URL = "sqlite:///./test.db"
 engine = None
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Pragmas für jede neue SQLite-Verbindung setzen"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        # Negativer Wert = Größe in KiB statt in Seiten
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def _postgres_pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 try:
     # Überschreiben mit PostgreSQL, wenn Umgebungsvariablen für die Produktion gesetzt sind
     DB_HOST = os.getenv("DB_HOST")
@@ -24,15 +76,72 @@ try:
         DB_NAME = os.getenv("DB_NAME", "indihub_db")
         DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
         logger.info(f"Connecting to PostgreSQL: {DATABASE_URL}")
-        engine = create_engine(DATABASE_URL)
+        engine = create_engine(DATABASE_URL, **_postgres_pool_options())
+        if not DATABASE_REPLICA_URL and DB_REPLICA_HOST:
+            DATABASE_REPLICA_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_REPLICA_HOST}/{DB_NAME}"
     else:
         logger.info(f"Using SQLite: {DATABASE_URL}")
-        engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={
+                "check_same_thread": False,
+                # Wartezeit des Treibers bei gesperrter Datenbank (Sekunden)
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+        )
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
 except Exception as e:
     logger.error(f"Fehler beim Erstellen des DB-Engines: {e}")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = None
+ReplicaSessionLocal = None
+if DATABASE_REPLICA_URL and DATABASE_URL.startswith("postgresql://"):
+    try:
+        replica_engine = create_engine(DATABASE_REPLICA_URL, **_postgres_pool_options())
+        ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+        logger.info("Lese-Replikat konfiguriert")
+    except Exception as e:
+        logger.error(f"Fehler beim Erstellen des Replikat-Engines: {e}")
+
+# Optionaler Async-Stack (asyncpg für PostgreSQL, aiosqlite für SQLite)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+async_engine = None
+AsyncSessionLocal = None
+AsyncReplicaSessionLocal = None
+
+if DB_ASYNC:
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        if DATABASE_URL.startswith("postgresql://"):
+            ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+            async_engine = create_async_engine(ASYNC_DATABASE_URL, **_postgres_pool_options())
+            if ReplicaSessionLocal is not None:
+                async_replica_engine = create_async_engine(
+                    DATABASE_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://", 1),
+                    **_postgres_pool_options()
+                )
+                AsyncReplicaSessionLocal = async_sessionmaker(
+                    async_replica_engine, autoflush=False, expire_on_commit=False
+                )
+        else:
+            ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+            async_engine = create_async_engine(
+                ASYNC_DATABASE_URL,
+                connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            )
+            event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        logger.info("Async-Datenbankzugriff aktiviert")
+    except Exception as e:
+        logger.error(f"Async-Engine nicht verfügbar, nutze synchrone Sessions: {e}")
+        async_engine = None
+        AsyncSessionLocal = None
+        AsyncReplicaSessionLocal = None
+
+ASYNC_DB_ENABLED = AsyncSessionLocal is not None
+
 Base = declarative_base()
 
 def get_db():
@@ -41,3 +150,155 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# ===== READ-ROUTING (Replikat mit Fallback auf Primary) =====
+
+_replica_lock = threading.Lock()
+_replica_down_until = 0.0
+_recent_writes = {}
+replica_stats = {"replica_reads": 0, "primary_reads": 0, "replica_failures": 0, "read_your_writes": 0}
+
+def _client_key(request: Request):
+    """
+    Benutzer hinter dem Bearer-Token (uid- bzw. sub-Claim)
+
+    Bewusst nicht das Token selbst: nach /token/refresh schickt der Client ein neues
+    Token und muss seine eigenen Änderungen trotzdem weiter vom Primary lesen.
+    """
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("uid") is not None:
+        return f"uid:{payload['uid']}"
+    if payload.get("sub"):
+        return f"sub:{payload['sub']}"
+    return None
+
+def note_write(request: Request):
+    """Eigene Änderung eines Clients merken, damit seine folgenden Lesezugriffe den Primary nutzen"""
+    if ReplicaSessionLocal is None:
+        return
+    key = _client_key(request)
+    if key is None:
+        return
+    now = time.monotonic()
+    with _replica_lock:
+        _recent_writes[key] = now + DB_REPLICA_RYW_SECONDS
+        if len(_recent_writes) > 10000:
+            for stale in [k for k, until in _recent_writes.items() if until <= now]:
+                del _recent_writes[stale]
+
+def _use_replica(request: Request) -> bool:
+    if ReplicaSessionLocal is None:
+        return False
+    now = time.monotonic()
+    if now < _replica_down_until:
+        return False
+    key = _client_key(request)
+    if key is not None:
+        with _replica_lock:
+            until = _recent_writes.get(key)
+        if until is not None and until > now:
+            replica_stats["read_your_writes"] += 1
+            return False
+    return True
+
+def _replica_failed(e: Exception):
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+    replica_stats["replica_failures"] += 1
+    logger.warning(f"Lese-Replikat nicht erreichbar, nutze Primary: {e}")
+
+def get_sync_read_db(request: Request):
+    """Session für reine Lesezugriffe: Replikat, falls konfiguriert und erreichbar"""
+    db = None
+    if _use_replica(request):
+        db = ReplicaSessionLocal()
+        try:
+            db.connection()
+            replica_stats["replica_reads"] += 1
+        except DBAPIError as e:
+            db.close()
+            db = None
+            _replica_failed(e)
+    if db is None:
+        db = SessionLocal()
+        replica_stats["primary_reads"] += 1
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    db = None
+    if _use_replica(request) and AsyncReplicaSessionLocal is not None:
+        db = AsyncReplicaSessionLocal()
+        try:
+            await db.connection()
+            replica_stats["replica_reads"] += 1
+        except DBAPIError as e:
+            await db.close()
+            db = None
+            _replica_failed(e)
+    if db is None:
+        db = AsyncSessionLocal()
+        replica_stats["primary_reads"] += 1
+    try:
+        yield db
+    finally:
+        await db.close()
+
+@contextmanager
+def read_session():
+    """
+    Lese-Session außerhalb von Requests; Replikat mit Fallback auf den Primary
+
+    Nur für Hintergrundjobs, die veraltete Daten vertragen (z.B. Beliebtheit der
+    Suchvorschläge). Der Statistik-Abgleich liest bewusst vom Primary, weil er auf
+    Basis des Gelesenen Zähler korrigiert.
+    """
+    db = None
+    if ReplicaSessionLocal is not None and time.monotonic() >= _replica_down_until:
+        db = ReplicaSessionLocal()
+        try:
+            db.connection()
+        except DBAPIError as e:
+            db.close()
+            db = None
+            _replica_failed(e)
+    if db is None:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Abhängigkeit für die heißen Lesepfade: AsyncSession wenn DB_ASYNC aktiv, sonst Session
+get_read_db = get_async_read_db if ASYNC_DB_ENABLED else get_sync_read_db
+
+def get_pool_stats() -> dict:
+    """Kennzahlen des Verbindungspools für Monitoring"""
+    if engine is None:
+        return {"available": False}
+    pool = engine.pool
+    stats = {
+        "dialect": engine.dialect.name,
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+    }
+    # QueuePool (PostgreSQL) liefert detaillierte Zähler
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if replica_engine is not None:
+        stats["replica"] = dict(replica_stats, status=replica_engine.pool.status())
+    return stats
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Facettierte Suche in der Spielebibliothek (/library/browse)
+Filter nach Genre, USK-Stufe, Plattform, kostenlos/kostenpflichtig und Preisbereich
+lassen sich kombinieren; zusätzlich zur Ergebnisseite liefert der Endpunkt für jede
+Facette die Anzahl Treffer je Wert.
+
+Die Zählung ist "disjunktiv" wie in üblichen Shop-Oberflächen: die Zahlen einer Facette
+berücksichtigen alle anderen Filter, aber nicht den eigenen - so sieht man, wie viele
+Treffer ein weiteres Genre hinzufügen würde. Alle Facetten entstehen in einem Durchlauf:
+ein Spiel, das alle Filter erfüllt, zählt in jeder Facette; eines, das genau einen
+Filter verfehlt, zählt nur in dieser Facette.
+
+Quelle ist der Katalog-Snapshot im Speicher oder - mit Suchbegriff bzw. ohne Katalog -
+eine einzige GROUP BY-Abfrage über die Facetten-Spalten (Index ix_games_browse_facets).
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, func, select
+
+import models
+from game_tags import tag_condition, tags_match
+from pagination import Keyset
+
+FACETS = ("genre", "usk_rating", "platform", "is_free", "price")
+
+# (Bezeichnung, obere Grenze exklusiv); der erste passende Bereich gilt
+PRICE_BUCKETS = (
+    ("0", 0.01),
+    ("0-10", 10.0),
+    ("10-20", 20.0),
+    ("20-40", 40.0),
+    ("40+", None),
+)
+
+
+def price_bucket(price: Optional[float]) -> str:
+    price = price or 0.0
+    for label, upper in PRICE_BUCKETS:
+        if upper is None or price < upper:
+            return label
+    return PRICE_BUCKETS[-1][0]
+
+
+class BrowseFilter:
+    """Kombinierte Filter; innerhalb einer Facette ODER, zwischen Facetten UND"""
+
+    def __init__(self, genres: Sequence[str] = (), usk_ratings: Sequence[str] = (),
+                 platforms: Sequence[str] = (), is_free: Optional[bool] = None,
+                 min_price: Optional[float] = None, max_price: Optional[float] = None,
+                 tags: Sequence[str] = (), match_all_tags: bool = True):
+        self.genres = frozenset(genres)
+        self.usk_ratings = frozenset(usk_ratings)
+        self.platforms = frozenset(platforms)
+        self.is_free = is_free
+        self.min_price = min_price
+        self.max_price = max_price
+        # Tags sind keine Facette, sondern schränken wie der Suchbegriff alle Zahlen ein
+        self.tags = tuple(tags)
+        self.match_all_tags = match_all_tags
+
+    def key(self) -> tuple:
+        """Stabile Darstellung, z.B. für ETags"""
+        return (sorted(self.genres), sorted(self.usk_ratings), sorted(self.platforms),
+                self.is_free, self.min_price, self.max_price, sorted(self.tags), self.match_all_tags)
+
+    def tag_conditions(self) -> list:
+        condition = tag_condition(self.tags, self.match_all_tags)
+        return [condition] if condition is not None else []
+
+    def price_matches(self, price: Optional[float]) -> bool:
+        price = price or 0.0
+        if self.min_price is not None and price < self.min_price:
+            return False
+        return self.max_price is None or price <= self.max_price
+
+    def failed(self, genre, usk_rating, platform, is_free, price_ok: bool) -> List[str]:
+        """Facetten, deren Filter der Wert nicht erfüllt"""
+        failed = []
+        if self.genres and genre not in self.genres:
+            failed.append("genre")
+        if self.usk_ratings and usk_rating not in self.usk_ratings:
+            failed.append("usk_rating")
+        if self.platforms and platform not in self.platforms:
+            failed.append("platform")
+        if self.is_free is not None and bool(is_free) != self.is_free:
+            failed.append("is_free")
+        if not price_ok:
+            failed.append("price")
+        return failed
+
+    def price_conditions(self) -> list:
+        price = func.coalesce(models.Game.price, 0.0)
+        conditions = []
+        if self.min_price is not None:
+            conditions.append(price >= self.min_price)
+        if self.max_price is not None:
+            conditions.append(price <= self.max_price)
+        return conditions
+
+    def conditions(self) -> list:
+        """Dieselben Filter als SQL-Bedingungen für die Ergebnisseite"""
+        game = models.Game
+        conditions = []
+        if self.genres:
+            conditions.append(game.genre.in_(self.genres))
+        if self.usk_ratings:
+            conditions.append(game.usk_rating.in_(self.usk_ratings))
+        if self.platforms:
+            conditions.append(game.platform.in_(self.platforms))
+        if self.is_free is not None:
+            conditions.append(game.is_free == self.is_free)
+        return conditions + self.price_conditions()
+
+
+class FacetCounter:
+    """Zählt Treffer und Facetten in einem Durchlauf"""
+
+    def __init__(self, browse_filter: BrowseFilter):
+        self.filter = browse_filter
+        self.total = 0
+        self.counts: Dict[str, Counter] = {facet: Counter() for facet in FACETS}
+
+    def add(self, genre, usk_rating, platform, is_free, bucket: str, price_ok: bool, count: int = 1) -> bool:
+        """Wert(e) zählen; True, wenn sie alle Filter erfüllen"""
+        failed = self.filter.failed(genre, usk_rating, platform, is_free, price_ok)
+        if len(failed) > 1:
+            return False
+        values = {
+            "genre": genre, "usk_rating": usk_rating, "platform": platform,
+            "is_free": "true" if is_free else "false", "price": bucket,
+        }
+        for facet in failed or FACETS:
+            if values[facet] is not None:
+                self.counts[facet][values[facet]] += count
+        if failed:
+            return False
+        self.total += count
+        return True
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        result = {facet: dict(sorted(counter.items())) for facet, counter in self.counts.items()}
+        # Preisbereiche in fester Reihenfolge statt alphabetisch
+        result["price"] = {label: self.counts["price"][label] for label, _ in PRICE_BUCKETS
+                           if self.counts["price"][label]}
+        return result
+
+
+def browse_catalog(snapshot, browse_filter: BrowseFilter, skip: int, limit: int,
+                   after: Optional[Keyset]) -> Tuple[list, int, Dict[str, Dict[str, int]]]:
+    """Seite, Trefferzahl und Facetten aus dem Katalog-Snapshot (ein Durchlauf, keine Abfrage)"""
+    counter = FacetCounter(browse_filter)
+    listing = snapshot.all
+    start = listing.start(0, after) if after is not None else None
+    matched = []
+    for index, game in enumerate(listing.games):
+        if browse_filter.tags and not tags_match(game.tag_set, browse_filter.tags, browse_filter.match_all_tags):
+            continue
+        if counter.add(game.genre, game.usk_rating, game.platform, game.is_free, price_bucket(game.price),
+                       browse_filter.price_matches(game.price)):
+            if start is None or index >= start:
+                matched.append(game)
+    page = matched[:limit] if start is not None else matched[skip:skip + limit]
+    return page, counter.total, counter.facets()
+
+
+def facet_statement(browse_filter: BrowseFilter, base_conditions: Iterable):
+    """
+    Eine GROUP BY-Abfrage über alle Kombinationen der Facetten-Werte
+
+    Die Facetten-Filter selbst stehen nicht im WHERE, sondern werden pro Gruppe in
+    Python ausgewertet - nur so lassen sich die disjunktiven Zahlen in einem Durchlauf
+    bestimmen. Der Preisfilter wird als Spalte price_ok mitgruppiert.
+    """
+    game = models.Game
+    price = func.coalesce(game.price, 0.0)
+    bucket = case(
+        *[(price < upper, label) for label, upper in PRICE_BUCKETS if upper is not None],
+        else_=PRICE_BUCKETS[-1][0],
+    ).label("price_bucket")
+    group_columns = [game.genre, game.usk_rating, game.platform, game.is_free, bucket]
+    price_conditions = browse_filter.price_conditions()
+    if price_conditions:
+        group_columns.append(case((and_(*price_conditions), True), else_=False).label("price_ok"))
+    return select(*group_columns, func.count(game.id).label("count")).where(
+        game.is_published == True, *base_conditions
+    ).group_by(*group_columns)
+
+
+def count_rows(browse_filter: BrowseFilter, rows) -> Tuple[int, Dict[str, Dict[str, int]]]:
+    """Ergebnis von facet_statement zu Trefferzahl und Facetten zusammenfassen"""
+    counter = FacetCounter(browse_filter)
+    for row in rows:
+        price_ok = bool(row.price_ok) if "price_ok" in row._fields else True
+        counter.add(row.genre, row.usk_rating, row.platform, row.is_free, row.price_bucket, price_ok, row.count)
+    return counter.total, counter.facets()
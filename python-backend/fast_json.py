@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Schneller JSON-Pfad für Listen-Endpunkte (opt-in über FAST_JSON=true)
+Der Standardweg baut je Zeile ein Pydantic-Modell, das FastAPI anschließend noch einmal
+gegen response_model validiert und serialisiert. Hier werden die Felder des Schemas
+einmalig zu einem Plan kompiliert, ORM-Objekte bzw. Katalog-Einträge direkt in Dicts
+übertragen und in einem Schritt zu Bytes serialisiert (orjson, sonst pydantic_core).
+
+Es findet keine Validierung statt: die Daten kommen aus der eigenen Datenbank und
+entsprechen den Schemas bereits. Verschachtelte Objekte (z.B. der Entwickler) werden
+pro Antwort nur einmal umgewandelt.
+
+Vergleich mit dem Standardweg: python bench_serialization.py
+"""
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # optional, pydantic_core ist immer vorhanden
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+Plan = Tuple[Tuple[str, Optional["Plan"]], ...]
+
+
+@lru_cache(maxsize=None)
+def compile_plan(model: Type[BaseModel]) -> Plan:
+    """Feldnamen des Schemas, verschachtelte Modelle rekursiv"""
+    plan = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        nested = None
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            nested = compile_plan(annotation)
+        plan.append((name, nested))
+    return tuple(plan)
+
+
+def _to_dict(obj, plan: Plan, memo: Dict[int, dict]) -> dict:
+    row = {}
+    for name, nested in plan:
+        value = getattr(obj, name, None)
+        if nested is not None and value is not None:
+            cached = memo.get(id(value))
+            if cached is None:
+                cached = memo[id(value)] = _to_dict(value, nested, memo)
+            value = cached
+        row[name] = value
+    return row
+
+
+def dump_list(model: Type[BaseModel], items: Iterable,
+              overrides: Optional[Dict[str, Callable]] = None) -> bytes:
+    """
+    Objekte als JSON-Liste gemäß Schema serialisieren
+
+    Args:
+        model: Pydantic-Schema, dessen Felder ausgegeben werden
+        items: ORM-Objekte oder Katalog-Einträge
+        overrides: Feldname -> Funktion(obj) für Felder, die nicht als Attribut vorliegen
+    """
+    plan = compile_plan(model)
+    memo: Dict[int, dict] = {}
+    rows = []
+    for item in items:
+        row = _to_dict(item, plan, memo)
+        if overrides:
+            for name, getter in overrides.items():
+                row[name] = getter(item)
+        rows.append(row)
+    return dumps(rows)
+
+
+def dumps(data) -> bytes:
+    """Bereits JSON-fähige Daten (Dicts, Listen, datetime) zu Bytes serialisieren"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return pydantic_core.to_json(data)
+
+
+def json_response(data, response: Response) -> Response:
+    """
+    Daten direkt als fertige Antwort ausliefern (umgeht die response_model-Validierung)
+
+    Die bereits am injizierten Response gesetzten Header (ETag, X-Next-Cursor, ...)
+    werden übernommen, da FastAPI sie auf eine zurückgegebene Response nicht überträgt.
+    """
+    content = data if isinstance(data, bytes) else dumps(data)
+    headers = {name: value for name, value in response.headers.items() if name.lower() != "content-length"}
+    return Response(content=content, media_type="application/json",
+                    headers=headers, status_code=response.status_code or 200)
+
+
+def list_response(model: Type[BaseModel], items: Iterable, response: Response,
+                  overrides: Optional[Dict[str, Callable]] = None) -> Response:
+    """Liste gemäß Schema serialisieren und mit den Headern von response ausliefern"""
+    return json_response(dump_list(model, items, overrides), response)
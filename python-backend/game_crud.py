@@ -5,11 +5,18 @@ Verwaltet Spiele-Datenbank und Entwickler-Content
 """
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy import case, exists, func, select
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Set
 import models
 import schemas
 from datetime import datetime
+from pagination import Keyset, keyset_before, order_desc, total_counts
+import facets
+import game_tags
+import projections
+import search_index
+import library_stats
 
 # ===== GAME CRUD OPERATIONS =====
 
@@ -17,40 +24,191 @@ def get_game_by_id(db: Session, game_id: int) -> Optional[models.Game]:
     """Einzelnes Spiel mit Entwickler-Informationen abrufen"""
     return db.query(models.Game).options(joinedload(models.Game.developer)).filter(models.Game.id == game_id).first()
 
-def get_games(db: Session, skip: int = 0, limit: int = 100, published_only: bool = True) -> List[models.Game]:
+def search_condition(search_term: str):
+    """Filter für die Suche über Titel, Beschreibung und Tags (Volltextindex, sonst ILIKE)"""
+    condition = search_index.match_condition(search_term)
+    if condition is not None:
+        return condition
+    search_pattern = f"%{search_term}%"
+    condition = models.Game.title.ilike(search_pattern) | models.Game.description.ilike(search_pattern)
+    # Tags exakt über den Tag-Index statt als Teilstring von games.tags
+    tag_match = game_tags.tag_condition([search_term])
+    return condition | tag_match if tag_match is not None else condition
+
+def _games_query(db: Session, columns: Optional[list] = None):
+    """ORM-Objekte inkl. Entwickler oder - mit columns (siehe projections) - nur diese Spalten als Zeilen"""
+    if columns is None:
+        return db.query(models.Game).options(joinedload(models.Game.developer))
+    return projections.from_games(db.query(*columns), columns)
+
+def _release_page(query, skip: int, limit: int, after: Optional[Keyset]):
+    """Absteigend nach (release_date, id); mit Cursor per Keyset statt Offset"""
+    query = query.order_by(*order_desc(models.Game.release_date, models.Game.id))
+    if after is not None:
+        query = query.filter(keyset_before(models.Game.release_date, models.Game.id, after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+def get_games(db: Session, skip: int = 0, limit: int = 100, published_only: bool = True,
+              after: Optional[Keyset] = None, columns: Optional[list] = None) -> List[models.Game]:
     """Liste aller Spiele (mit Pagination)"""
-    query = db.query(models.Game).options(joinedload(models.Game.developer))
+    query = _games_query(db, columns)
     
     if published_only:
         query = query.filter(models.Game.is_published == True)
     
-    return query.order_by(models.Game.release_date.desc()).offset(skip).limit(limit).all()
+    return _release_page(query, skip, limit, after)
 
-def get_games_by_developer(db: Session, developer_id: int, include_drafts: bool = False) -> List[models.Game]:
-    """Alle Spiele eines bestimmten Entwicklers"""
-    query = db.query(models.Game).options(joinedload(models.Game.developer)).filter(models.Game.developer_id == developer_id)
+def get_games_by_developer(db: Session, developer_id: int, include_drafts: bool = False,
+                           limit: Optional[int] = None, after: Optional[Keyset] = None,
+                           columns: Optional[list] = None) -> List[models.Game]:
+    """Alle Spiele eines bestimmten Entwicklers, absteigend nach (created_at, id)"""
+    query = _games_query(db, columns).filter(models.Game.developer_id == developer_id)
     
     if not include_drafts:
         query = query.filter(models.Game.is_published == True)
+    if after is not None:
+        query = query.filter(keyset_before(models.Game.created_at, models.Game.id, after))
     
-    return query.order_by(models.Game.created_at.desc()).all()
+    query = query.order_by(*order_desc(models.Game.created_at, models.Game.id))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def get_all_games(db: Session, limit: int = 100, after: Optional[Keyset] = None,
+                  columns: Optional[list] = None) -> List[models.Game]:
+    """Alle Spiele inkl. Entwürfe (Admin), absteigend nach (created_at, id)"""
+    query = _games_query(db, columns)
+    if after is not None:
+        query = query.filter(keyset_before(models.Game.created_at, models.Game.id, after))
+    return query.order_by(*order_desc(models.Game.created_at, models.Game.id)).limit(limit).all()
 
-def get_games_by_genre(db: Session, genre: str, skip: int = 0, limit: int = 50) -> List[models.Game]:
+def get_games_by_ids(db: Session, game_ids: List[int], published_only: bool = True) -> List[models.Game]:
+    """Mehrere Spiele per IN-Abfrage inkl. Entwickler (Reihenfolge beliebig)"""
+    query = _games_query(db).filter(models.Game.id.in_(game_ids))
+    if published_only:
+        query = query.filter(models.Game.is_published == True)
+    return query.all()
+
+def get_games_by_genre(db: Session, genre: str, skip: int = 0, limit: int = 50,
+                       after: Optional[Keyset] = None) -> List[models.Game]:
     """Spiele nach Genre filtern"""
-    return db.query(models.Game).options(joinedload(models.Game.developer)).filter(
+    query = db.query(models.Game).options(joinedload(models.Game.developer)).filter(
         models.Game.genre == genre,
         models.Game.is_published == True
-    ).order_by(models.Game.release_date.desc()).offset(skip).limit(limit).all()
+    )
+    return _release_page(query, skip, limit, after)
 
-def search_games(db: Session, search_term: str, skip: int = 0, limit: int = 50) -> List[models.Game]:
-    """Spiele nach Titel oder Beschreibung durchsuchen"""
-    search_pattern = f"%{search_term}%"
-    return db.query(models.Game).options(joinedload(models.Game.developer)).filter(
-        (models.Game.title.ilike(search_pattern) | 
-         models.Game.description.ilike(search_pattern) |
-         models.Game.tags.ilike(search_pattern)),
+def search_games(db: Session, search_term: str, skip: int = 0, limit: int = 50,
+                 after: Optional[Keyset] = None) -> List[models.Game]:
+    """Spiele nach Titel, Tags oder Beschreibung durchsuchen (nach Relevanz sortiert)"""
+    statement = search_index.ranked_statement(search_term, skip, limit, after)
+    if statement is not None:
+        ranked = db.execute(statement).all()
+        games = db.query(models.Game).options(joinedload(models.Game.developer)).filter(
+            models.Game.id.in_([row.id for row in ranked])
+        ).all()
+        return search_index.order_by_rank(games, ranked)
+    
+    query = db.query(models.Game).options(joinedload(models.Game.developer)).filter(
+        search_condition(search_term),
         models.Game.is_published == True
-    ).order_by(models.Game.release_date.desc()).offset(skip).limit(limit).all()
+    )
+    return _release_page(query, skip, limit, after)
+
+def browse_games(db: Session, browse_filter: facets.BrowseFilter, search: Optional[str] = None,
+                 skip: int = 0, limit: int = 50, after: Optional[Keyset] = None):
+    """Facettierte Suche: Ergebnisseite, Trefferzahl und Facetten (eine GROUP BY-Abfrage)"""
+    base = [search_condition(search)] if search else []
+    base += browse_filter.tag_conditions()
+    query = _games_query(db).filter(models.Game.is_published == True, *base, *browse_filter.conditions())
+    games = _release_page(query, skip, limit, after)
+    total, facet_counts = facets.count_rows(browse_filter, db.execute(facets.facet_statement(browse_filter, base)))
+    return games, total, facet_counts
+
+def count_published_games(db: Session, genre: Optional[str] = None, search: Optional[str] = None) -> int:
+    """Anzahl veröffentlichter Spiele je Filter (zwischengespeichert)"""
+    key = ("published_games", genre, search)
+    total = total_counts.get(key)
+    if total is None:
+        query = db.query(func.count(models.Game.id)).filter(models.Game.is_published == True)
+        if search:
+            query = query.filter(search_condition(search))
+        elif genre:
+            query = query.filter(models.Game.genre == genre)
+        total = query.scalar()
+        total_counts.put(key, total)
+    return total
+
+def get_latest_games(db: Session, limit: int = 10, columns: Optional[list] = None) -> List[models.Game]:
+    """Neueste Spiele (inkl. Entwürfe) nach ID absteigend"""
+    return _games_query(db, columns).order_by(
+        models.Game.id.desc()
+    ).limit(limit).all()
+
+def get_wishlist_games(db: Session, user_id: int) -> List[models.Game]:
+    """Alle Spiele der Wunschliste eines Benutzers (Entwickler gleich mitgeladen)"""
+    return db.query(models.Game).options(joinedload(models.Game.developer)).join(
+        models.wishlist_table, models.wishlist_table.c.game_id == models.Game.id
+    ).filter(models.wishlist_table.c.user_id == user_id).all()
+
+def is_in_wishlist(db: Session, user_id: int, game_id: int) -> bool:
+    """Mitgliedschaft per Primärschlüssel (user_id, game_id) statt die ganze Wunschliste zu laden"""
+    wishlist = models.wishlist_table
+    return db.query(exists().where(wishlist.c.user_id == user_id, wishlist.c.game_id == game_id)).scalar()
+
+def get_wishlist_membership(db: Session, user_id: int, game_ids: List[int]) -> Set[int]:
+    """Welche der Spiele auf der Wunschliste stehen (eine Abfrage über den Primärschlüssel)"""
+    wishlist = models.wishlist_table
+    return set(db.execute(select(wishlist.c.game_id).where(
+        wishlist.c.user_id == user_id, wishlist.c.game_id.in_(game_ids)
+    )).scalars())
+
+def add_to_wishlist(db: Session, user_id: int, game_id: int) -> bool:
+    """Eintrag anlegen; False, wenn das Spiel bereits auf der Wunschliste steht"""
+    if is_in_wishlist(db, user_id, game_id):
+        return False
+    try:
+        db.execute(models.wishlist_table.insert().values(user_id=user_id, game_id=game_id))
+        db.commit()
+    except IntegrityError:
+        # Parallel angelegt (doppelter Primärschlüssel)
+        db.rollback()
+        return False
+    return True
+
+def remove_from_wishlist(db: Session, user_id: int, game_id: int) -> bool:
+    """Eintrag löschen; False, wenn das Spiel nicht auf der Wunschliste stand"""
+    wishlist = models.wishlist_table
+    result = db.execute(wishlist.delete().where(wishlist.c.user_id == user_id, wishlist.c.game_id == game_id))
+    db.commit()
+    return result.rowcount > 0
+
+def wishlist_stats_statement(user_id: int):
+    """Anzahl, kostenlose Spiele und Gesamtwert der Wunschliste als ein Aggregat über wishlist JOIN games"""
+    game = models.Game
+    wishlist = models.wishlist_table
+    is_free = game.is_free == True
+    return select(
+        func.count(game.id),
+        func.sum(case((is_free, 1), else_=0)),
+        func.sum(case((is_free, 0.0), else_=func.coalesce(game.price, 0.0))),
+    ).select_from(wishlist).join(game, game.id == wishlist.c.game_id).where(wishlist.c.user_id == user_id)
+
+def format_wishlist_stats(total_games: int, free_games: Optional[int], total_value: Optional[float]) -> dict:
+    """Format von /wishlist/stats (leere Wunschliste: SUM liefert NULL)"""
+    total_games = total_games or 0
+    free_games = free_games or 0
+    return {
+        "total_games": total_games,
+        "free_games": free_games,
+        "paid_games": total_games - free_games,
+        "total_value": round(total_value or 0.0, 2)
+    }
+
+def get_wishlist_stats(db: Session, user_id: int) -> dict:
+    return format_wishlist_stats(*db.execute(wishlist_stats_statement(user_id)).one())
 
 def create_game(db: Session, game: schemas.GameCreate, developer_id: int) -> models.Game:
     """Neues Spiel erstellen (nur für Entwickler)"""
@@ -156,45 +314,32 @@ def delete_game(db: Session, game_id: int, developer_id: int) -> bool:
 
 # ===== STATISTICS AND ANALYTICS =====
 
+def get_catalog_fingerprint(db: Session) -> tuple:
+    """Billiger Änderungsindikator für öffentliche Listen und Statistiken (ETag)"""
+    published = db.query(
+        func.count(models.Game.id), func.max(models.Game.updated_at), func.sum(models.Game.id)
+    ).filter(models.Game.is_published == True).one()
+    developers = db.query(func.count(models.User.id)).filter(models.User.is_developer == True).scalar()
+    return tuple(published) + (developers,)
+
+def get_latest_games_fingerprint(db: Session) -> tuple:
+    """Änderungsindikator für /games/ über alle Spiele inkl. Entwürfe (ETag)"""
+    return tuple(db.query(
+        func.count(models.Game.id), func.max(models.Game.updated_at), func.sum(models.Game.id)
+    ).one())
+
+def get_wishlist_fingerprint(db: Session, user_id: int) -> list:
+    """(Spiel-ID, updated_at, Entwicklername) der Wunschliste ohne ORM-Objekte (ETag)"""
+    return [tuple(row) for row in db.query(models.Game.id, models.Game.updated_at, models.User.username).join(
+        models.wishlist_table, models.wishlist_table.c.game_id == models.Game.id
+    ).outerjoin(models.User, models.User.id == models.Game.developer_id).filter(
+        models.wishlist_table.c.user_id == user_id
+    ).order_by(models.Game.id)]
+
 def get_library_stats(db: Session) -> dict:
-    """Statistiken der Spielebibliothek"""
-    
-    total_games = db.query(models.Game).filter(models.Game.is_published == True).count()
-    total_developers = db.query(models.User).filter(models.User.is_developer == True).count()
-    
-    # Genre-Verteilung
-    genre_stats = db.query(models.Game.genre, func.count(models.Game.id)).filter(
-        models.Game.is_published == True,
-        models.Game.genre.isnot(None)
-    ).group_by(models.Game.genre).all()
-    
-    # USK-Verteilung
-    usk_stats = db.query(models.Game.usk_rating, func.count(models.Game.id)).filter(
-        models.Game.is_published == True
-    ).group_by(models.Game.usk_rating).all()
-    
-    return {
-        "total_published_games": total_games,
-        "total_developers": total_developers,
-        "genre_distribution": dict(genre_stats),
-        "usk_distribution": dict(usk_stats)
-    }
+    """Statistiken der Spielebibliothek (aus den laufend gepflegten Zählern)"""
+    return library_stats.get_library_stats(db)
 
 def get_developer_stats(db: Session, developer_id: int) -> dict:
-    """Statistiken für einen bestimmten Entwickler"""
-    
-    published_games = db.query(models.Game).filter(
-        models.Game.developer_id == developer_id,
-        models.Game.is_published == True
-    ).count()
-    
-    draft_games = db.query(models.Game).filter(
-        models.Game.developer_id == developer_id,
-        models.Game.is_published == False
-    ).count()
-    
-    return {
-        "published_games": published_games,
-        "draft_games": draft_games,
-        "total_games": published_games + draft_games
-    }
\ No newline at end of file
+    """Statistiken für einen bestimmten Entwickler (aus den laufend gepflegten Zählern)"""
+    return library_stats.get_developer_stats(db, developer_id)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Änderungs-Hooks für Spiele
+Zentrale Stelle, an der abgeleitete Strukturen (Suchindex, Katalog, Zähler) von
+Änderungen an models.Game erfahren - unabhängig davon, welcher Endpunkt sie auslöst.
+
+- on_flush: läuft innerhalb der Transaktion (nach dem Flush, vor dem Commit) und
+  bekommt die Verbindung; Änderungen an Hilfstabellen werden mit committet.
+- on_commit: läuft nach erfolgreichem Commit mit den IDs der geänderten Spiele;
+  für prozesslokale Caches.
+
+Massen-Updates über query.update()/delete() lösen keine Hooks aus.
+"""
+
+import logging
+from typing import Callable, List, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger("game_events")
+
+_flush_listeners: List[Callable] = []
+_commit_listeners: List[Callable] = []
+
+
+def on_flush(listener: Callable):
+    """listener(connection, new_games, changed_games, deleted_games) innerhalb der Transaktion"""
+    _flush_listeners.append(listener)
+    return listener
+
+
+def on_commit(listener: Callable):
+    """listener(game_ids) nach erfolgreichem Commit"""
+    _commit_listeners.append(listener)
+    return listener
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, models.Game)]
+    changed = [obj for obj in session.dirty if isinstance(obj, models.Game)
+               and session.is_modified(obj, include_collections=False)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, models.Game)]
+    if not new and not changed and not deleted:
+        return
+    if _flush_listeners:
+        connection = session.connection()
+        for listener in _flush_listeners:
+            listener(connection, new, changed, deleted)
+    pending: Set[int] = session.info.setdefault("changed_game_ids", set())
+    pending.update(game.id for game in new + changed + deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    game_ids = session.info.pop("changed_game_ids", None)
+    if not game_ids:
+        return
+    for listener in _commit_listeners:
+        try:
+            listener(game_ids)
+        except Exception as e:
+            # Der Commit ist bereits erfolgt - Cache-Fehler dürfen den Request nicht scheitern lassen
+            logger.warning(f"Commit-Hook für Spiele fehlgeschlagen: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop("changed_game_ids", None)
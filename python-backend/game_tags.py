@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Normalisierte Tags (invertierter Index für die Tag-Filterung)
+Das Feld games.tags bleibt die Eingabe der Entwickler (kommagetrennter Freitext). Daraus
+wird beim Flush die Zuordnung game_tags (game_id, tag_id) gepflegt; tags enthält jeden
+Tag-Namen einmal in normalisierter Form.
+
+Der Index ix_game_tags_tag_game (tag_id, game_id) ist die Postings-Liste je Tag: für
+"alle Tags" (UND) wird je Tag ein Index-Bereich gelesen und per INTERSECT geschnitten,
+für "einer der Tags" (ODER) ein IN über die Tag-IDs - beides ohne Scan über games.tags.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import inspect, intersect, select
+from sqlalchemy.engine import Connection, Engine
+
+import game_events
+import models
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_tag(value: str) -> str:
+    return _WHITESPACE.sub(" ", value).strip().casefold()
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """Kommagetrennte Tags normalisieren; Reihenfolge bleibt, Duplikate und Leere entfallen"""
+    if not value:
+        return []
+    names = (normalize_tag(part) for part in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+# ===== PFLEGE =====
+
+def _insert(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def ensure_tags(conn: Connection, names: Iterable[str]) -> Dict[str, int]:
+    """IDs zu Tag-Namen; fehlende Tags werden angelegt (parallele Anlage per ON CONFLICT)"""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    tags = models.Tag.__table__
+    conn.execute(_insert(conn)(tags).values([{"name": name} for name in names])
+                 .on_conflict_do_nothing(index_elements=[tags.c.name]))
+    return dict(conn.execute(select(tags.c.name, tags.c.id).where(tags.c.name.in_(names))).all())
+
+
+def _write_game_tags(conn: Connection, games: Dict[int, List[str]]):
+    """Zuordnungen der angegebenen Spiele vollständig ersetzen"""
+    if not games:
+        return
+    game_tags = models.game_tags_table
+    conn.execute(game_tags.delete().where(game_tags.c.game_id.in_(list(games))))
+    tag_ids = ensure_tags(conn, (name for names in games.values() for name in names))
+    rows = [{"game_id": game_id, "tag_id": tag_ids[name]} for game_id, names in games.items() for name in names]
+    if rows:
+        conn.execute(game_tags.insert(), rows)
+
+
+@game_events.on_flush
+def _sync_tags(conn: Connection, new: List[models.Game], changed: List[models.Game], deleted: List[models.Game]):
+    games = {game.id: parse_tags(game.tags) for game in new}
+    for game in changed:
+        if inspect(game).attrs.tags.history.has_changes():
+            games[game.id] = parse_tags(game.tags)
+    # Gelöschte Spiele: PostgreSQL löscht per ON DELETE CASCADE, SQLite prüft Fremdschlüssel nicht
+    games.update({game.id: [] for game in deleted})
+    _write_game_tags(conn, games)
+
+
+def rebuild(engine: Engine, batch_size: int = 500) -> int:
+    """game_tags für alle Spiele aus games.tags neu aufbauen (in Batches nach ID)"""
+    games = models.Game.__table__
+    processed, last_id = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(games.c.id, games.c.tags).where(games.c.id > last_id).order_by(games.c.id).limit(batch_size)
+            ).all()
+            _write_game_tags(conn, {row.id: parse_tags(row.tags) for row in rows})
+        if not rows:
+            return processed
+        processed += len(rows)
+        last_id = rows[-1].id
+
+
+# ===== ABFRAGEN =====
+
+def tag_condition(names: Iterable[str], match_all: bool = True):
+    """Filter "Spiel hat alle (bzw. einen) der Tags" für beliebige Game-Abfragen"""
+    names = list(dict.fromkeys(normalize_tag(name) for name in names if normalize_tag(name)))
+    if not names:
+        return None
+    game_tags = models.game_tags_table
+    tags = models.Tag.__table__
+    if match_all and len(names) > 1:
+        postings = [
+            select(game_tags.c.game_id).where(
+                game_tags.c.tag_id == select(tags.c.id).where(tags.c.name == name).scalar_subquery()
+            )
+            for name in names
+        ]
+        return models.Game.id.in_(intersect(*postings))
+    return models.Game.id.in_(
+        select(game_tags.c.game_id).where(game_tags.c.tag_id.in_(select(tags.c.id).where(tags.c.name.in_(names))))
+    )
+
+
+def tags_match(tag_set: frozenset, names: Iterable[str], match_all: bool = True) -> bool:
+    """Dieselbe Prüfung für Katalog-Einträge im Speicher"""
+    names = [normalize_tag(name) for name in names if normalize_tag(name)]
+    if not names:
+        return True
+    if match_all:
+        return all(name in tag_set for name in names)
+    return any(name in tag_set for name in names)
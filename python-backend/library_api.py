@@ -4,17 +4,31 @@ Game Library API Endpoints
 Spiele-Bibliothek für Entwickler und Benutzer
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import game_crud
-from database import get_db
+import async_crud
+import search_index
+from facets import BrowseFilter, browse_catalog
+from game_tags import parse_tags
+from suggestions import MAX_SUGGESTIONS, suggestion_index
+from catalog import CATALOG_ENABLED, published_catalog
+from conditional import is_not_modified, make_etag, not_modified, set_validators
+from fast_json import FAST_JSON, json_response, list_response
+from projections import FIELDS_DESCRIPTION, columns, parse_fields, project_all
+from database import get_db, get_read_db
 from auth import get_current_user
+from pagination import DATE_CURSOR, SCORE_CURSOR, decode_cursor, next_cursor, set_page_headers
 
 router = APIRouter(prefix="/library", tags=["games", "library"])
 
+LIBRARY_BATCH_MAX_IDS = int(os.getenv("LIBRARY_BATCH_MAX_IDS", "100"))
+
 # ===== HELPER FUNCTIONS =====
 
 def require_developer(current_user: schemas.User = Depends(get_current_user)):
@@ -28,53 +42,247 @@ def require_developer(current_user: schemas.User = Depends(get_current_user)):
 
 # ===== PUBLIC ENDPOINTS (alle Benutzer) =====
 
+async def _catalog_validators(db):
+    """ETag-Grundlage und Last-Modified: Inhalts-Fingerabdruck des Katalogs oder aus der Datenbank"""
+    if CATALOG_ENABLED:
+        snapshot = await published_catalog.current_async()
+        return ("catalog",) + snapshot.fingerprint, snapshot.last_modified
+    fingerprint = await async_crud.get_catalog_fingerprint(db)
+    return ("db",) + fingerprint, fingerprint[1]
+
+# developer_name liegt bei ORM-Objekten nur über die Beziehung vor
+_SUMMARY_OVERRIDES = {"developer_name": lambda game: game.developer.username}
+
+def _summary(game) -> schemas.GameSummary:
+    """ORM-Objekt oder Katalog-Eintrag in eine GameSummary umwandeln"""
+    return schemas.GameSummary(
+        id=game.id,
+        title=game.title,
+        genre=game.genre,
+        usk_rating=game.usk_rating,
+        price=game.price,
+        developer_name=game.developer.username,
+        is_published=game.is_published,
+        release_date=game.release_date
+    )
+
 @router.get("/", response_model=List[schemas.GameSummary])
-def get_public_games(
-    skip: int = Query(0, ge=0, description="Anzahl zu überspringender Einträge"),
+async def get_public_games(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Anzahl zu überspringender Einträge (veraltet, besser cursor)"),
     limit: int = Query(50, ge=1, le=100, description="Maximale Anzahl zurückgegebener Einträge"),
     genre: Optional[str] = Query(None, description="Nach Genre filtern"),
     search: Optional[str] = Query(None, description="Suchbegriff für Titel/Beschreibung"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor aus X-Next-Cursor für die nächste Seite"),
+    db = Depends(get_read_db)
 ):
     """
     Öffentliche Spielebibliothek - alle veröffentlichten Spiele
     Verfügbar für alle Benutzer (auch ohne Login)
+    
+    Weitere Seiten über den Header X-Next-Cursor abrufen; X-Total-Count enthält
+    die (kurzzeitig zwischengespeicherte) Gesamtzahl. Ohne Suchbegriff wird aus dem
+    Katalog-Snapshot im Speicher geantwortet. Mit If-None-Match antwortet der
+    Endpunkt 304, solange sich der Katalog nicht geändert hat.
     """
     
+    ranked = bool(search) and search_index.is_ranked(search)
+    after = decode_cursor(cursor, SCORE_CURSOR if ranked else DATE_CURSOR)
+    version, last_modified = await _catalog_validators(db)
+    etag = make_etag("library", version, request.url.query)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    
     if search:
-        games = game_crud.search_games(db, search, skip, limit)
+        games = await async_crud.search_games(db, search, skip, limit, after)
+        total = await async_crud.count_published_games(db, genre, search)
+    elif CATALOG_ENABLED:
+        snapshot = await published_catalog.current_async()
+        games, total = snapshot.games(skip, limit, genre, after)
+        response.headers["X-Catalog-Version"] = str(snapshot.version)
     elif genre:
-        games = game_crud.get_games_by_genre(db, genre, skip, limit)
+        games = await async_crud.get_games_by_genre(db, genre, skip, limit, after)
+        total = await async_crud.count_published_games(db, genre, search)
     else:
-        games = game_crud.get_games(db, skip, limit, published_only=True)
-    
-    # Konvertiere zu GameSummary
-    game_summaries = []
-    for game in games:
-        game_summaries.append(schemas.GameSummary(
-            id=game.id,
-            title=game.title,
-            genre=game.genre,
-            usk_rating=game.usk_rating,
-            price=game.price,
-            developer_name=game.developer.username,
-            is_published=game.is_published,
-            release_date=game.release_date
-        ))
-    
-    return game_summaries
+        games = await async_crud.get_games(db, skip, limit, published_only=True, after=after)
+        total = await async_crud.count_published_games(db, genre, search)
+    
+    set_page_headers(response, next_cursor(games, limit, "search_rank" if ranked else "release_date"), total)
+    
+    if FAST_JSON:
+        return list_response(schemas.GameSummary, games, response, _SUMMARY_OVERRIDES)
+    
+    return [_summary(game) for game in games]
+
+@router.get("/browse", response_model=schemas.BrowseResult)
+async def browse_games(
+    request: Request,
+    response: Response,
+    genre: List[str] = Query([], description="Genres (mehrfach angeben für ODER)"),
+    usk_rating: List[str] = Query([], description="USK-Stufen (mehrfach angeben für ODER)"),
+    platform: List[str] = Query([], description="Plattformen (mehrfach angeben für ODER)"),
+    is_free: Optional[bool] = Query(None, description="Nur kostenlose bzw. kostenpflichtige Spiele"),
+    min_price: Optional[float] = Query(None, ge=0, description="Mindestpreis in Euro"),
+    max_price: Optional[float] = Query(None, ge=0, description="Höchstpreis in Euro"),
+    search: Optional[str] = Query(None, description="Suchbegriff für Titel/Beschreibung/Tags"),
+    tags: Optional[str] = Query(None, description="Kommagetrennte Tags, z.B. pixel art,koop"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="all: alle Tags (UND), any: einer der Tags (ODER)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor aus X-Next-Cursor für die nächste Seite"),
+    db = Depends(get_read_db)
+):
+    """
+    Facettierte Suche in der öffentlichen Bibliothek
+    Kombinierbare Filter; liefert die Ergebnisseite und für jede Facette die Trefferzahl
+    je Wert (gezählt mit allen übrigen Filtern). Tags filtern exakt über den Tag-Index.
+    Ohne Suchbegriff aus dem Katalog-Snapshot.
+    """
+    
+    after = decode_cursor(cursor, DATE_CURSOR)
+    browse_filter = BrowseFilter(genre, usk_rating, platform, is_free, min_price, max_price,
+                                 parse_tags(tags), tag_mode == "all")
+    version, last_modified = await _catalog_validators(db)
+    etag = make_etag("browse", version, browse_filter.key(), search, skip, limit, cursor)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    
+    if CATALOG_ENABLED and not search:
+        snapshot = await published_catalog.current_async()
+        games, total, facet_counts = browse_catalog(snapshot, browse_filter, skip, limit, after)
+        response.headers["X-Catalog-Version"] = str(snapshot.version)
+    else:
+        games, total, facet_counts = await async_crud.browse_games(db, browse_filter, search, skip, limit, after)
+    
+    set_page_headers(response, next_cursor(games, limit, "release_date"), total)
+    return {"games": [_summary(game) for game in games], "total": total, "facets": facet_counts}
+
+@router.get("/suggest", response_model=List[schemas.Suggestion])
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="Bisher eingegebener Text"),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS)
+):
+    """
+    Autovervollständigung über Titel, Tags und Entwickler veröffentlichter Spiele
+    Antwortet aus dem zuletzt aufgebauten Index ohne Katalog- oder Datenbankzugriff,
+    beliebteste Treffer zuerst. Der Index entsteht nur im Hintergrund (Start, Commits).
+    """
+    
+    if not CATALOG_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vorschläge benötigen den Katalog-Snapshot (CATALOG_ENABLED)"
+        )
+    if not suggestion_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vorschlagsindex wird noch aufgebaut",
+            headers={"Retry-After": "5"}
+        )
+    return suggestion_index.suggest(q, limit)
+
+def _batch_ids(ids: List[int]) -> List[int]:
+    """Duplikate entfernen (Reihenfolge bleibt) und die Obergrenze prüfen"""
+    unique = list(dict.fromkeys(ids))
+    if not unique:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Keine Spiel-IDs angegeben")
+    if len(unique) > LIBRARY_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximal {LIBRARY_BATCH_MAX_IDS} Spiel-IDs pro Abruf"
+        )
+    return unique
+
+async def _load_batch(db, game_ids: List[int]) -> dict:
+    """Veröffentlichte Spiele aus dem Katalog, Rest mit einer IN-Abfrage; nicht gefundene in missing"""
+    found = {}
+    if CATALOG_ENABLED:
+        snapshot = await published_catalog.current_async()
+        for game_id in game_ids:
+            game = snapshot.get(game_id)
+            if game is not None:
+                found[game_id] = game
+    remaining = [game_id for game_id in game_ids if game_id not in found]
+    if remaining:
+        for game in await async_crud.get_games_by_ids(db, remaining):
+            found[game.id] = game
+    return {
+        "games": [found[game_id] for game_id in game_ids if game_id in found],
+        "missing": [game_id for game_id in game_ids if game_id not in found],
+    }
+
+@router.get("/batch", response_model=schemas.GameBatch)
+async def get_games_batch(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Kommagetrennte Spiel-IDs, z.B. 1,2,3"),
+    db = Depends(get_read_db)
+):
+    """
+    Mehrere veröffentlichte Spiele in einem Abruf
+    Nicht vorhandene oder unveröffentlichte Spiele werden in missing gemeldet.
+    Für lange ID-Listen gibt es POST /library/batch.
+    """
+    
+    try:
+        game_ids = _batch_ids([int(value) for value in ids.split(",") if value.strip()])
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids muss eine kommagetrennte Liste von Spiel-IDs sein"
+        )
+    
+    version, last_modified = await _catalog_validators(db)
+    etag = make_etag("batch", game_ids, version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    if CATALOG_ENABLED:
+        response.headers["X-Catalog-Version"] = str(published_catalog.version)
+    
+    return await _load_batch(db, game_ids)
+
+@router.post("/batch", response_model=schemas.GameBatch)
+async def post_games_batch(
+    batch: schemas.GameBatchRequest,
+    db = Depends(get_read_db)
+):
+    """
+    Mehrere veröffentlichte Spiele in einem Abruf (IDs im Request-Body)
+    """
+    
+    return await _load_batch(db, _batch_ids(batch.ids))
 
 @router.get("/{game_id}", response_model=schemas.Game)
-def get_game_details(
+async def get_game_details(
     game_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db = Depends(get_read_db)
 ):
     """
     Detailansicht eines Spiels
     Verfügbar für alle Benutzer
     """
     
-    game = game_crud.get_game_by_id(db, game_id)
+    version, last_modified = await _catalog_validators(db)
+    etag = make_etag("game", game_id, version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    if CATALOG_ENABLED:
+        snapshot = await published_catalog.current_async()
+        response.headers["X-Catalog-Version"] = str(snapshot.version)
+        game = snapshot.get(game_id)
+        if game is not None:
+            set_validators(response, etag, last_modified)
+            return game
+    
+    # Nicht im Katalog: Entwurf oder unbekannt - Datenbank liefert die genaue Fehlermeldung
+    game = await async_crud.get_game_by_id(db, game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,14 +295,21 @@ def get_game_details(
             detail="Spiel ist nicht veröffentlicht"
         )
     
+    set_validators(response, etag, last_modified)
     return game
 
 @router.get("/stats/overview")
-def get_library_overview(db: Session = Depends(get_db)):
+async def get_library_overview(request: Request, response: Response, db = Depends(get_read_db)):
     """
     Öffentliche Bibliotheksstatistiken
     """
-    return game_crud.get_library_stats(db)
+    # Die Zählerzeilen sind zugleich Inhalt und ETag-Grundlage - eine Abfrage für beides
+    stats = await async_crud.get_library_stats(db)
+    etag = make_etag("library-stats", stats)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return stats
 
 # ===== DEVELOPER ENDPOINTS (nur Entwickler) =====
 
@@ -119,15 +334,27 @@ def create_new_game(
 
 @router.get("/developer/games", response_model=List[schemas.Game])
 def get_my_games(
+    response: Response,
     include_drafts: bool = Query(True, description="Entwürfe einschließen"),
+    limit: int = Query(100, ge=1, le=200, description="Maximale Anzahl zurückgegebener Einträge"),
+    cursor: Optional[str] = Query(None, description="Cursor aus X-Next-Cursor für die nächste Seite"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: schemas.User = Depends(require_developer),
     db: Session = Depends(get_db)
 ):
     """
-    Alle Spiele des aktuellen Entwicklers
+    Alle Spiele des aktuellen Entwicklers (neueste zuerst, seitenweise)
     """
     
-    games = game_crud.get_games_by_developer(db, current_user.id, include_drafts)
+    selected = parse_fields(fields)
+    games = game_crud.get_games_by_developer(db, current_user.id, include_drafts, limit,
+                                             decode_cursor(cursor, DATE_CURSOR),
+                                             columns(selected, "created_at") if selected else None)
+    set_page_headers(response, next_cursor(games, limit, "created_at"))
+    if selected:
+        return json_response(project_all(games, selected), response)
+    if FAST_JSON:
+        return list_response(schemas.Game, games, response)
     return games
 
 @router.put("/developer/games/{game_id}", response_model=schemas.Game)
@@ -208,9 +435,12 @@ def get_my_developer_stats(
 
 @router.get("/admin/all-games", response_model=List[schemas.Game])
 def get_all_games_admin(
+    response: Response,
     include_unpublished: bool = Query(False, description="Unveröffentlichte Spiele einschließen"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor aus X-Next-Cursor für die nächste Seite"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: schemas.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -224,7 +454,15 @@ def get_all_games_admin(
             detail="Nur Administratoren haben Zugriff"
         )
     
-    games = game_crud.get_games(db, skip, limit, published_only=not include_unpublished)
+    selected = parse_fields(fields)
+    games = game_crud.get_games(db, skip, limit, published_only=not include_unpublished,
+                                after=decode_cursor(cursor, DATE_CURSOR),
+                                columns=columns(selected, "release_date") if selected else None)
+    set_page_headers(response, next_cursor(games, limit, "release_date"))
+    if selected:
+        return json_response(project_all(games, selected), response)
+    if FAST_JSON:
+        return list_response(schemas.Game, games, response)
     return games
 
 @router.delete("/admin/games/{game_id}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Laufend gepflegte Statistik-Zähler
+Statt bei jedem Aufruf von /library/stats/overview und /library/developer/stats über
+games und users zu zählen und zu gruppieren, liegen die Ergebnisse in stat_counters:
+
+    scope                 name            value
+    library               published_games Anzahl veröffentlichter Spiele
+    library               developers      Anzahl Entwickler
+    genre                 <Genre>         veröffentlichte Spiele je Genre
+    usk                   <USK-Stufe>     veröffentlichte Spiele je USK-Stufe
+    developer_published   <Entwickler-ID> veröffentlichte Spiele des Entwicklers
+    developer_draft       <Entwickler-ID> Entwürfe des Entwicklers
+
+Die Zähler werden beim Flush in derselben Transaktion wie die Änderung angepasst
+(Differenz aus altem und neuem Zustand). Ein Abgleich-Job rechnet sie regelmäßig
+neu aus und repariert Abweichungen, z.B. nach Massen-Updates an den Hooks vorbei.
+"""
+
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+import game_events
+import models
+from database import SessionLocal
+
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "900"))
+
+logger = logging.getLogger("library_stats")
+
+CounterKey = Tuple[str, str]
+LIBRARY_SCOPES = ("library", "genre", "usk")
+
+# Attribute, deren Änderung Zähler verschiebt
+_TRACKED = {
+    models.Game: ("is_published", "genre", "usk_rating", "developer_id"),
+    models.User: ("is_developer",),
+}
+_OLD_VALUES = "stat_old_values"
+
+# ===== ZÄHLER-ÄNDERUNGEN =====
+
+def _contributions(published: bool, genre: Optional[str], usk_rating: Optional[str],
+                   developer_id: int) -> List[CounterKey]:
+    """Zähler, zu denen ein Spiel in diesem Zustand je 1 beiträgt"""
+    if not published:
+        return [("developer_draft", str(developer_id))]
+    keys = [("library", "published_games"), ("developer_published", str(developer_id))]
+    if genre is not None:
+        keys.append(("genre", genre))
+    if usk_rating is not None:
+        keys.append(("usk", usk_rating))
+    return keys
+
+@event.listens_for(Session, "before_flush")
+def _load_old_values(session: Session, flush_context, instances):
+    """
+    Altwerte sichern, die nach dem Flush nicht mehr rekonstruierbar wären
+
+    Wird ein abgelaufenes Attribut (z.B. nach einem Commit) gesetzt, kennt SQLAlchemy den
+    alten Wert nicht (NO_VALUE in committed_state). Solange die Zeile noch unverändert ist,
+    wird er hier mit einer Abfrage je Modell nachgelesen.
+    """
+    old_values = session.info[_OLD_VALUES] = {}
+    for obj in session.deleted:
+        for name in _TRACKED.get(type(obj), ()):
+            getattr(obj, name)
+    missing: Dict[type, List[int]] = {}
+    for obj in session.dirty:
+        names = _TRACKED.get(type(obj), ())
+        committed = inspect(obj).committed_state
+        if any(committed.get(name) is NO_VALUE for name in names):
+            missing.setdefault(type(obj), []).append(obj.id)
+    for model, ids in missing.items():
+        names = _TRACKED[model]
+        rows = session.connection().execute(
+            select(model.id, *[getattr(model, name) for name in names]).where(model.id.in_(ids))
+        )
+        for row in rows:
+            old_values[(model, row[0])] = dict(zip(names, row[1:]))
+
+def _old_value(obj, name: str):
+    """Wert vor dieser Änderung; committed_state enthält nur geänderte Attribute"""
+    state = inspect(obj)
+    if name not in state.committed_state:
+        return getattr(obj, name)
+    value = state.committed_state[name]
+    if value is NO_VALUE:
+        value = state.session.info[_OLD_VALUES][(type(obj), obj.id)][name]
+    return value
+
+def _game_state(game: models.Game, old: bool) -> List[CounterKey]:
+    if old:
+        values = [_old_value(game, name) for name in _TRACKED[models.Game]]
+    else:
+        values = [game.is_published, game.genre, game.usk_rating, game.developer_id]
+    return _contributions(bool(values[0]), values[1], values[2], values[3])
+
+def _apply_deltas(conn: Connection, deltas: Counter):
+    """Differenzen per Upsert (ON CONFLICT) addieren - SQLite und PostgreSQL"""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = models.StatCounter.__table__
+    rows = [{"scope": scope, "name": name, "value": delta} for (scope, name), delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    # Ein Statement für alle Zähler; sortiert, damit parallele Transaktionen in gleicher Reihenfolge sperren
+    statement = insert(table).values(rows)
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.name],
+        set_={"value": table.c.value + statement.excluded.value},
+    ))
+
+@game_events.on_flush
+def _track_games(conn: Connection, new: List[models.Game], changed: List[models.Game], deleted: List[models.Game]):
+    deltas = Counter()
+    for game in new:
+        deltas.update(_game_state(game, old=False))
+    for game in changed:
+        deltas.subtract(_game_state(game, old=True))
+        deltas.update(_game_state(game, old=False))
+    for game in deleted:
+        deltas.subtract(_game_state(game, old=True))
+    _apply_deltas(conn, deltas)
+
+@event.listens_for(Session, "after_flush")
+def _track_developers(session: Session, flush_context):
+    delta = 0
+    for user in session.new:
+        if isinstance(user, models.User) and user.is_developer:
+            delta += 1
+    for user in session.dirty:
+        if isinstance(user, models.User) and "is_developer" in inspect(user).committed_state:
+            delta += int(bool(user.is_developer)) - int(bool(_old_value(user, "is_developer")))
+    for user in session.deleted:
+        if isinstance(user, models.User) and user.is_developer:
+            delta -= 1
+    if delta:
+        _apply_deltas(session.connection(), Counter({("library", "developers"): delta}))
+
+# ===== LESEN =====
+
+def format_library_stats(rows) -> dict:
+    """Zeilen (scope, name, value) in das Format von /library/stats/overview bringen"""
+    counters: Dict[str, Dict[str, int]] = {"library": {}, "genre": {}, "usk": {}}
+    for scope, name, value in rows:
+        if value > 0 or scope == "library":
+            counters[scope][name] = value
+    return {
+        "total_published_games": counters["library"].get("published_games", 0),
+        "total_developers": counters["library"].get("developers", 0),
+        "genre_distribution": counters["genre"],
+        "usk_distribution": counters["usk"],
+    }
+
+def format_developer_stats(rows) -> dict:
+    values = {scope: value for scope, value in rows}
+    published = values.get("developer_published", 0)
+    drafts = values.get("developer_draft", 0)
+    return {
+        "published_games": published,
+        "draft_games": drafts,
+        "total_games": published + drafts,
+    }
+
+def get_library_stats(db: Session) -> dict:
+    counter = models.StatCounter
+    rows = db.query(counter.scope, counter.name, counter.value).filter(
+        counter.scope.in_(LIBRARY_SCOPES)
+    ).order_by(counter.scope, counter.name).all()
+    return format_library_stats(rows)
+
+def get_developer_stats(db: Session, developer_id: int) -> dict:
+    counter = models.StatCounter
+    rows = db.query(counter.scope, counter.value).filter(
+        counter.scope.in_(("developer_published", "developer_draft")),
+        counter.name == str(developer_id)
+    ).all()
+    return format_developer_stats(rows)
+
+# ===== ABGLEICH =====
+
+def compute_counters(db: Session) -> Dict[CounterKey, int]:
+    """Alle Zähler vollständig aus games und users berechnen"""
+    game = models.Game
+    expected: Dict[CounterKey, int] = {
+        ("library", "published_games"): db.query(func.count(game.id)).filter(game.is_published == True).scalar(),
+        ("library", "developers"): db.query(func.count(models.User.id)).filter(models.User.is_developer == True).scalar(),
+    }
+    for genre, count in db.query(game.genre, func.count(game.id)).filter(
+        game.is_published == True, game.genre.isnot(None)
+    ).group_by(game.genre):
+        expected[("genre", genre)] = count
+    for usk_rating, count in db.query(game.usk_rating, func.count(game.id)).filter(
+        game.is_published == True, game.usk_rating.isnot(None)
+    ).group_by(game.usk_rating):
+        expected[("usk", usk_rating)] = count
+    for developer_id, published, count in db.query(
+        game.developer_id, game.is_published, func.count(game.id)
+    ).group_by(game.developer_id, game.is_published):
+        scope = "developer_published" if published else "developer_draft"
+        expected[(scope, str(developer_id))] = expected.get((scope, str(developer_id)), 0) + count
+    return expected
+
+def reconcile(db: Session) -> int:
+    """Zähler neu berechnen und Abweichungen korrigieren; liefert die Zahl reparierter Zähler"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Schreibende Transaktionen warten, damit kein Inkrement zwischen Zählen und Korrektur verloren geht
+        db.execute(text("LOCK TABLE stat_counters IN EXCLUSIVE MODE"))
+    expected = compute_counters(db)
+    actual = {(row.scope, row.name): row for row in db.query(models.StatCounter)}
+    repaired = 0
+    for key in set(expected) | set(actual):
+        value = expected.get(key, 0)
+        row = actual.get(key)
+        if row is None:
+            db.add(models.StatCounter(scope=key[0], name=key[1], value=value))
+        elif row.value != value:
+            row.value = value
+        else:
+            continue
+        repaired += 1
+    db.commit()
+    return repaired
+
+def _reconcile_loop(stop_event: threading.Event):
+    while not stop_event.wait(STATS_RECONCILE_SECONDS):
+        db = SessionLocal()
+        try:
+            repaired = reconcile(db)
+            if repaired:
+                logger.warning(f"{repaired} Statistik-Zähler korrigiert")
+        except Exception as e:
+            logger.warning(f"Abgleich der Statistik-Zähler fehlgeschlagen: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+_reconciler_stop = threading.Event()
+
+def start_reconciler():
+    """Periodischen Abgleich im Hintergrund-Thread starten"""
+    if STATS_RECONCILE_SECONDS <= 0:
+        return
+    thread = threading.Thread(target=_reconcile_loop, args=(_reconciler_stop,), name="stats-reconciler", daemon=True)
+    thread.start()
+
+def stop_reconciler():
+    _reconciler_stop.set()
@@ -20,9 +20,10 @@ Module:
 - legacy_compat_api: Vereinfachte API für Frontend-Kompatibilität
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, File, UploadFile
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from fastapi.middleware.cors import CORSMiddleware
@@ -40,13 +41,32 @@ import library_api
 # import legacy_compat_api
 # # import simple_games_api
 import wishlist_api  # Wunschliste-API hinzufügen
-from database import engine, get_db
-from security import SECRET_KEY, ALGORITHM, create_access_token, verify_password
+import async_crud
+import game_crud
+from database import engine, get_db, get_read_db, get_pool_stats, note_write
+from security import SECRET_KEY, ALGORITHM, create_access_token, verify_password, calibrate_bcrypt_rounds
 from export_service import UserExportService
 from auth import get_current_user
-
-# Erstelle die Datenbanktabellen
-models.Base.metadata.create_all(bind=engine)
+from auth_cache import principal_cache
+from password_pool import password_pool, PasswordPoolFull
+from rate_limit import login_rate_limiter, client_ip, LoginRateLimited
+import session_store
+import library_stats
+from revocation import revocation_store
+from catalog import CATALOG_ENABLED, published_catalog
+from suggestions import suggestion_index
+from fast_json import FAST_JSON, json_response, list_response
+from projections import FIELDS_DESCRIPTION, InvalidFields, columns, parse_fields, project_all
+from conditional import is_not_modified, make_etag, not_modified, set_validators
+from pagination import DATE_CURSOR, InvalidCursor, decode_cursor, next_cursor, set_page_headers
+import migrations
+import search_index
+import sql_instrumentation
+from sql_instrumentation import sql_metrics
+
+# Erstelle die Datenbanktabellen und wende ausstehende Migrationen an
+migrations.upgrade(engine)
+search_index.configure(engine)
 
 # Erstelle Ordner für Avatare und Exports
 AVATAR_DIR = "avatars"
@@ -68,6 +88,29 @@ app = FastAPI(
     },
 )
 
+@app.on_event("startup")
+def calibrate_password_hashing():
+    """bcrypt-Kostenfaktor an das konfigurierte Latenzbudget anpassen (BCRYPT_HASH_BUDGET_MS)"""
+    rounds = calibrate_bcrypt_rounds()
+    if rounds is not None:
+        print(f"🔐 bcrypt-Kostenfaktor kalibriert: {rounds} Runden")
+
+@app.on_event("startup")
+def start_background_jobs():
+    """Periodische Bereinigung abgelaufener Refresh-Sitzungen und Statistik-Abgleich starten, Katalog-Snapshot aufbauen"""
+    session_store.start_sweeper()
+    library_stats.start_reconciler()
+    published_catalog.start()
+    if CATALOG_ENABLED:
+        suggestion_index.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    session_store.stop_sweeper()
+    library_stats.stop_reconciler()
+    published_catalog.stop()
+    suggestion_index.stop()
+
 # Static files für Avatare
 app.mount("/avatars", StaticFiles(directory=AVATAR_DIR), name="avatars")
 
@@ -78,8 +121,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Catalog-Version", "ETag"],
 )
 
+# Read-your-writes: nach eigenen Änderungen liest ein Client kurzzeitig vom Primary
+@app.middleware("http")
+async def track_client_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        note_write(request)
+    return response
+
+# SQL-Statements pro Request zählen (opt-in, sonst keine zusätzliche Middleware-Schicht)
+async def instrument_sql(request: Request, call_next):
+    stats = sql_instrumentation.begin_request()
+    try:
+        response = await call_next(request)
+    finally:
+        sql_instrumentation.end_request(request.url.path, stats)
+    # DB-Laufzeiten nur im Debug-Betrieb an Clients geben
+    if sql_instrumentation.SQL_SERVER_TIMING:
+        response.headers.append("Server-Timing", stats.server_timing())
+    return response
+
+if sql_instrumentation.SQL_INSTRUMENTATION:
+    app.middleware("http")(instrument_sql)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # Health Check Endpoint für Docker
@@ -101,20 +168,95 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", summary="Laufzeit-Metriken", tags=["System"])
+def get_metrics(current_user: schemas.User = Depends(get_current_user)):
+    """
+    Laufzeit-Metriken abrufen (nur Administratoren)
+    
+    Liefert interne Zähler der Backend-Komponenten (z.B. Cache-Trefferquoten)
+    für Monitoring und Lasttests.
+    
+    Args:
+        current_user (User): Aktuell authentifizierter Benutzer (muss Admin sein)
+        
+    Returns:
+        dict: Metriken je Komponente
+        
+    Raises:
+        HTTPException: 403 wenn Benutzer kein Administrator ist
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Nur Administratoren können Metriken abrufen"
+        )
+    
+    return {
+        "auth_cache": principal_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "login_rate_limiter": login_rate_limiter.stats(),
+        "token_revocation": revocation_store.stats(),
+        "db_pool": get_pool_stats(),
+        "sql": sql_metrics.stats(),
+        "catalog": published_catalog.stats(),
+        "suggestions": suggestion_index.stats()
+    }
+
+@app.exception_handler(PasswordPoolFull)
+def password_pool_full_handler(request, exc: PasswordPoolFull):
+    """Überlasteter Passwort-Pool: Client soll es später erneut versuchen"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Anmeldedienst ausgelastet, bitte später erneut versuchen"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(LoginRateLimited)
+def login_rate_limited_handler(request, exc: LoginRateLimited):
+    """Zu viele Fehlversuche für Benutzername oder IP"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Zu viele fehlgeschlagene Anmeldeversuche, bitte später erneut versuchen"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(InvalidFields)
+def invalid_fields_handler(request, exc: InvalidFields):
+    """Unbekannter Feldname in fields="""
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
+@app.exception_handler(InvalidCursor)
+def invalid_cursor_handler(request, exc: InvalidCursor):
+    """Beschädigter oder fremder Pagination-Cursor"""
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
 app.include_router(auth.router)
 
 # JSON-Login für Frontend (kompatibel mit Legacy)
 @app.post("/login-json", summary="JSON Login", tags=["Auth"])
-def login_json(credentials: dict, db: Session = Depends(get_db)):
+async def login_json(
+    credentials: dict,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """
     JSON-basiertes Login für Frontend-Kompatibilität
     
     Args:
         credentials (dict): {"username": str, "password": str}
+        request (Request): Für die Client-IP des Rate-Limiters
+        background_tasks (BackgroundTasks): Für das Erneuern veralteter Passwort-Hashes
         db (Session): Datenbank-Session
         
     Returns:
-        dict: Token und Benutzerdaten
+        dict: Access-Token, Refresh-Token und Benutzerdaten
     """
     username = credentials.get("username")
     password = credentials.get("password")
@@ -125,23 +267,31 @@ def login_json(credentials: dict, db: Session = Depends(get_db)):
             detail="Username und Password erforderlich"
         )
     
-    # Benutzer authentifizieren
-    user = crud.get_user_by_username(db, username=username)
-    if not user or not verify_password(password, user.hashed_password):
+    # Versuch vorab zählen; zu viele Fehlversuche: ablehnen, bevor bcrypt-Arbeit anfällt
+    ip = client_ip(request)
+    attempt = await run_in_threadpool(login_rate_limiter.begin, username, ip)
+    
+    # Benutzer authentifizieren (bcrypt läuft im begrenzten Passwort-Pool)
+    user = await run_in_threadpool(crud.get_user_by_username, db, username=username)
+    if not user or not await password_pool.verify_password(password, user.hashed_password):
+        # Der Fehlversuch ist bereits in begin gezählt
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Ungültige Anmeldedaten"
         )
+    await run_in_threadpool(login_rate_limiter.record_success, attempt)
+    
+    # Veraltete Hashes (z.B. simple_hash_ oder alter Kostenfaktor) im Hintergrund erneuern
+    auth.schedule_rehash(background_tasks, user, password)
     
     # Token erstellen
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = await run_in_threadpool(auth.create_user_access_token, db, user)
+    refresh_token = await run_in_threadpool(session_store.create_refresh_session, db, user.id)
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
+        "refresh_token": refresh_token,
         "user": {
             "id": user.id,
             "username": user.username,
@@ -217,35 +367,60 @@ def create_game(
     return db_game
 
 @app.get("/games/", response_model=list[schemas.Game], summary="Neueste Spiele abrufen", tags=["Games"])
-def get_games(db: Session = Depends(get_db)):
+async def get_games(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db = Depends(get_read_db)
+):
     """
     Die 10 neuesten verfügbaren Spiele abrufen
     
-    Gibt eine Liste der 10 neuesten Spiele in der Datenbank zurück, sortiert nach
-    Erstellungsdatum (neueste zuerst). Diese Funktion benötigt keine Authentifizierung
-    und ist öffentlich zugänglich.
+    Gibt eine Liste der 10 neuesten Spiele zurück (inklusive noch nicht veröffentlichter
+    Entwürfe), sortiert nach Erstellungsreihenfolge (neueste zuerst). Der Katalog-Snapshot
+    enthält nur veröffentlichte Spiele, daher kommt diese Liste immer aus der Datenbank.
+    Diese Funktion benötigt keine Authentifizierung und ist öffentlich zugänglich.
     
     Args:
+        fields (str, optional): Nur diese Felder ausliefern (schlanke Projektion)
         db (Session): Datenbank-Session
         
     Returns:
-        list[Game]: Liste der 10 neuesten verfügbaren Spiele
-    """
-    games = db.query(models.Game).order_by(models.Game.id.desc()).limit(10).all()
+        list[Game]: Liste der 10 neuesten Spiele (304 bei passendem If-None-Match)
+    """
+    selected = parse_fields(fields)
+    fingerprint = await async_crud.get_latest_games_fingerprint(db)
+    etag = make_etag("games", fingerprint, selected)
+    if is_not_modified(request, etag, fingerprint[1]):
+        return not_modified(etag, fingerprint[1])
+    set_validators(response, etag, fingerprint[1])
+    games = await async_crud.get_latest_games(db, limit=10, columns=columns(selected) if selected else None)
+    if selected:
+        return json_response(project_all(games, selected), response)
+    if FAST_JSON:
+        return list_response(schemas.Game, games, response)
     return games
 
 @app.get("/admin/games/", response_model=list[schemas.Game], summary="Alle Spiele für Admin abrufen", tags=["Admin"])
 def get_all_games_admin(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Maximale Anzahl zurückgegebener Einträge"),
+    cursor: Optional[str] = Query(None, description="Cursor aus X-Next-Cursor für die nächste Seite"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: schemas.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Alle verfügbaren Spiele für Administratoren abrufen
     
-    Gibt eine Liste aller Spiele in der Datenbank zurück. Diese Funktion
-    ist nur für Administratoren zugänglich.
+    Gibt alle Spiele in der Datenbank seitenweise zurück (neueste zuerst).
+    Weitere Seiten über den Header X-Next-Cursor. Diese Funktion ist nur für
+    Administratoren zugänglich.
     
     Args:
+        limit (int): Maximale Anzahl Spiele pro Seite
+        cursor (str, optional): Cursor der vorherigen Seite
+        fields (str, optional): Nur diese Felder ausliefern (schlanke Projektion)
         current_user (User): Aktuell authentifizierter Benutzer (muss Admin sein)
         db (Session): Datenbank-Session
         
@@ -258,7 +433,14 @@ def get_all_games_admin(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Nur Administratoren können auf alle Spiele zugreifen")
     
-    games = db.query(models.Game).all()
+    selected = parse_fields(fields)
+    games = game_crud.get_all_games(db, limit, decode_cursor(cursor, DATE_CURSOR),
+                                    columns(selected, "created_at") if selected else None)
+    set_page_headers(response, next_cursor(games, limit, "created_at"))
+    if selected:
+        return json_response(project_all(games, selected), response)
+    if FAST_JSON:
+        return list_response(schemas.Game, games, response)
     return games
 
 @app.delete("/games/{game_id}", summary="Spiel löschen", tags=["Games"])
@@ -354,9 +536,9 @@ def update_game(
     return game
 
 @app.get("/games/{game_id}", response_model=schemas.Game, summary="Einzelnes Spiel abrufen", tags=["Games"])
-def get_game_by_id(
+async def get_game_by_id(
     game_id: int,
-    db: Session = Depends(get_db)
+    db = Depends(get_read_db)
 ):
     """
     Einzelnes Spiel nach ID abrufen
@@ -373,7 +555,7 @@ def get_game_by_id(
     Raises:
         HTTPException: 404 wenn Spiel nicht gefunden
     """
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = await async_crud.get_game_by_id(db, game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -383,7 +565,7 @@ def get_game_by_id(
 
 # Benutzer-Management API
 @app.get("/users/me/", response_model=schemas.User, summary="Eigenes Profil abrufen", tags=["Users"])
-def read_users_me(current_user: schemas.User = Depends(get_current_user)):
+def read_users_me(current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
     """
     Eigenes Benutzerprofil abrufen
     
@@ -403,6 +585,12 @@ def read_users_me(current_user: schemas.User = Depends(get_current_user)):
         print(f"   is_admin: {current_user.is_admin}")
         print(f"   is_developer: {current_user.is_developer}")
     
+    # Identitäts-Claims enthalten keine Profildaten (E-Mail, Avatar)
+    if isinstance(current_user, schemas.TokenPrincipal):
+        db_user = db.get(models.User, current_user.id)
+        if db_user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden")
+        return db_user
     return current_user
 
 @app.put("/users/me/", response_model=schemas.User, summary="Profil aktualisieren", tags=["Users"])
@@ -441,7 +629,7 @@ def update_user_profile(
     # Prüfe, ob die neue E-Mail bereits existiert (falls geändert)
     if user_update.email and user_update.email != current_user.email:
         existing_user = crud.get_user_by_email(db, user_update.email)
-        if existing_user:
+        if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="E-Mail bereits vergeben"
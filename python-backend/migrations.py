@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Versionierte Schema-Migrationen
+Ersetzt das reine Base.metadata.create_all beim Start: neue Tabellen werden weiterhin
+über create_all angelegt, Änderungen an bestehenden Tabellen (Spalten, Indizes) laufen
+als nummerierte Migrationen und werden in schema_migrations protokolliert.
+
+Indizes werden auf PostgreSQL mit CREATE INDEX CONCURRENTLY angelegt, damit
+laufende Schreibzugriffe nicht blockiert werden.
+
+Verwendung:
+    python migrations.py            # Alle ausstehenden Migrationen anwenden
+    python migrations.py --status   # Angewendete und ausstehende Migrationen anzeigen
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, literal, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+import models  # registriert alle Tabellen an Base
+from database import Base, engine as default_engine
+
+logger = logging.getLogger("migrations")
+
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+# Beliebige, feste Nummer für pg_advisory_lock (verhindert parallele Migrationen mehrerer Replikate)
+_ADVISORY_LOCK_ID = 4711001
+
+# ===== HILFSFUNKTIONEN =====
+
+def _is_postgres(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+def add_column_if_missing(engine: Engine, table: str, column: str, ddl_type: str):
+    """Spalte ergänzen; konstante Defaults sind auf PostgreSQL 11+ ein reiner Katalog-Eintrag"""
+    existing = {col["name"] for col in inspect(engine).get_columns(table)}
+    if column in existing:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+def create_index_online(engine: Engine, name: str, table: str, columns: str, unique: bool = False,
+                        using: str = ""):
+    """Index ohne Schreibsperre anlegen (PostgreSQL: CONCURRENTLY, außerhalb einer Transaktion)"""
+    unique_sql = "UNIQUE " if unique else ""
+    using_sql = f" USING {using}" if using else ""
+    if _is_postgres(engine):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # Ein abgebrochener CONCURRENTLY-Lauf hinterlässt einen ungültigen Index - neu anlegen
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{using_sql} ({columns})"
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table}{using_sql} ({columns})"))
+
+def drop_index_online(engine: Engine, name: str):
+    """Index ohne Schreibsperre entfernen (PostgreSQL: CONCURRENTLY)"""
+    if _is_postgres(engine):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+# ===== MIGRATIONEN =====
+
+def _m001_game_version_and_usk(engine: Engine):
+    add_column_if_missing(engine, "games", "version", "VARCHAR DEFAULT '1.0.0'")
+    add_column_if_missing(engine, "games", "usk_rating", "VARCHAR DEFAULT 'USK 6'")
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE games SET version = '1.0.0' WHERE version IS NULL"))
+        conn.execute(text("UPDATE games SET usk_rating = 'USK 6' WHERE usk_rating IS NULL"))
+
+def _m002_hot_path_indexes(engine: Engine):
+    create_index_online(engine, "ix_games_published_release", "games", "is_published, release_date DESC")
+    create_index_online(engine, "ix_games_published_genre_release", "games", "is_published, genre, release_date DESC")
+    create_index_online(engine, "ix_games_developer_created", "games", "developer_id, created_at")
+    create_index_online(engine, "ix_wishlist_game_id", "wishlist", "game_id")
+
+def _m003_backfill_sort_dates(engine: Engine):
+    # Keyset-Pagination setzt nicht-leere Sortierspalten voraus. Der Zeitstempel wird
+    # gebunden statt per CURRENT_TIMESTAMP gesetzt, damit SQLite dasselbe Textformat
+    # wie SQLAlchemy speichert (sonst stimmen Vergleiche mit dem Cursor nicht).
+    games = models.Game.__table__
+    now = literal(datetime.utcnow(), DateTime)
+    with engine.begin() as conn:
+        conn.execute(games.update().where(games.c.created_at.is_(None)).values(
+            created_at=func.coalesce(games.c.release_date, games.c.updated_at, now)
+        ))
+        conn.execute(games.update().where(games.c.release_date.is_(None)).values(
+            release_date=games.c.created_at
+        ))
+
+def _m004_fulltext_index(engine: Engine):
+    import search_index
+    try:
+        search_index.create_index(engine)
+    except DBAPIError as e:
+        # z.B. SQLite ohne FTS5 - die Suche fällt dann auf ILIKE zurück
+        logger.warning(f"Volltextindex konnte nicht angelegt werden: {e}")
+        return
+    search_index.rebuild(engine)
+
+def _m005_stat_counters(engine: Engine):
+    import library_stats
+    from sqlalchemy.orm import Session
+    with Session(bind=engine) as db:
+        library_stats.reconcile(db)
+
+def _m006_browse_indexes(engine: Engine):
+    # Deckt die GROUP BY-Abfrage der Facetten ab (Index-Only-Scan) und kombinierte Filter
+    create_index_online(engine, "ix_games_browse_facets", "games",
+                        "is_published, genre, usk_rating, platform, is_free, price")
+    create_index_online(engine, "ix_games_published_price", "games", "is_published, price")
+
+def _m007_game_tags(engine: Engine):
+    # Tabellen legt create_all an; hier nur die bestehenden Freitext-Tags übernehmen
+    import game_tags
+    game_tags.rebuild(engine)
+
+def _m008_nulls_last_sort_indexes(engine: Engine):
+    # Listen sortieren DESC NULLS LAST (pagination.order_desc). Auf SQLite ist das bereits
+    # die Reihenfolge der bestehenden Indizes; PostgreSQL legt DESC-Indizes mit NULLS FIRST
+    # an und könnte sie für diese Sortierung nicht verwenden.
+    if not _is_postgres(engine):
+        return
+    for name, columns in (
+        ("ix_games_published_release", "is_published, release_date DESC NULLS LAST"),
+        ("ix_games_published_genre_release", "is_published, genre, release_date DESC NULLS LAST"),
+        ("ix_games_developer_created", "developer_id, created_at DESC NULLS LAST"),
+    ):
+        create_index_online(engine, f"{name}_nl", "games", columns)
+        drop_index_online(engine, name)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Engine], None]]] = [
+    (1, "games.version und games.usk_rating ergänzen", _m001_game_version_and_usk),
+    (2, "Indizes für Katalog-, Entwickler- und Wunschlisten-Abfragen", _m002_hot_path_indexes),
+    (3, "Leere release_date/created_at für die Keyset-Pagination auffüllen", _m003_backfill_sort_dates),
+    (4, "Volltextindex für die Spielesuche (FTS5 bzw. tsvector/GIN)", _m004_fulltext_index),
+    (5, "Statistik-Zähler (stat_counters) erstmalig befüllen", _m005_stat_counters),
+    (6, "Indizes für die facettierte Suche (/library/browse)", _m006_browse_indexes),
+    (7, "Tags aus games.tags in tags/game_tags übernehmen", _m007_game_tags),
+    (8, "Sortier-Indizes mit NULLS LAST für die Keyset-Pagination (PostgreSQL)", _m008_nulls_last_sort_indexes),
+]
+
+# ===== AUSFÜHRUNG =====
+
+def _applied_versions(conn: Connection) -> set:
+    return {row.version for row in conn.execute(schema_migrations.select())}
+
+def upgrade(engine: Engine = default_engine) -> List[int]:
+    """Neue Tabellen anlegen und alle ausstehenden Migrationen in Reihenfolge anwenden"""
+    Base.metadata.create_all(bind=engine)
+    _migration_metadata.create_all(bind=engine)
+
+    lock_conn = None
+    if _is_postgres(engine):
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+
+    applied_now = []
+    try:
+        with engine.connect() as conn:
+            applied = _applied_versions(conn)
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"Migration {version:03d}: {description}")
+            migrate(engine)
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+            applied_now.append(version)
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            lock_conn.close()
+    return applied_now
+
+def status(engine: Engine = default_engine) -> List[Tuple[int, str, bool]]:
+    _migration_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        applied = _applied_versions(conn)
+    return [(version, description, version in applied) for version, description, _ in MIGRATIONS]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Schema-Migrationen der Indie Game Platform")
+    parser.add_argument("--status", action="store_true", help="Nur den Migrationsstand anzeigen")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, description, done in status():
+            print(f"{'✅' if done else '⏳'} {version:03d} {description}")
+    else:
+        applied = upgrade()
+        print(f"✅ {len(applied)} Migration(en) angewendet" if applied else "✅ Schema ist aktuell")
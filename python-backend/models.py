@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Float, Table
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Float, Table, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -12,6 +12,14 @@ wishlist_table = Table(
     Column('added_at', DateTime, default=datetime.utcnow)
 )
 
+# Normalisierte Tags je Spiel (aus dem Freitext-Feld games.tags gepflegt, siehe game_tags.py)
+game_tags_table = Table(
+    'game_tags',
+    Base.metadata,
+    Column('game_id', Integer, ForeignKey('games.id', ondelete='CASCADE'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -39,6 +47,8 @@ class Game(Base):
     title = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
     genre = Column(String, nullable=True)  # z.B. "Action", "RPG", "Puzzle"
+    version = Column(String, default="1.0.0")  # Versionsnummer des Spiels
+    usk_rating = Column(String, default="USK 6")  # USK-Altersfreigabe, z.B. "USK 12"
     platform = Column(String, nullable=True)  # z.B. "Windows", "Mac", "Linux"
     price = Column(Float, default=0.0)  # Preis in Euro
     is_free = Column(Boolean, default=True)  # Kostenlos oder kostenpflichtig
@@ -59,3 +69,65 @@ class Game(Base):
     download_url = Column(String, nullable=True)  # Link zum Spiel-Download
     screenshot_urls = Column(String, nullable=True)  # JSON-String mit Screenshot-URLs
     tags = Column(String, nullable=True)  # Komma-getrennte Tags
+
+# Indizes für die heißen Abfragen in game_crud (werden für bestehende DBs per migrations.py angelegt)
+Index("ix_games_published_release", Game.is_published, Game.release_date.desc())
+Index("ix_games_published_genre_release", Game.is_published, Game.genre, Game.release_date.desc())
+Index("ix_games_developer_created", Game.developer_id, Game.created_at)
+Index("ix_wishlist_game_id", wishlist_table.c.game_id)
+Index("ix_game_tags_tag_game", game_tags_table.c.tag_id, game_tags_table.c.game_id)
+Index("ix_games_browse_facets", Game.is_published, Game.genre, Game.usk_rating, Game.platform, Game.is_free, Game.price)
+Index("ix_games_published_price", Game.is_published, Game.price)
+
+class Tag(Base):
+    """Normalisierter Tag-Name (kleingeschrieben, Leerraum vereinheitlicht)"""
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+
+class UserTokenVersion(Base):
+    """Token-Version je Benutzer; eine Erhöhung entwertet die Identitäts-Claims älterer Tokens"""
+    __tablename__ = "user_token_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RateLimitCounter(Base):
+    """Zähler je Schlüssel (z.B. Benutzername oder IP) und Zeitfenster für den Login-Rate-Limiter"""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String, primary_key=True)
+    window = Column(Integer, primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class RefreshSession(Base):
+    """Serverseitige Sitzung für Refresh-Tokens (gespeichert wird nur der SHA-256-Hash)"""
+    __tablename__ = "refresh_sessions"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)  # Alle Rotationen eines Logins
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    rotated_at = Column(DateTime, nullable=True)  # Gesetzt, sobald gegen ein neues Token getauscht
+    revoked_at = Column(DateTime, nullable=True)
+
+class RevokedToken(Base):
+    """Vorzeitig gesperrte Access-Tokens (bis zu ihrem regulären Ablauf)"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
+class StatCounter(Base):
+    """Laufend gepflegte Zähler für Bibliotheks- und Entwicklerstatistiken (siehe library_stats.py)"""
+    __tablename__ = "stat_counters"
+
+    scope = Column(String, primary_key=True)  # z.B. "library", "genre", "usk", "developer_published"
+    name = Column(String, primary_key=True)  # Genre, USK-Stufe oder Entwickler-ID
+    value = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Keyset-Pagination (Cursor) für Spielelisten
+Statt offset(skip) setzt die nächste Seite direkt hinter dem letzten Eintrag der
+vorherigen Seite an: WHERE (sort, id) < (letzter_sort, letzte_id). Über die
+Sortier-Indizes kostet damit jede Seite gleich viel wie die erste.
+
+Der Cursor ist für Clients undurchsichtig (base64-kodiertes JSON) und wird im
+Header X-Next-Cursor ausgeliefert; X-Total-Count enthält eine zwischengespeicherte
+Gesamtzahl statt eines count() pro Seite.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Hashable, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import and_, or_
+
+PAGINATION_COUNT_TTL_SECONDS = float(os.getenv("PAGINATION_COUNT_TTL_SECONDS", "60"))
+
+# (Sortierwert, ID); Sortierwert ist ein Zeitstempel (ggf. leer) oder eine Relevanz-Punktzahl
+Keyset = Tuple[Optional[Union[datetime, float]], int]
+
+# Art des Cursors: Listen nach Datum bzw. Relevanz-Ranking der Suche
+DATE_CURSOR = "d"
+SCORE_CURSOR = "s"
+
+
+class InvalidCursor(ValueError):
+    """Cursor ist beschädigt, stammt nicht von dieser API oder passt nicht zur Sortierung"""
+
+
+def encode_cursor(sort_value: Optional[Union[datetime, float]], row_id: int) -> str:
+    if sort_value is None:
+        # Leere Datumsspalte (release_date/created_at sind nullable)
+        payload = [DATE_CURSOR, None, row_id]
+    elif isinstance(sort_value, datetime):
+        payload = [DATE_CURSOR, sort_value.isoformat(), row_id]
+    else:
+        payload = [SCORE_CURSOR, float(sort_value), row_id]
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], kind: str) -> Optional[Keyset]:
+    """
+    Cursor in (Sortierwert, ID) zerlegen; None für die erste Seite
+
+    kind ist die Sortierung des Endpunkts (DATE_CURSOR oder SCORE_CURSOR). Ein Cursor
+    einer anders sortierten Liste wird abgelehnt, statt Zeitstempel mit Punktzahlen
+    zu vergleichen.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if len(payload) == 2:
+            # Cursor aus der Zeit vor der Kennzeichnung: Art aus dem Typ ableiten
+            payload = [DATE_CURSOR if isinstance(payload[0], str) else SCORE_CURSOR] + payload
+        cursor_kind, sort_value, row_id = payload
+        if cursor_kind == DATE_CURSOR:
+            after = (None if sort_value is None else datetime.fromisoformat(sort_value)), int(row_id)
+        elif cursor_kind == SCORE_CURSOR and isinstance(sort_value, (int, float)) and not isinstance(sort_value, bool):
+            after = float(sort_value), int(row_id)
+        else:
+            raise ValueError(cursor_kind)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Ungültiger Cursor") from e
+    if cursor_kind != kind:
+        raise InvalidCursor("Cursor gehört zu einer anders sortierten Liste")
+    return after
+
+
+def order_desc(sort_column, id_column) -> tuple:
+    """
+    Absteigende Sortierung passend zu keyset_before: leere Sortierwerte stehen am Ende
+
+    NULLS LAST ist bei DESC der SQLite-Standard; PostgreSQL sortiert sie ohne Angabe an den Anfang.
+    """
+    return sort_column.desc().nulls_last(), id_column.desc()
+
+
+def keyset_before(sort_column, id_column, after: Keyset):
+    """Bedingung für absteigende Sortierung nach (sort_column, id_column), siehe order_desc"""
+    sort_value, row_id = after
+    if sort_value is None:
+        return and_(sort_column.is_(None), id_column < row_id)
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < row_id),
+        sort_column.is_(None),
+    )
+
+
+def next_cursor(items: Sequence, limit: int, sort_attribute: str) -> Optional[str]:
+    """Cursor auf den letzten Eintrag, falls die Seite voll ist (sonst gibt es keine weitere)"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, sort_attribute), last.id)
+
+
+def set_page_headers(response, cursor: Optional[str], total: Optional[int] = None):
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+
+
+class TotalCountCache:
+    """Gesamtzahlen je Filter für kurze Zeit merken (Listen-Header brauchen keine exakten Werte)"""
+
+    def __init__(self, ttl_seconds: float = PAGINATION_COUNT_TTL_SECONDS, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def put(self, key: Hashable, value: int):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+total_counts = TotalCountCache()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Begrenzter Worker-Pool für Passwort-Hashing
+bcrypt-Berechnungen laufen auf eigenen Threads statt im allgemeinen Request-Threadpool,
+damit Login-Spitzen andere Anfragen nicht blockieren. Ist die Warteschlange voll,
+wird sofort abgelehnt (503 mit Retry-After) statt weiter aufzustauen.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import security
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_QUEUE_LIMIT = int(os.getenv("PASSWORD_POOL_QUEUE_LIMIT", "32"))
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "2"))
+
+
+class PasswordPoolFull(Exception):
+    """Alle Worker sind belegt und die Warteschlange ist voll"""
+
+    def __init__(self, retry_after: int = PASSWORD_POOL_RETRY_AFTER):
+        super().__init__("Passwort-Pool ausgelastet")
+        self.retry_after = retry_after
+
+
+class PasswordHashPool:
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, queue_limit: int = PASSWORD_POOL_QUEUE_LIMIT):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordPoolFull()
+            self._pending += 1
+            self.submitted += 1
+        try:
+            return self._executor.submit(self._run, fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self.completed += 1
+                self._total_seconds += elapsed
+                self._max_seconds = max(self._max_seconds, elapsed)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(security.verify_password, plain_password, hashed_password))
+
+    async def get_password_hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(security.get_password_hash, password))
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = self._running
+            queued = self._pending - self._running
+            completed = self.completed
+            total = self._total_seconds
+            maximum = self._max_seconds
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "running": running,
+            "queued": queued,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": completed,
+            "avg_hash_ms": round(total / completed * 1000, 2) if completed else 0.0,
+            "max_hash_ms": round(maximum * 1000, 2),
+            "bcrypt_rounds": security.current_bcrypt_rounds(),
+        }
+
+
+password_pool = PasswordHashPool()
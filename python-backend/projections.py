@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Schlanke Projektionen für Spielelisten (Query-Parameter fields=)
+Ohne fields liefern die Listen vollständige schemas.Game-Objekte inkl. Beschreibung und
+eingebettetem Entwickler (mit E-Mail und Rollen). Mit fields=title,price,... bzw. einer
+vordefinierten Projektion (fields=card) werden nur die benötigten Spalten selektiert und
+als einfache Zeilen gelesen - ohne ORM-Objekte und Identity Map. Der Entwickler wird dann
+nur als kompakte Referenz {id, username} eingebettet.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+import models
+
+
+class InvalidFields(ValueError):
+    """Unbekannter Feldname in fields="""
+
+
+# Felder von schemas.Game, die direkt einer Spalte entsprechen (in Ausgabe-Reihenfolge)
+GAME_COLUMNS = (
+    "id", "title", "description", "genre", "version", "price", "usk_rating", "download_url", "tags",
+    "platform", "image_url", "is_free", "developer_id", "is_published", "release_date", "created_at", "updated_at",
+)
+FIELD_NAMES = GAME_COLUMNS + ("developer",)
+
+# Vordefinierte Projektionen für Listenansichten
+FIELD_SETS = {
+    "card": ("id", "title", "genre", "price", "is_free", "usk_rating", "platform", "image_url",
+             "release_date", "developer"),
+}
+
+FIELDS_DESCRIPTION = (
+    "Nur diese Felder ausliefern, kommagetrennt (z.B. title,price,developer) oder 'card'; "
+    "developer ist dann nur {id, username}"
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """fields=title,price bzw. fields=card auswerten; None bedeutet vollständige Antwort"""
+    if fields is None or not fields.strip():
+        return None
+    preset = FIELD_SETS.get(fields.strip())
+    if preset is not None:
+        return preset
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(FIELD_NAMES)
+    if unknown:
+        raise InvalidFields(
+            f"Unbekannte Felder: {', '.join(sorted(unknown))} (erlaubt: {', '.join(FIELD_NAMES)})"
+        )
+    # Die ID ist immer enthalten (Cursor, Verlinkung)
+    requested.add("id")
+    return tuple(name for name in FIELD_NAMES if name in requested)
+
+
+def columns(fields: Iterable[str], *required: str) -> list:
+    """Spalten für das SELECT: angeforderte Felder plus z.B. Sortier-Spalten für den Cursor"""
+    needed = set(fields) | set(required)
+    if "developer" in needed:
+        needed.add("developer_id")
+    selected = [getattr(models.Game, name) for name in GAME_COLUMNS if name in needed]
+    if "developer" in needed:
+        selected.append(models.User.username.label("developer_name"))
+    return selected
+
+
+def from_games(query, selected: list):
+    """FROM games, mit Join auf users nur wenn der Entwicklername gebraucht wird (Query oder select)"""
+    query = query.select_from(models.Game)
+    if any(getattr(column, "name", None) == "developer_name" for column in selected):
+        query = query.join(models.Game.developer)
+    return query
+
+
+def project(item, fields: Tuple[str, ...]) -> dict:
+    """Zeile oder Katalog-Eintrag auf die angeforderten Felder reduzieren"""
+    row = {}
+    for name in fields:
+        if name == "developer":
+            row[name] = {"id": item.developer_id, "username": item.developer_name}
+        else:
+            row[name] = getattr(item, name)
+    return row
+
+
+def project_all(items: Iterable, fields: Tuple[str, ...]) -> List[dict]:
+    return [project(item, fields) for item in items]
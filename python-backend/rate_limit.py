@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Login-Rate-Limiter gegen Brute-Force und Credential-Stuffing
+Zählt fehlgeschlagene Anmeldungen je Benutzername und Client-IP in einem
+gleitenden Fenster und lehnt weitere Versuche ab, bevor bcrypt-Arbeit anfällt.
+
+Jeder Versuch wird zuerst atomar gezählt und erst danach gegen das Limit geprüft;
+so kann eine Welle paralleler Fehlversuche nicht gemeinsam an einer noch leeren
+Zählung vorbeikommen. Erfolgreiche oder abgelehnte Versuche werden wieder abgezogen.
+
+Backends:
+- memory: prozesslokal, ohne Datenbankzugriff
+- sql: gemeinsame Zähler-Tabelle, damit alle Replikate dieselben Grenzen sehen
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+import models
+from database import SessionLocal
+
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory").lower()
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_USER = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_USER", "5"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "20"))
+# Nur hinter einem vertrauenswürdigen Proxy aktivieren, sonst ist die IP fälschbar
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() in ("1", "true", "yes")
+
+
+class LoginRateLimited(Exception):
+    """Zu viele fehlgeschlagene Anmeldeversuche"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Zu viele Anmeldeversuche")
+        self.retry_after = retry_after
+
+
+class MemoryRateLimitBackend:
+    """Fenster-Zähler im Prozessspeicher"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_counts(self, key: str, windows: Tuple[int, int]) -> Tuple[int, int]:
+        with self._lock:
+            buckets = self._counters.get(key, {})
+            return buckets.get(windows[0], 0), buckets.get(windows[1], 0)
+
+    def increment(self, key: str, window: int) -> int:
+        """Zähler erhöhen und den neuen Stand liefern (unter der Sperre, also atomar)"""
+        with self._lock:
+            buckets = self._counters.setdefault(key, {})
+            count = buckets[window] = buckets.get(window, 0) + 1
+            # Nur aktuelles und vorheriges Fenster werden benötigt
+            for old in [w for w in buckets if w < window - 1]:
+                del buckets[old]
+            return count
+
+    def decrement(self, key: str, window: int):
+        with self._lock:
+            buckets = self._counters.get(key)
+            if buckets and buckets.get(window, 0) > 0:
+                buckets[window] -= 1
+
+    def reset(self, key: str):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def purge(self, before_window: int):
+        with self._lock:
+            for key in list(self._counters):
+                buckets = self._counters[key]
+                for old in [w for w in buckets if w < before_window]:
+                    del buckets[old]
+                if not buckets:
+                    del self._counters[key]
+
+
+class SqlRateLimitBackend:
+    """Fenster-Zähler in der Tabelle rate_limit_counters (von allen Replikaten geteilt)"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+
+    def get_counts(self, key: str, windows: Tuple[int, int]) -> Tuple[int, int]:
+        db = self._session_factory()
+        try:
+            rows = db.query(models.RateLimitCounter.window, models.RateLimitCounter.count).filter(
+                models.RateLimitCounter.key == key,
+                models.RateLimitCounter.window.in_(windows)
+            ).all()
+        finally:
+            db.close()
+        counts = dict(rows)
+        return counts.get(windows[0], 0), counts.get(windows[1], 0)
+
+    def increment(self, key: str, window: int) -> int:
+        """Zähler per Upsert mit RETURNING erhöhen - ein Statement, auch bei parallelen Replikaten"""
+        db = self._session_factory()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            table = models.RateLimitCounter.__table__
+            statement = insert(table).values(key=key, window=window, count=1)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.key, table.c.window],
+                set_={"count": table.c.count + 1},
+            ).returning(table.c.count)
+            count = db.execute(statement).scalar_one()
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+    def decrement(self, key: str, window: int):
+        db = self._session_factory()
+        try:
+            db.query(models.RateLimitCounter).filter(
+                models.RateLimitCounter.key == key,
+                models.RateLimitCounter.window == window,
+                models.RateLimitCounter.count > 0
+            ).update({models.RateLimitCounter.count: models.RateLimitCounter.count - 1},
+                     synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def reset(self, key: str):
+        db = self._session_factory()
+        try:
+            db.query(models.RateLimitCounter).filter(
+                models.RateLimitCounter.key == key
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge(self, before_window: int):
+        db = self._session_factory()
+        try:
+            db.query(models.RateLimitCounter).filter(
+                models.RateLimitCounter.window < before_window
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class LoginAttempt:
+    """Gezählter Anmeldeversuch; Schlüssel und Fenster, in dem er gezählt wurde"""
+
+    __slots__ = ("username", "keys", "window")
+
+    def __init__(self, username: Optional[str], keys: List[str], window: int):
+        self.username = username
+        self.keys = keys
+        self.window = window
+
+
+class LoginRateLimiter:
+    """
+    Gleitendes Fenster (gewichtete Summe aus aktuellem und vorherigem Fenster)
+
+    Nur Fehlversuche zählen dauerhaft: ``begin`` zählt jeden Versuch vorab,
+    ``record_success`` zieht ihn für die IP wieder ab und setzt den Zähler des
+    Benutzernamens zurück.
+    """
+
+    def __init__(self, backend, window_seconds: int = LOGIN_WINDOW_SECONDS,
+                 max_per_user: int = LOGIN_MAX_ATTEMPTS_PER_USER,
+                 max_per_ip: int = LOGIN_MAX_ATTEMPTS_PER_IP):
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.max_per_user = max_per_user
+        self.max_per_ip = max_per_ip
+        self.rejected = 0
+        self._last_purge_window = 0
+
+    def _keys(self, username: Optional[str], ip: Optional[str]) -> List[Tuple[str, int]]:
+        keys = []
+        if username and self.max_per_user > 0:
+            keys.append((f"user:{username.lower()}", self.max_per_user))
+        if ip and self.max_per_ip > 0:
+            keys.append((f"ip:{ip}", self.max_per_ip))
+        return keys
+
+    def _estimate(self, key: str, now: float, current: Optional[int] = None) -> float:
+        window = int(now // self.window_seconds)
+        previous, stored = self.backend.get_counts(key, (window - 1, window))
+        if current is None:
+            current = stored
+        elapsed_fraction = (now % self.window_seconds) / self.window_seconds
+        return previous * (1 - elapsed_fraction) + current
+
+    def begin(self, username: Optional[str], ip: Optional[str]) -> LoginAttempt:
+        """
+        Versuch zählen und prüfen; wirft LoginRateLimited, wenn er das Limit überschreitet
+
+        Der Zähler wird zuerst erhöht und der neue Stand geprüft. Von N gleichzeitigen
+        Versuchen kommen so höchstens so viele durch, wie das Limit erlaubt.
+        """
+        now = time.time()
+        window = int(now // self.window_seconds)
+        counted: List[str] = []
+        for key, limit in self._keys(username, ip):
+            current = self.backend.increment(key, window)
+            counted.append(key)
+            if self._estimate(key, now, current) > limit:
+                # Abgelehnte Versuche zählen nicht, sonst verlängert jeder Retry die Sperre
+                for done in counted:
+                    self.backend.decrement(done, window)
+                self.rejected += 1
+                # Spätestens wenn das vorherige Fenster herausgefallen ist, sinkt die Schätzung
+                retry_after = self.window_seconds - (now % self.window_seconds)
+                raise LoginRateLimited(retry_after=max(1, math.ceil(retry_after)))
+        if window - 1 > self._last_purge_window:
+            self._last_purge_window = window - 1
+            self.backend.purge(window - 1)
+        return LoginAttempt(username, counted, window)
+
+    def record_success(self, attempt: LoginAttempt):
+        if attempt.username and self.max_per_user > 0:
+            self.backend.reset(f"user:{attempt.username.lower()}")
+        for key in attempt.keys:
+            if key.startswith("ip:"):
+                self.backend.decrement(key, attempt.window)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "window_seconds": self.window_seconds,
+            "max_per_user": self.max_per_user,
+            "max_per_ip": self.max_per_ip,
+            "rejected": self.rejected,
+        }
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """Client-IP der Anfrage (X-Forwarded-For nur bei TRUST_PROXY_HEADERS)"""
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def _create_backend():
+    if LOGIN_RATE_LIMIT_BACKEND == "sql":
+        return SqlRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+login_rate_limiter = LoginRateLimiter(_create_backend())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Sperrliste für Access-Tokens
+Gesperrte Token-IDs (jti) liegen in der Tabelle revoked_tokens. Ein Bloom-Filter im
+Speicher beantwortet die häufige Frage "nicht gesperrt" ohne Datenbankzugriff;
+nur bei einem Filter-Treffer wird in der Datenbank nachgeprüft.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+
+logger = logging.getLogger("revocation")
+
+
+class BloomFilter:
+    """Bloom-Filter über einem bytearray (Double Hashing aus einem BLAKE2b-Digest)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class _AlwaysContains:
+    """Notfall-Filter: meldet immer einen Treffer, damit die Datenbank entscheidet"""
+    count = 0
+
+    def add(self, item: str):
+        pass
+
+    def __contains__(self, item: str) -> bool:
+        return True
+
+
+class RevocationStore:
+    def __init__(self, session_factory=SessionLocal, refresh_seconds: float = REVOCATION_REFRESH_SECONDS,
+                 capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self._session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._built_at = 0.0
+        self._rebuild_lock = threading.Lock()
+        # Während eines Neuaufbaus gesperrte jtis; werden nach dem Lesen in den neuen Filter übernommen
+        self._swap_lock = threading.Lock()
+        self._replay: Optional[list] = None
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+        self.rebuilds = 0
+
+    def _build(self, jtis: Iterable[str]) -> BloomFilter:
+        jtis = list(jtis)
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        return bloom
+
+    def rebuild(self):
+        """Filter aus den nicht abgelaufenen Einträgen der Tabelle neu aufbauen"""
+        with self._swap_lock:
+            self._replay = []
+        try:
+            db = self._session_factory()
+            try:
+                jtis = [row.jti for row in db.query(models.RevokedToken.jti).filter(
+                    models.RevokedToken.expires_at >= datetime.utcnow()
+                )]
+            finally:
+                db.close()
+            bloom = self._build(jtis)
+            with self._swap_lock:
+                # revoke() zwischen Lesen und Austausch: sonst nur im alten Filter
+                for jti in self._replay:
+                    bloom.add(jti)
+                self._filter = bloom
+        finally:
+            with self._swap_lock:
+                self._replay = None
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def sweep_expired(self, db: Session) -> int:
+        """Abgelaufene Einträge löschen (Hintergrund-Job, nicht im Request-Pfad)"""
+        deleted = db.query(models.RevokedToken).filter(
+            models.RevokedToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _ensure_fresh(self):
+        if self._filter is not None and time.monotonic() - self._built_at < self.refresh_seconds:
+            return
+        # Nur ein Thread baut neu; die anderen prüfen solange gegen den alten Filter
+        blocking = self._filter is None
+        if not self._rebuild_lock.acquire(blocking=blocking):
+            return
+        try:
+            if self._filter is None or time.monotonic() - self._built_at >= self.refresh_seconds:
+                self.rebuild()
+        except Exception as e:
+            logger.warning(f"Sperrlisten-Filter konnte nicht neu aufgebaut werden: {e}")
+            if self._filter is None:
+                # Ohne Filter jede Prüfung an die Datenbank weitergeben
+                self._filter = _AlwaysContains()
+                self._built_at = time.monotonic()
+        finally:
+            self._rebuild_lock.release()
+
+    def is_revoked(self, db: Session, jti: Optional[str]) -> bool:
+        """O(1)-Prüfung über den Filter, Datenbank nur bei einem Treffer"""
+        if not jti:
+            # Tokens ohne jti (vor Einführung der Sperrliste ausgestellt) sind nicht sperrbar
+            return False
+        self.checks += 1
+        self._ensure_fresh()
+        if jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        revoked = db.get(models.RevokedToken, jti) is not None
+        if revoked:
+            self.confirmed += 1
+        return revoked
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime, user_id: Optional[int] = None):
+        """Token bis zu seinem Ablauf sperren"""
+        db.add(models.RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Bereits gesperrt
+            db.rollback()
+        self._ensure_fresh()
+        with self._swap_lock:
+            self._filter.add(jti)
+            if self._replay is not None:
+                self._replay.append(jti)
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        return {
+            "entries": bloom.count if isinstance(bloom, BloomFilter) else None,
+            "bloom_bits": bloom.size if isinstance(bloom, BloomFilter) else None,
+            "bloom_hashes": bloom.hash_count if isinstance(bloom, BloomFilter) else None,
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "confirmed": self.confirmed,
+            "false_positives": self.filter_hits - self.confirmed,
+            "rebuilds": self.rebuilds,
+        }
+
+
+revocation_store = RevocationStore()
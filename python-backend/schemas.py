@@ -18,7 +18,7 @@ Version: 1.0.0
 """
 
 from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, date
 
 # ===== USER SCHEMAS =====
@@ -169,6 +169,15 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class TokenPrincipal(User):
+    """
+    Benutzer aus den Identitäts-Claims eines Tokens
+
+    Das Token enthält nur ID, Rollen und Token-Version; Profildaten wie E-Mail
+    und Avatar fehlen und müssen bei Bedarf aus der Datenbank geladen werden.
+    """
+    email: Optional[str] = None
+
 # ===== AUTHENTICATION SCHEMAS =====
 
 class Token(BaseModel):
@@ -180,9 +189,20 @@ class Token(BaseModel):
     Attributes:
         access_token (str): JWT-Token für API-Zugriff
         token_type (str): Token-Typ (standardmäßig "bearer")
+        refresh_token (Optional[str]): Langlebiges Token zum Erneuern über /token/refresh
     """
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    """
+    Schema für die Erneuerung eines Access-Tokens
+    
+    Attributes:
+        refresh_token (str): Zuvor ausgestelltes Refresh-Token (wird rotiert)
+    """
+    refresh_token: str
 
 class TokenData(BaseModel):
     """
@@ -357,10 +377,10 @@ class GameSummary(BaseModel):
         title (str): Spieltitel
         genre (Optional[str]): Spielgenre
         usk_rating (str): USK-Altersfreigabe
-        price (Optional[str]): Preis-Information
+        price (Optional[float]): Preis in Euro
         developer_name (str): Name des Entwicklers
         is_published (bool): Veröffentlichungsstatus
-        release_date (datetime): Veröffentlichungsdatum
+        release_date (Optional[datetime]): Veröffentlichungsdatum
         
     Config:
         from_attributes = True: Ermöglicht Erstellung aus SQLAlchemy-Modellen
@@ -369,10 +389,64 @@ class GameSummary(BaseModel):
     title: str
     genre: Optional[str]
     usk_rating: str
-    price: Optional[str]
+    price: Optional[float]
     developer_name: str
     is_published: bool
-    release_date: datetime
+    release_date: Optional[datetime]
     
     class Config:
         from_attributes = True
+
+class GameBatchRequest(BaseModel):
+    """
+    Anfrage für den Sammelabruf mehrerer Spiele (POST /library/batch)
+    
+    Attributes:
+        ids (List[int]): Spiel-IDs; Reihenfolge bleibt erhalten, Duplikate werden ignoriert
+    """
+    ids: List[int]
+
+class GameBatch(BaseModel):
+    """
+    Ergebnis des Sammelabrufs mehrerer Spiele
+    
+    Fehlende Spiele lassen nicht den ganzen Abruf scheitern, sondern werden
+    einzeln in missing gemeldet.
+    
+    Attributes:
+        games (List[Game]): Gefundene veröffentlichte Spiele in angefragter Reihenfolge
+        missing (List[int]): IDs, die nicht existieren oder nicht veröffentlicht sind
+    """
+    games: List[Game]
+    missing: List[int]
+
+class BrowseResult(BaseModel):
+    """
+    Ergebnis der facettierten Suche (/library/browse)
+    
+    Attributes:
+        games (List[GameSummary]): Ergebnisseite (neueste zuerst)
+        total (int): Anzahl aller Treffer über alle Seiten
+        facets (Dict[str, Dict[str, int]]): Treffer je Facetten-Wert (genre, usk_rating,
+            platform, is_free, price); jede Facette ohne ihren eigenen Filter gezählt
+    """
+    games: List[GameSummary]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+class Suggestion(BaseModel):
+    """
+    Vorschlag der Autovervollständigung (/library/suggest)
+    
+    Attributes:
+        type (str): "game", "tag" oder "developer"
+        label (str): Anzuzeigender Text (Spieltitel, Tag oder Entwicklername)
+        game_id (Optional[int]): Spiel-ID bei type "game"
+        developer_id (Optional[int]): Benutzer-ID bei type "developer"
+        popularity (int): Wunschlisten-Einträge (bei Tags/Entwicklern über alle Spiele)
+    """
+    type: str
+    label: str
+    game_id: Optional[int] = None
+    developer_id: Optional[int] = None
+    popularity: int
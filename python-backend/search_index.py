@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Volltextsuche für Spiele
+SQLite nutzt eine FTS5-Tabelle (games_fts), PostgreSQL eine tsvector-Spalte
+games.search_vector mit GIN-Index. Beide werden mit denselben, in Python
+normalisierten Tokens befüllt (Kleinschreibung, Umlaute ä→ae/ß→ss, leichtes
+deutsches Stemming), damit die Suche auf beiden Datenbanken gleich trifft.
+
+Der Index wird über game_events beim Anlegen, Ändern und Löschen von Spielen in
+derselben Transaktion gepflegt. Ist er nicht vorhanden (z.B. SQLite ohne FTS5),
+fällt die Suche auf ILIKE zurück.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, column, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+import game_events
+import models
+from pagination import Keyset
+
+logger = logging.getLogger("search_index")
+
+# Gewichte für Titel, Tags und Beschreibung (FTS5 bm25 bzw. tsvector A/B/C)
+TITLE_WEIGHT, TAGS_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 5.0, 1.0
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Längste Endungen zuerst; mindestens drei Zeichen Stamm bleiben stehen
+_SUFFIXES = ("ungen", "heiten", "keiten", "ung", "heit", "keit", "ern", "em", "en", "er", "es", "e", "n", "s")
+
+ENABLED = False
+_dialect = None
+
+# ===== NORMALISIERUNG =====
+
+def _fold(value: str) -> str:
+    value = value.lower().translate(_UMLAUTS)
+    value = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in value if not unicodedata.combining(ch))
+
+def stem(token: str) -> str:
+    if len(token) <= 4 or token.isdigit():
+        return token
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [stem(token) for token in _TOKEN.findall(_fold(value))]
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join(tokenize(value))
+
+def _fts5_query(tokens: List[str]) -> str:
+    # Präfixsuche je Token, damit schon Teilwörter beim Tippen treffen
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+def _tsquery(tokens: List[str]) -> str:
+    return " & ".join(f"{token}:*" for token in tokens)
+
+# ===== INDEX-PFLEGE =====
+
+def configure(engine: Engine):
+    """Prüfen, ob der Index angelegt ist (nach migrations.upgrade aufrufen)"""
+    global ENABLED, _dialect
+    _dialect = engine.dialect.name
+    inspector = inspect(engine)
+    if _dialect == "postgresql":
+        ENABLED = any(col["name"] == "search_vector" for col in inspector.get_columns("games"))
+    else:
+        ENABLED = inspector.has_table("games_fts")
+    if not ENABLED:
+        logger.warning("Volltextindex nicht vorhanden, Suche nutzt ILIKE")
+
+def _index_game(conn: Connection, game: models.Game):
+    params = {
+        "id": game.id,
+        "title": normalize(game.title),
+        "tags": normalize(game.tags),
+        "description": normalize(game.description),
+    }
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "UPDATE games SET search_vector = "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :tags), 'B') || "
+            "setweight(to_tsvector('simple', :description), 'C') "
+            "WHERE id = :id"
+        ), params)
+    else:
+        conn.execute(text("DELETE FROM games_fts WHERE rowid = :id"), params)
+        conn.execute(text(
+            "INSERT INTO games_fts(rowid, title, tags, description) VALUES (:id, :title, :tags, :description)"
+        ), params)
+
+def _unindex_game(conn: Connection, game_id: int):
+    if conn.dialect.name != "postgresql":
+        # PostgreSQL: der tsvector verschwindet mit der Zeile
+        conn.execute(text("DELETE FROM games_fts WHERE rowid = :id"), {"id": game_id})
+
+def _searchable_changed(game: models.Game) -> bool:
+    state = inspect(game)
+    return any(state.attrs[name].history.has_changes() for name in ("title", "tags", "description"))
+
+@game_events.on_flush
+def _sync_index(conn: Connection, new: List[models.Game], changed: List[models.Game], deleted: List[models.Game]):
+    if not ENABLED:
+        return
+    for game in new:
+        _index_game(conn, game)
+    for game in changed:
+        if _searchable_changed(game):
+            _index_game(conn, game)
+    for game in deleted:
+        _unindex_game(conn, game.id)
+
+def create_index(engine: Engine):
+    """FTS5-Tabelle bzw. tsvector-Spalte samt GIN-Index anlegen (Migration)"""
+    if engine.dialect.name == "postgresql":
+        from migrations import add_column_if_missing, create_index_online
+        add_column_if_missing(engine, "games", "search_vector", "tsvector")
+        create_index_online(engine, "ix_games_search_vector", "games", "search_vector", using="GIN")
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts "
+                "USING fts5(title, tags, description, tokenize = 'unicode61')"
+            ))
+
+def rebuild(engine: Engine, batch_size: int = 500) -> int:
+    """Index für alle Spiele neu aufbauen (in Batches nach ID)"""
+    games = models.Game.__table__
+    indexed, last_id = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                games.select().with_only_columns(games.c.id, games.c.title, games.c.tags, games.c.description)
+                .where(games.c.id > last_id).order_by(games.c.id).limit(batch_size)
+            ).all()
+            for row in rows:
+                _index_game(conn, row)
+        if not rows:
+            return indexed
+        indexed += len(rows)
+        last_id = rows[-1].id
+
+# ===== ABFRAGEN =====
+
+def is_ranked(search_term: str) -> bool:
+    """Ob search_games für diesen Begriff nach Relevanz (search_rank) statt Datum sortiert"""
+    return ENABLED and bool(tokenize(search_term))
+
+def match_condition(search_term: str):
+    """Filter "Spiel passt zum Suchbegriff" für beliebige Game-Abfragen, None ohne Index"""
+    tokens = tokenize(search_term)
+    if not ENABLED or not tokens:
+        return None
+    if _dialect == "postgresql":
+        return text("games.search_vector @@ to_tsquery('simple', :fts_query)").bindparams(fts_query=_tsquery(tokens))
+    return models.Game.id.in_(
+        text("SELECT rowid FROM games_fts WHERE games_fts MATCH :fts_query").bindparams(fts_query=_fts5_query(tokens))
+        .columns(column("rowid", Integer))
+    )
+
+def ranked_statement(search_term: str, skip: int, limit: int, after: Optional[Keyset]):
+    """
+    Statement für (id, score) veröffentlichter Treffer, absteigend nach Relevanz
+
+    Seiten werden per Keyset auf (score, id) fortgesetzt; None ohne Index oder Suchbegriff.
+    """
+    tokens = tokenize(search_term)
+    if not ENABLED or not tokens:
+        return None
+    if _dialect == "postgresql":
+        ranked = (
+            "SELECT games.id AS id, ts_rank_cd(games.search_vector, query) AS score "
+            "FROM games, to_tsquery('simple', :fts_query) query "
+            "WHERE games.search_vector @@ query AND games.is_published = true"
+        )
+        fts_query = _tsquery(tokens)
+    else:
+        ranked = (
+            f"SELECT games.id AS id, -bm25(games_fts, {TITLE_WEIGHT}, {TAGS_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score "
+            "FROM games_fts JOIN games ON games.id = games_fts.rowid "
+            "WHERE games_fts MATCH :fts_query AND games.is_published = 1"
+        )
+        fts_query = _fts5_query(tokens)
+
+    params = {"fts_query": fts_query, "limit": limit}
+    sql = f"SELECT id, score FROM ({ranked}) ranked"
+    if after is not None:
+        sql += " WHERE score < :after_score OR (score = :after_score AND id < :after_id)"
+        params.update(after_score=after[0], after_id=after[1])
+    sql += " ORDER BY score DESC, id DESC LIMIT :limit"
+    if after is None and skip:
+        sql += " OFFSET :skip"
+        params["skip"] = skip
+    return text(sql).bindparams(**params)
+
+def order_by_rank(games: Iterable[models.Game], ranked: List[Tuple[int, float]]) -> List[models.Game]:
+    """Geladene Spiele in Trefferreihenfolge bringen; search_rank dient als Cursor-Wert"""
+    by_id = {game.id: game for game in games}
+    ordered = []
+    for game_id, score in ranked:
+        game = by_id.get(game_id)
+        if game is not None:
+            game.search_rank = score
+            ordered.append(game)
+    return ordered
@@ -14,11 +14,17 @@ from datetime import datetime, timedelta
 from typing import Optional
 import os
 import hashlib
+import time
+import uuid
 
 SECRET_KEY = os.getenv("SECRET_KEY", "a_super_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Opt-in: Tokens tragen Benutzer-ID, Rollen und Token-Version, damit
+# get_current_user ohne Datenbankzugriff autorisieren kann
+TOKEN_IDENTITY_CLAIMS = os.getenv("TOKEN_IDENTITY_CLAIMS", "false").lower() in ("1", "true", "yes")
+
 # Fallback auf einfache Hash-Funktion wenn bcrypt Probleme macht
 try:
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -26,6 +32,12 @@ try:
 except Exception:
     USE_BCRYPT = False
 
+# Kostenfaktor-Kalibrierung: Budget pro Hash in Millisekunden (nicht gesetzt = passlib-Standard)
+BCRYPT_HASH_BUDGET_MS = os.getenv("BCRYPT_HASH_BUDGET_MS")
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "15"))
+SIMPLE_HASH_PREFIX = "simple_hash_"
+
 def verify_password(plain_password, hashed_password):
     if USE_BCRYPT and hashed_password.startswith("$2b$"):
         try:
@@ -34,7 +46,7 @@ def verify_password(plain_password, hashed_password):
             return False
     else:
         # Einfache Verifikation für Development
-        return hashed_password == f"simple_hash_{plain_password}"
+        return hashed_password == f"{SIMPLE_HASH_PREFIX}{plain_password}"
 
 def get_password_hash(password):
     if USE_BCRYPT:
@@ -42,10 +54,74 @@ def get_password_hash(password):
             return pwd_context.hash(password)
         except Exception:
             # Fallback auf einfachen Hash
-            return f"simple_hash_{password}"
+            return f"{SIMPLE_HASH_PREFIX}{password}"
     else:
         # Einfacher Hash für Development
-        return f"simple_hash_{password}"
+        return f"{SIMPLE_HASH_PREFIX}{password}"
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Prüft, ob ein gespeicherter Hash veraltet ist (Entwicklungs-Hash oder abweichender Kostenfaktor)"""
+    if not USE_BCRYPT or not hashed_password:
+        return False
+    if hashed_password.startswith(SIMPLE_HASH_PREFIX):
+        return True
+    try:
+        if not pwd_context.needs_update(hashed_password):
+            return False
+    except Exception:
+        return False
+    # Nie auf einen niedrigeren Kostenfaktor wechseln (z.B. nach Kalibrierung auf langsamerer Hardware)
+    rounds, current = bcrypt_rounds(hashed_password), current_bcrypt_rounds()
+    return rounds is None or current is None or rounds <= current
+
+def bcrypt_rounds(hashed_password: str) -> Optional[int]:
+    """Kostenfaktor eines bcrypt-Hashes ($2b$12$...) oder None bei anderen Formaten"""
+    parts = (hashed_password or "").split("$")
+    if len(parts) < 4 or not parts[1].startswith("2") or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def current_bcrypt_rounds() -> Optional[int]:
+    """Aktuell konfigurierter bcrypt-Kostenfaktor"""
+    if not USE_BCRYPT:
+        return None
+    return pwd_context.to_dict().get("bcrypt__default_rounds", pwd_context.handler("bcrypt").default_rounds)
+
+def calibrate_bcrypt_rounds(budget_ms: Optional[float] = None) -> Optional[int]:
+    """
+    Kostenfaktor an die aktuelle Hardware anpassen
+
+    Misst einen Hash mit BCRYPT_MIN_ROUNDS und wählt den höchsten Faktor, dessen
+    Dauer (verdoppelt sich je Runde) noch ins Budget passt. Hashes mit niedrigerem
+    Faktor gelten danach als veraltet und werden beim nächsten Login erneuert;
+    stärkere Hashes bleiben unverändert (keine Obergrenze in pwd_context).
+    """
+    if budget_ms is None:
+        if not BCRYPT_HASH_BUDGET_MS:
+            return None
+        budget_ms = float(BCRYPT_HASH_BUDGET_MS)
+    if not USE_BCRYPT:
+        return None
+
+    try:
+        handler = pwd_context.handler("bcrypt").using(rounds=BCRYPT_MIN_ROUNDS)
+        started = time.perf_counter()
+        handler.hash("calibration")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except Exception:
+        # bcrypt-Backend nicht nutzbar; Standard beibehalten
+        return None
+
+    rounds = BCRYPT_MIN_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and elapsed_ms * 2 <= budget_ms:
+        rounds += 1
+        elapsed_ms *= 2
+
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+    return rounds
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -54,5 +130,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    # Eindeutige Token-ID für die Sperrliste (Logout vor Ablauf)
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def identity_claims(user, token_version: int) -> dict:
+    """Claims für zustandslose Autorisierung: nur ID, Rollen und Token-Version (keine Profildaten)"""
+    return {
+        "uid": user.id,
+        "dev": bool(user.is_developer),
+        "adm": bool(user.is_admin),
+        "act": True if user.is_active is None else bool(user.is_active),
+        "ver": token_version,
+    }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Refresh-Token-Sitzungen
+Erneuert Access-Tokens über einen einzigen indizierten Lookup statt über einen
+vollständigen Passwort-Login (bcrypt). Refresh-Tokens werden bei jeder Nutzung
+rotiert; die Wiederverwendung eines bereits rotierten Tokens sperrt die ganze Familie.
+"""
+
+import hashlib
+import logging
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from revocation import revocation_store
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REFRESH_SWEEP_INTERVAL_SECONDS = int(os.getenv("REFRESH_SWEEP_INTERVAL_SECONDS", "3600"))
+REFRESH_SWEEP_BATCH_SIZE = int(os.getenv("REFRESH_SWEEP_BATCH_SIZE", "500"))
+
+logger = logging.getLogger("session_store")
+
+
+class InvalidRefreshToken(Exception):
+    """Refresh-Token unbekannt, abgelaufen, gesperrt oder bereits verwendet"""
+
+
+def _hash_token(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode("utf-8")).hexdigest()
+
+
+def create_refresh_session(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """Neue Sitzung anlegen und das Klartext-Token zurückgeben (wird nicht gespeichert)"""
+    raw_token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    db.add(models.RefreshSession(
+        token_hash=_hash_token(raw_token),
+        user_id=user_id,
+        family_id=family_id or secrets.token_hex(16),
+        created_at=now,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+    return raw_token
+
+
+def rotate_refresh_session(db: Session, raw_token: str) -> Tuple[models.User, str]:
+    """
+    Refresh-Token einlösen und durch ein neues derselben Familie ersetzen
+
+    Returns:
+        Tuple aus Benutzer und neuem Klartext-Refresh-Token
+
+    Raises:
+        InvalidRefreshToken: Wenn das Token nicht (mehr) gültig ist
+    """
+    now = datetime.utcnow()
+    row = db.query(models.RefreshSession, models.User).join(
+        models.User, models.User.id == models.RefreshSession.user_id
+    ).filter(models.RefreshSession.token_hash == _hash_token(raw_token)).first()
+    if row is None:
+        raise InvalidRefreshToken()
+    session, user = row
+
+    if session.revoked_at is not None or session.expires_at <= now:
+        raise InvalidRefreshToken()
+    if session.rotated_at is not None:
+        # Wiederverwendung: Token wurde vermutlich gestohlen - ganze Familie sperren
+        revoke_family(db, session.family_id)
+        raise InvalidRefreshToken()
+
+    # Bedingtes Update verhindert, dass zwei parallele Anfragen dasselbe Token einlösen
+    claimed = db.query(models.RefreshSession).filter(
+        models.RefreshSession.id == session.id,
+        models.RefreshSession.rotated_at.is_(None)
+    ).update({models.RefreshSession.rotated_at: now}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        raise InvalidRefreshToken()
+
+    new_token = create_refresh_session(db, user.id, family_id=session.family_id)
+    return user, new_token
+
+
+def revoke_family(db: Session, family_id: str) -> int:
+    revoked = db.query(models.RefreshSession).filter(
+        models.RefreshSession.family_id == family_id,
+        models.RefreshSession.revoked_at.is_(None)
+    ).update({models.RefreshSession.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return revoked
+
+
+def revoke_refresh_token(db: Session, raw_token: str) -> int:
+    """Sitzungsfamilie eines Refresh-Tokens sperren (z.B. beim Logout)"""
+    session = db.query(models.RefreshSession).filter(
+        models.RefreshSession.token_hash == _hash_token(raw_token)
+    ).first()
+    if session is None:
+        return 0
+    return revoke_family(db, session.family_id)
+
+
+def sweep_expired_sessions(db: Session, batch_size: int = REFRESH_SWEEP_BATCH_SIZE) -> int:
+    """Abgelaufene Sitzungen in Batches löschen (kurze Transaktionen, keine langen Sperren)"""
+    deleted = 0
+    now = datetime.utcnow()
+    while True:
+        ids = [row.id for row in db.query(models.RefreshSession.id).filter(
+            models.RefreshSession.expires_at < now
+        ).limit(batch_size)]
+        if not ids:
+            break
+        db.query(models.RefreshSession).filter(
+            models.RefreshSession.id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+def _sweep_loop(stop_event: threading.Event):
+    while not stop_event.wait(REFRESH_SWEEP_INTERVAL_SECONDS):
+        db = SessionLocal()
+        try:
+            deleted = sweep_expired_sessions(db)
+            if deleted:
+                logger.info(f"{deleted} abgelaufene Refresh-Sitzungen gelöscht")
+            deleted = revocation_store.sweep_expired(db)
+            if deleted:
+                logger.info(f"{deleted} abgelaufene Sperrlisten-Einträge gelöscht")
+        except Exception as e:
+            logger.warning(f"Bereinigung der Refresh-Sitzungen fehlgeschlagen: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+_sweeper_stop = threading.Event()
+
+
+def start_sweeper():
+    """Periodische Bereinigung (Refresh-Sitzungen, abgelaufene gesperrte Tokens) im Hintergrund-Thread starten"""
+    if REFRESH_SWEEP_INTERVAL_SECONDS <= 0:
+        return
+    thread = threading.Thread(target=_sweep_loop, args=(_sweeper_stop,), name="refresh-sweeper", daemon=True)
+    thread.start()
+
+
+def stop_sweeper():
+    _sweeper_stop.set()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+SQL-Instrumentierung pro Request
+Zählt über SQLAlchemy-Events alle Statements eines Requests samt Laufzeit, protokolliert
+langsame Abfragen und markiert Requests, die dasselbe Statement wiederholt ausführen
+(typisches N+1-Muster durch Lazy Loading in Schleifen).
+
+Opt-in über SQL_INSTRUMENTATION, da jedes Statement normalisiert wird. Die Summen stehen
+unter /metrics; den Server-Timing-Header mit den Werten eines Requests gibt es nur mit
+SQL_SERVER_TIMING (Debugging), damit anonyme Clients keine DB-Laufzeiten sehen.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# Ab so vielen gleichen Statements in einem Request gilt er als N+1-Verdacht
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("sql_instrumentation")
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\b\d+\b")
+_IN_LIST = re.compile(r"IN \((?:[^()]*)\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement auf seine Form reduzieren (Literale und IN-Listen vereinheitlicht)"""
+    shape = _STRING.sub("?", statement)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """Statements eines einzelnen Requests"""
+
+    __slots__ = ("count", "duration_ms", "shapes", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.shapes = Counter()
+        self.slow = 0
+
+    def n_plus_one_suspects(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration_ms:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_request_stats", default=None)
+
+
+class SqlMetrics:
+    """Prozessweite Summen für /metrics"""
+
+    def __init__(self, top_suspects: int = 20):
+        self._lock = threading.Lock()
+        self.top_suspects = top_suspects
+        self.requests = 0
+        self.statements = 0
+        self.duration_ms = 0.0
+        self.slow_queries = 0
+        self.n_plus_one_requests = 0
+        self.max_statements_per_request = 0
+        self._suspects = Counter()
+
+    def record_request(self, path: str, stats: RequestQueryStats):
+        suspects = stats.n_plus_one_suspects()
+        with self._lock:
+            self.requests += 1
+            self.statements += stats.count
+            self.duration_ms += stats.duration_ms
+            self.slow_queries += stats.slow
+            self.max_statements_per_request = max(self.max_statements_per_request, stats.count)
+            if suspects:
+                self.n_plus_one_requests += 1
+                for shape, _ in suspects:
+                    self._suspects[f"{path} :: {shape[:200]}"] += 1
+                # Nur die häufigsten Verdachtsfälle behalten
+                if len(self._suspects) > self.top_suspects * 2:
+                    self._suspects = Counter(dict(self._suspects.most_common(self.top_suspects)))
+        for shape, count in suspects:
+            logger.warning(f"N+1-Verdacht in {path}: {count}x {shape[:200]}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": SQL_INSTRUMENTATION,
+                "requests": self.requests,
+                "statements": self.statements,
+                "statements_per_request": round(self.statements / self.requests, 2) if self.requests else 0.0,
+                "max_statements_per_request": self.max_statements_per_request,
+                "db_time_ms": round(self.duration_ms, 1),
+                "slow_queries": self.slow_queries,
+                "n_plus_one_requests": self.n_plus_one_requests,
+                "n_plus_one_suspects": dict(self._suspects.most_common(self.top_suspects)),
+            }
+
+
+sql_metrics = SqlMetrics()
+
+
+def begin_request() -> RequestQueryStats:
+    stats = RequestQueryStats()
+    _current.set(stats)
+    return stats
+
+
+def end_request(path: str, stats: RequestQueryStats):
+    _current.set(None)
+    sql_metrics.record_request(path, stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    _record(stats, statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def _handle_error(context):
+    """Fehlgeschlagenes Statement: Startzeit trotzdem abräumen, sonst verschieben sich alle
+    folgenden Messungen auf dieser (gepoolten) Verbindung"""
+    conn = context.connection
+    starts = conn.info.get("query_start") if conn is not None else None
+    if not starts:
+        return
+    started = starts.pop()
+    stats = _current.get()
+    if stats is not None and context.statement is not None:
+        _record(stats, context.statement, (time.perf_counter() - started) * 1000)
+
+
+def _record(stats: RequestQueryStats, statement: str, elapsed_ms: float):
+    stats.count += 1
+    stats.duration_ms += elapsed_ms
+    stats.shapes[statement_shape(statement)] += 1
+    if elapsed_ms >= SQL_SLOW_QUERY_MS:
+        stats.slow += 1
+        logger.warning(f"Langsame Abfrage ({elapsed_ms:.1f} ms): {_WHITESPACE.sub(' ', statement)[:500]}")
+
+
+def install():
+    """Event-Listener registrieren (idempotent)"""
+    # Auf der Engine-Klasse registriert: gilt für Primary, Replikat und die Async-Engines
+    for name, listener in (("before_cursor_execute", _before_cursor_execute),
+                           ("after_cursor_execute", _after_cursor_execute),
+                           ("handle_error", _handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+if SQL_INSTRUMENTATION:
+    install()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Zwischenspeicher für Vorschläge zu längeren Präfixen
+Präfixe ohne vorberechnete Liste werden per Bereichsscan beantwortet; das Ergebnis bleibt
+bis zur nächsten Änderung eines passenden Schlüssels gültig. Eine Änderung verwirft nur
+die Einträge zu den Präfixen der geänderten Schlüssel.
+
+Nicht threadsicher, SuggestionIndex serialisiert alle Zugriffe.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "4096"))
+
+
+class PrefixCache:
+    def __init__(self, min_length: int, size: int = SUGGEST_CACHE_SIZE):
+        # Kürzere Präfixe haben immer eine vorberechnete Liste und landen nie hier
+        self.min_length = min_length
+        self.size = size
+        self._results: Dict[str, List[Tuple[str, object]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prefix: str) -> Optional[List[Tuple[str, object]]]:
+        result = self._results.get(prefix)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, prefix: str, result: List[Tuple[str, object]]):
+        if len(self._results) >= self.size:
+            self._results = {}
+        self._results[prefix] = result
+
+    def invalidate(self, keys: Iterable[str]):
+        """Ergebnisse aller zwischengespeicherten Präfixe dieser Schlüssel verwerfen"""
+        for key in keys:
+            for length in range(self.min_length, len(key) + 1):
+                self._results.pop(key[:length], None)
+
+    def clear(self):
+        self._results = {}
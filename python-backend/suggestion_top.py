@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Sortierte Vorschlagsschlüssel und vorberechnete Bestenlisten je Präfix
+Schlüssel liegen als sortierte Liste (Schlüssel, Art, Referenz) im Speicher; ein Präfix
+entspricht einem zusammenhängenden Bereich, den bisect in O(log n) findet.
+
+Kurze Präfixe (bis prefix_length Zeichen) und längere mit großem Bereich (häufige
+Wortanfänge wie "the ") haben eine fertig sortierte Liste der besten size Kandidaten,
+die beim Ein-/Austragen einzeln nachgeführt wird. Nur wenn ein Kandidat aus einer vollen
+Liste herausfällt, wird dieser eine Präfix aus seinem Bereich neu berechnet.
+
+Sortierschlüssel (Beliebtheit, Art, Label) berechnet der Aufrufer; die Klasse ist nicht
+threadsicher, SuggestionIndex serialisiert alle Zugriffe.
+"""
+
+import bisect
+import heapq
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+# Längere Präfixe mit mehr Schlüsseln als diesen bekommen ebenfalls eine fertige Liste
+SUGGEST_SCAN_LIMIT = int(os.getenv("SUGGEST_SCAN_LIMIT", "256"))
+
+# Obergrenze für limit; so viele Kandidaten halten die vorberechneten Listen
+MAX_SUGGESTIONS = 20
+
+_HIGHEST = "\U0010ffff"
+
+Entry = Tuple[str, str, object]  # (Schlüssel, Art, Referenz: Spiel-ID, Tag oder Entwickler-ID)
+Ranked = Tuple[tuple, str, object]  # (Sortierschlüssel, Art, Referenz)
+
+
+class PrefixTopLists:
+    def __init__(self, prefix_length: int, size: int = MAX_SUGGESTIONS, scan_limit: int = SUGGEST_SCAN_LIMIT):
+        self.prefix_length = prefix_length
+        self.size = size
+        self.scan_limit = scan_limit
+        self.entries: List[Entry] = []
+        self.ranks: Dict[Tuple[str, object], tuple] = {}
+        # Beste Kandidaten je Präfix (aufsteigend nach Sortierschlüssel) und Präfixe,
+        # deren Liste nach dem Herausfallen eines Kandidaten neu zu berechnen ist
+        self.top: Dict[str, List[Ranked]] = {}
+        self._dirty: Set[str] = set()
+        self._bulk = False
+
+    def clear(self):
+        self.entries, self.ranks = [], {}
+
+    @contextmanager
+    def bulk(self):
+        """Viele Änderungen sammeln und danach einmal sortieren und alle Listen neu aufbauen"""
+        self._bulk = True
+        try:
+            yield
+        finally:
+            self._bulk = False
+        self.entries.sort()
+        self._build()
+
+    # ----- Schlüssel -----
+
+    def insert(self, key: str, kind: str, ref):
+        if self._bulk:
+            self.entries.append((key, kind, ref))
+        else:
+            bisect.insort(self.entries, (key, kind, ref))
+
+    def delete(self, key: str, kind: str, ref):
+        index = bisect.bisect_left(self.entries, (key, kind, ref))
+        if index < len(self.entries) and self.entries[index] == (key, kind, ref):
+            del self.entries[index]
+
+    # ----- Bestenlisten -----
+
+    def _ranked_prefixes(self, keys: List[str]) -> Set[str]:
+        """Präfixe dieser Schlüssel, die eine vorberechnete Liste haben (bzw. bekommen)"""
+        prefixes = set()
+        for key in keys:
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if length > self.prefix_length and prefix not in self.top:
+                    break
+                prefixes.add(prefix)
+        return prefixes
+
+    @staticmethod
+    def _discard(top: List[Ranked], item: Ranked) -> bool:
+        index = bisect.bisect_left(top, item)
+        if index < len(top) and top[index] == item:
+            del top[index]
+            return True
+        return False
+
+    def set_rank(self, kind: str, ref, rank: tuple, keys: List[str]) -> bool:
+        """
+        Sortierschlüssel setzen und die Listen der Präfixe von keys nachführen
+        True, wenn sich Ergebnisse zu diesen Schlüsseln geändert haben können (nicht bei bulk)
+        """
+        old = self.ranks.get((kind, ref))
+        if rank == old:
+            return False
+        self.ranks[(kind, ref)] = rank
+        if self._bulk:
+            return False
+        for prefix in self._ranked_prefixes(keys):
+            if prefix in self._dirty:
+                continue
+            top = self.top.setdefault(prefix, [])
+            full = len(top) >= self.size
+            if old is not None and self._discard(top, (old, kind, ref)) and full and rank > old:
+                # Schlechter geworden: ein Kandidat außerhalb der Liste könnte jetzt vorne liegen
+                self._dirty.add(prefix)
+                continue
+            if len(top) < self.size or (rank, kind, ref) < top[-1]:
+                bisect.insort(top, (rank, kind, ref))
+                del top[self.size:]
+        return True
+
+    def drop_rank(self, kind: str, ref, keys: List[str]) -> bool:
+        """Kandidaten entfernen; volle Listen, aus denen er herausfällt, werden nachgefüllt"""
+        rank = self.ranks.pop((kind, ref), None)
+        if self._bulk or rank is None:
+            return False
+        for prefix in self._ranked_prefixes(keys):
+            top = self.top.get(prefix)
+            if top is None or prefix in self._dirty:
+                continue
+            full = len(top) >= self.size
+            if self._discard(top, (rank, kind, ref)):
+                if full:
+                    self._dirty.add(prefix)
+                elif not top:
+                    del self.top[prefix]
+        return True
+
+    def refill(self):
+        """Listen, aus denen ein Kandidat herausgefallen ist, aus ihrem Bereich neu berechnen"""
+        for prefix in self._dirty:
+            top = self.scan(prefix, self.size)
+            if top:
+                self.top[prefix] = top
+            else:
+                self.top.pop(prefix, None)
+        self._dirty = set()
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect.bisect_left(self.entries, (prefix,))
+        return start, bisect.bisect_left(self.entries, (prefix + _HIGHEST,), lo=start)
+
+    def scan(self, prefix: str, limit: int) -> List[Ranked]:
+        """Beste Kandidaten eines Präfixes aus dessen Bereich - O(Bereich)"""
+        start, end = self._range(prefix)
+        candidates = {(kind, ref) for _, kind, ref in self.entries[start:end]}
+        return heapq.nsmallest(limit, ((self.ranks[candidate],) + candidate for candidate in candidates))
+
+    def _build(self):
+        """Listen aller kurzen und großen Präfixe neu aufbauen"""
+        groups: Dict[str, Set[Tuple[str, object]]] = {}
+        for key, kind, ref in self.entries:
+            for length in range(1, min(len(key), self.prefix_length) + 1):
+                groups.setdefault(key[:length], set()).add((kind, ref))
+        # Große Bereiche schrittweise um ein Zeichen verfeinern, bis sie klein genug zum Scannen sind
+        large = [prefix for prefix in groups if len(prefix) == self.prefix_length]
+        while large:
+            longer = []
+            for prefix in large:
+                start, end = self._range(prefix)
+                if end - start <= self.scan_limit:
+                    continue
+                length = len(prefix) + 1
+                for key, kind, ref in self.entries[start:end]:
+                    if len(key) >= length:
+                        child = key[:length]
+                        if child not in groups:
+                            groups[child] = set()
+                            longer.append(child)
+                        groups[child].add((kind, ref))
+            large = longer
+        self.top = {
+            prefix: heapq.nsmallest(self.size, ((self.ranks[candidate],) + candidate for candidate in candidates))
+            for prefix, candidates in groups.items()
+        }
+        self._dirty = set()
+
+    def lookup(self, prefix: str, limit: int) -> Optional[List[Ranked]]:
+        """Fertige Liste zum Präfix; None, wenn er gescannt werden muss"""
+        top = self.top.get(prefix)
+        if limit <= self.size and (top is not None or len(prefix) <= self.prefix_length):
+            return (top or [])[:limit]
+        return None
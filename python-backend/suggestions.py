@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Autovervollständigung für die Bibliothekssuche (/library/suggest)
+Titel, Tags und Entwicklernamen veröffentlichter Spiele werden als Schlüssel in
+PrefixTopLists (suggestion_top) eingetragen; Titel zusätzlich ab jedem Wort ("tarkov"
+findet "Escape from Tarkov"). Die Reihenfolge der Vorschläge richtet sich nach der
+Beliebtheit (Anzahl Wunschlisten-Einträge), die ein Hintergrund-Thread regelmäßig
+nachlädt. Präfixe ohne fertige Liste beantwortet ein Bereichsscan, dessen Ergebnis
+PrefixCache (suggestion_cache) bis zur nächsten passenden Änderung hält.
+
+Aufgebaut wird der Index nur im Hintergrund: einmal beim Start und danach bei jedem
+neuen Katalog-Stand (published_catalog.on_publish, also im committenden Request bzw. in
+der Katalog-Prüfung). Dabei werden nur die Spiele ein- bzw. ausgetragen, deren Eintrag
+sich geändert hat (der Katalog ersetzt bei Änderungen nur die betroffenen Objekte).
+Anfragen lesen ausschließlich den zuletzt aufgebauten Stand und greifen nie auf
+Katalog oder Datenbank zu; bis zum ersten Aufbau ist der Index nicht bereit.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+
+import models
+from catalog import published_catalog
+from database import read_session
+from suggestion_cache import SUGGEST_CACHE_SIZE, PrefixCache
+from suggestion_top import MAX_SUGGESTIONS, SUGGEST_SCAN_LIMIT, PrefixTopLists
+
+SUGGEST_POPULARITY_SECONDS = float(os.getenv("SUGGEST_POPULARITY_SECONDS", "300"))
+SUGGEST_PREFIX_LENGTH = int(os.getenv("SUGGEST_PREFIX_LENGTH", "3"))
+
+logger = logging.getLogger("suggestions")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Bei gleicher Beliebtheit: Spiele vor Tags vor Entwicklern
+_KIND_ORDER = {"game": 0, "tag": 1, "developer": 2}
+
+
+def fold(value: Optional[str]) -> str:
+    """Groß-/Kleinschreibung und Leerraum vereinheitlichen"""
+    return _WHITESPACE.sub(" ", value or "").strip().casefold()
+
+
+class SuggestionIndex:
+    def __init__(self, catalog=published_catalog, session_factory=read_session,
+                 popularity_seconds: float = SUGGEST_POPULARITY_SECONDS, cache_size: int = SUGGEST_CACHE_SIZE,
+                 prefix_length: int = SUGGEST_PREFIX_LENGTH, top_size: int = MAX_SUGGESTIONS,
+                 scan_limit: int = SUGGEST_SCAN_LIMIT):
+        self._catalog = catalog
+        self._session_factory = session_factory
+        self.popularity_seconds = popularity_seconds
+        self._lists = PrefixTopLists(prefix_length, top_size, scan_limit)
+        self._cache = PrefixCache(prefix_length + 1, cache_size)
+        self._games: Dict[int, object] = {}
+        self._tag_games: Dict[str, Set[int]] = {}
+        self._developer_games: Dict[int, Set[int]] = {}
+        self._developer_names: Dict[int, str] = {}
+        self._popularity: Dict[int, int] = {}
+        # Beliebtheit von Tags/Entwicklern (Summe ihrer Spiele)
+        self._scores: Dict[Tuple[str, object], int] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.updates = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._version is not None
+
+    # ----- Pflege -----
+
+    @staticmethod
+    def _title_keys(title: str) -> List[str]:
+        words = fold(title).split(" ")
+        return list(dict.fromkeys(" ".join(words[index:]) for index in range(len(words)) if words[index]))
+
+    def _label(self, kind: str, ref) -> str:
+        if kind == "game":
+            return self._games[ref].title
+        if kind == "developer":
+            return self._developer_names[ref]
+        return ref
+
+    def _score(self, kind: str, ref) -> int:
+        if kind == "game":
+            return self._popularity.get(ref, 0)
+        return self._scores.get((kind, ref), 0)
+
+    def _keys(self, kind: str, ref) -> List[str]:
+        if kind == "game":
+            return self._title_keys(self._games[ref].title)
+        if kind == "developer":
+            return [fold(self._developer_names[ref])]
+        return [ref]
+
+    def _update_rank(self, kind: str, ref):
+        label = self._label(kind, ref)
+        rank = (-self._score(kind, ref), _KIND_ORDER[kind], len(label), label)
+        keys = self._keys(kind, ref)
+        if self._lists.set_rank(kind, ref, rank, keys):
+            self._cache.invalidate(keys)
+
+    def _drop_rank(self, kind: str, ref, keys: List[str]):
+        if self._lists.drop_rank(kind, ref, keys):
+            self._cache.invalidate(keys)
+
+    def _add_member(self, kind: str, ref, key: str, members: Set[int], game_id: int):
+        if not members:
+            self._lists.insert(key, kind, ref)
+        members.add(game_id)
+        self._scores[(kind, ref)] = self._scores.get((kind, ref), 0) + self._popularity.get(game_id, 0)
+        self._update_rank(kind, ref)
+
+    def _remove_member(self, kind: str, ref, key: str, members: Set[int], game_id: int) -> bool:
+        """True, wenn der Tag/Entwickler danach keine Spiele mehr hat"""
+        members.discard(game_id)
+        if members:
+            self._scores[(kind, ref)] -= self._popularity.get(game_id, 0)
+            self._update_rank(kind, ref)
+            return False
+        self._lists.delete(key, kind, ref)
+        self._drop_rank(kind, ref, [key])
+        self._scores.pop((kind, ref), None)
+        return True
+
+    def _add_game(self, game):
+        self._games[game.id] = game
+        for key in self._title_keys(game.title):
+            self._lists.insert(key, "game", game.id)
+        self._update_rank("game", game.id)
+        for tag in game.tag_set:
+            self._add_member("tag", tag, tag, self._tag_games.setdefault(tag, set()), game.id)
+        members = self._developer_games.setdefault(game.developer_id, set())
+        if not members:
+            self._developer_names[game.developer_id] = game.developer_name
+        self._add_member("developer", game.developer_id, fold(self._developer_names[game.developer_id]),
+                         members, game.id)
+
+    def _remove_game(self, game):
+        keys = self._title_keys(game.title)
+        for key in keys:
+            self._lists.delete(key, "game", game.id)
+        self._drop_rank("game", game.id, keys)
+        for tag in game.tag_set:
+            if self._remove_member("tag", tag, tag, self._tag_games[tag], game.id):
+                del self._tag_games[tag]
+        developer_id = game.developer_id
+        if self._remove_member("developer", developer_id, fold(self._developer_names[developer_id]),
+                               self._developer_games[developer_id], game.id):
+            del self._developer_games[developer_id]
+            del self._developer_names[developer_id]
+        del self._games[game.id]
+
+    def sync(self, snapshot):
+        """Auf den Stand des Katalog-Snapshots bringen (nur geänderte Spiele, nie zurück auf ältere Stände)"""
+        with self._lock:
+            if self._version is not None and snapshot.version <= self._version:
+                return
+            current = snapshot.by_id
+            if snapshot.changed is not None and self._version is not None and snapshot.version == self._version + 1:
+                # Direkter Nachfolger: nur die beim Nachladen betroffenen Spiele vergleichen
+                candidates = snapshot.changed
+            else:
+                candidates = self._games.keys() | current.keys()
+            # Unveränderte Spiele sind im neuen Snapshot dasselbe Objekt
+            removed = [game_id for game_id in candidates
+                       if game_id in self._games and current.get(game_id) is not self._games[game_id]]
+            added = [game_id for game_id in candidates
+                     if game_id in current and self._games.get(game_id) is not current[game_id]]
+            if len(removed) > len(current) // 4 or not self._games:
+                self._rebuild(current.values())
+            else:
+                for game_id in removed:
+                    self._remove_game(self._games[game_id])
+                for game_id in added:
+                    self._add_game(current[game_id])
+                self._lists.refill()
+            self._version = snapshot.version
+            self.updates += 1
+
+    def follow(self, snapshot):
+        """Neuen Katalog-Stand übernehmen - nur für einen bereits aufgebauten Index"""
+        if self.ready:
+            self.sync(snapshot)
+
+    def _rebuild(self, games):
+        """Bei vielen Änderungen (z.B. Neuaufbau des Katalogs): einmal sortieren statt einzeln einfügen"""
+        self._games, self._tag_games, self._developer_games, self._developer_names = {}, {}, {}, {}
+        self._scores = {}
+        self._lists.clear()
+        with self._lists.bulk():
+            for game in games:
+                self._add_game(game)
+        self._cache.clear()
+
+    def refresh_popularity(self):
+        """Wunschlisten-Einträge je Spiel neu laden und alle Sortierschlüssel neu berechnen"""
+        # Nur lesend und ohne Anspruch auf den letzten Stand: gern vom Replikat
+        with self._session_factory() as db:
+            wishlist = models.wishlist_table
+            rows = db.execute(select(wishlist.c.game_id, func.count()).group_by(wishlist.c.game_id)).all()
+        with self._lock:
+            self._popularity = popularity = dict(rows)
+            self._scores = {}
+            for kind, groups in (("tag", self._tag_games), ("developer", self._developer_games)):
+                for ref, members in groups.items():
+                    self._scores[(kind, ref)] = sum(popularity.get(game_id, 0) for game_id in members)
+            # Alle Sortierschlüssel ändern sich - Listen einmal komplett neu aufbauen
+            with self._lists.bulk():
+                for kind, ref in list(self._lists.ranks):
+                    self._update_rank(kind, ref)
+            self._cache.clear()
+
+    def build(self):
+        """Erster Aufbau aus dem Katalog; danach führt on_publish den Index nach"""
+        self.refresh_popularity()
+        snapshot = self._catalog.current()
+        self.sync(snapshot)
+        # Während des Aufbaus veröffentlichte Stände hat follow() noch übersprungen
+        while self._catalog.current() is not snapshot:
+            snapshot = self._catalog.current()
+            self.sync(snapshot)
+        logger.info(f"Vorschlagsindex für Katalog v{self._version} aufgebaut")
+
+    # ----- Abfrage -----
+
+    def suggest(self, query: str, limit: int = 8) -> List[dict]:
+        """Vorschläge zum Präfix, beliebteste zuerst (leer, solange der Index nicht aufgebaut ist)"""
+        prefix = fold(query)
+        if not prefix:
+            return []
+        with self._lock:
+            top = self._lists.lookup(prefix, limit)
+            if top is not None:
+                ranked = [(kind, ref) for _, kind, ref in top]
+            elif limit > self._lists.size:
+                ranked = [(kind, ref) for _, kind, ref in self._lists.scan(prefix, limit)]
+            else:
+                cached = self._cache.get(prefix)
+                if cached is None:
+                    cached = [(kind, ref) for _, kind, ref in self._lists.scan(prefix, self._lists.size)]
+                    self._cache.put(prefix, cached)
+                ranked = cached[:limit]
+            return [self._suggestion(kind, ref) for kind, ref in ranked]
+
+    def _suggestion(self, kind: str, ref) -> dict:
+        return {
+            "type": kind,
+            "label": self._label(kind, ref),
+            "game_id": ref if kind == "game" else None,
+            "developer_id": ref if kind == "developer" else None,
+            "popularity": self._score(kind, ref),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "catalog_version": self._version,
+            "entries": len(self._lists.entries),
+            "tags": len(self._tag_games),
+            "developers": len(self._developer_games),
+            "prefix_lists": len(self._lists.top),
+            "updates": self.updates,
+            "cache_hits": self._cache.hits,
+            "cache_misses": self._cache.misses,
+        }
+
+    # ----- Hintergrund -----
+
+    def _run(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning(f"Vorschlagsindex konnte nicht aufgebaut werden: {e}")
+        while not self._stop.wait(self.popularity_seconds if self.popularity_seconds > 0 else None):
+            try:
+                if self.ready:
+                    self.refresh_popularity()
+                else:
+                    self.build()
+            except Exception as e:
+                logger.warning(f"Beliebtheit für Vorschläge konnte nicht geladen werden: {e}")
+
+    def start(self):
+        """Index im Hintergrund aufbauen und die Beliebtheit periodisch nachladen"""
+        threading.Thread(target=self._run, name="suggest-index", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+suggestion_index = SuggestionIndex()
+
+
+@published_catalog.on_publish
+def _follow_catalog(snapshot):
+    suggestion_index.follow(snapshot)
@@ -0,0 +1,98 @@
+"""
+Gemeinsame Fixtures für die Backend-Tests
+
+Die Tests laufen gegen eine frische SQLite-Datenbank in einem temporären Verzeichnis
+(database.py legt test.db relativ zum Arbeitsverzeichnis an). Hintergrund-Jobs starten
+nicht, weil der TestClient ohne Kontextmanager keine Startup-Events auslöst.
+
+Aufruf aus python-backend/:  python -m pytest -q tests
+"""
+
+import itertools
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="indihub-tests-"))
+os.environ.pop("DB_HOST", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+import library_api
+import main
+import models
+import security
+from auth import create_user_access_token
+from database import SessionLocal
+
+# bcrypt mit minimalem Kostenfaktor, damit Logins in Tests schnell bleiben
+security.pwd_context.update(bcrypt__default_rounds=4, bcrypt__min_rounds=4)
+
+_ids = itertools.count(1)
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}{next(_ids)}"
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    def _make_user(password: str = "secret", **fields) -> models.User:
+        username = fields.pop("username", None) or unique("user")
+        user = models.User(
+            username=username,
+            email=f"{username}@example.com",
+            hashed_password=f"{security.SIMPLE_HASH_PREFIX}{password}",
+            **fields,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_game(db, make_user):
+    def _make_game(developer: models.User = None, **fields) -> models.Game:
+        if developer is None:
+            developer = make_user(is_developer=True)
+        fields.setdefault("title", unique("Game "))
+        fields.setdefault("is_published", True)
+        game = models.Game(developer_id=developer.id, **fields)
+        db.add(game)
+        db.commit()
+        db.refresh(game)
+        return game
+    return _make_game
+
+
+@pytest.fixture(params=[True, False], ids=["catalog", "db"])
+def catalog_mode(request, monkeypatch):
+    """Öffentliche Listen einmal aus dem Katalog-Snapshot, einmal aus der Datenbank"""
+    monkeypatch.setattr(library_api, "CATALOG_ENABLED", request.param)
+    return request.param
+
+
+@pytest.fixture
+def auth_headers(db):
+    def _auth_headers(user: models.User) -> dict:
+        return {"Authorization": f"Bearer {create_user_access_token(db, user)}"}
+    return _auth_headers
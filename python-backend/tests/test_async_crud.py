@@ -0,0 +1,78 @@
+"""
+Der Async-Pfad (DB_ASYNC=true) muss dieselben Ergebnisse liefern wie die synchronen
+Funktionen aus game_crud/crud. Die Tests öffnen dafür eine aiosqlite-Session auf
+derselben Datenbank und schalten async_crud auf den Async-Pfad um.
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import async_crud
+import crud
+import database
+import game_crud
+
+
+@pytest_asyncio.fixture
+async def async_db(monkeypatch):
+    engine = create_async_engine(database.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    monkeypatch.setattr(async_crud, "ASYNC_DB_ENABLED", True)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def _ids(games) -> list:
+    return [game.id for game in games]
+
+
+@pytest.mark.asyncio
+async def test_listings_match_sync_path(async_db, db, make_game):
+    genre = "Async-Genre"
+    for _ in range(3):
+        make_game(genre=genre)
+    make_game(genre=genre, is_published=False)
+    assert _ids(await async_crud.get_games(async_db, 0, 50)) == _ids(game_crud.get_games(db, 0, 50))
+    assert _ids(await async_crud.get_latest_games(async_db, 10)) == _ids(game_crud.get_latest_games(db, 10))
+    assert _ids(await async_crud.get_games_by_genre(async_db, genre)) == _ids(game_crud.get_games_by_genre(db, genre))
+
+
+@pytest.mark.asyncio
+async def test_single_game_includes_developer(async_db, make_game):
+    game = make_game()
+    loaded = await async_crud.get_game_by_id(async_db, game.id)
+    assert loaded.id == game.id
+    assert loaded.developer.id == game.developer_id
+    assert await async_crud.get_game_by_id(async_db, 10 ** 9) is None
+
+
+@pytest.mark.asyncio
+async def test_user_lookups_match_sync_path(async_db, db, make_user):
+    user = make_user()
+    assert (await async_crud.get_user_by_username(async_db, user.username)).id == crud.get_user_by_username(db, user.username).id
+    assert (await async_crud.get_user_by_email(async_db, user.email)).id == user.id
+    assert await async_crud.get_user_by_username(async_db, "nobody-here") is None
+
+
+@pytest.mark.asyncio
+async def test_wishlist_membership_matches_sync_path(async_db, db, make_user, make_game):
+    user = make_user()
+    games = [make_game() for _ in range(3)]
+    for game in games[:2]:
+        game_crud.add_to_wishlist(db, user.id, game.id)
+    ids = [game.id for game in games] + [10 ** 9]
+    assert await async_crud.get_wishlist_membership(async_db, user.id, ids) == \
+        game_crud.get_wishlist_membership(db, user.id, ids) == {games[0].id, games[1].id}
+    assert _ids(await async_crud.get_wishlist_games(async_db, user.id)) == _ids(game_crud.get_wishlist_games(db, user.id))
+
+
+@pytest.mark.asyncio
+async def test_wishlist_stats_match_sync_path(async_db, db, make_user, make_game):
+    user = make_user()
+    assert await async_crud.get_wishlist_stats(async_db, user.id) == game_crud.get_wishlist_stats(db, user.id)
+    for game in (make_game(is_free=True), make_game(is_free=False, price=12.5)):
+        game_crud.add_to_wishlist(db, user.id, game.id)
+    stats = await async_crud.get_wishlist_stats(async_db, user.id)
+    assert stats == game_crud.get_wishlist_stats(db, user.id)
+    assert stats["paid_games"] == 1 and stats["total_value"] == 12.5
@@ -0,0 +1,99 @@
+import time
+
+import models
+import schemas
+import token_versions
+from auth_cache import PrincipalCache, principal_cache
+
+
+def _principal(user_id: int = 1, is_admin: bool = False) -> schemas.User:
+    return schemas.User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                        is_developer=False, is_admin=is_admin, is_active=True)
+
+
+def test_put_and_get_returns_cached_principal():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("token", {"sub": "user1"}, _principal(), 0)
+    entry = cache.get("token")
+    assert entry.user.id == 1
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entry_never_outlives_token_expiry():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("expired", {"exp": time.time() - 1}, _principal(), 0)
+    assert cache.get("expired") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", {}, _principal(1), 0)
+    cache.put("b", {}, _principal(2), 0)
+    cache.get("a")
+    cache.put("c", {}, _principal(3), 0)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.evictions == 1
+
+
+def test_invalidate_user_drops_all_tokens_of_user():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put("a", {}, _principal(1), 0)
+    cache.put("b", {}, _principal(1), 0)
+    cache.put("c", {}, _principal(2), 0)
+    cache.invalidate_user(1)
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_admin_entries_use_short_ttl():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10, privileged_ttl_seconds=0)
+    cache.put("admin", {}, _principal(1, is_admin=True), 0)
+    cache.put("user", {}, _principal(2), 0)
+    assert cache.get("admin") is None
+    assert cache.get("user") is not None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PrincipalCache(ttl_seconds=0, max_entries=10)
+    cache.put("a", {}, _principal(), 0)
+    assert cache.get("a") is None
+
+
+def test_repeated_requests_hit_the_cache(client, make_user, auth_headers):
+    headers = auth_headers(make_user())
+    assert client.get("/users/me/", headers=headers).status_code == 200
+    hits = principal_cache.hits
+    assert client.get("/users/me/", headers=headers).status_code == 200
+    assert principal_cache.hits == hits + 1
+
+
+def test_role_change_is_visible_to_cached_token(client, make_user, auth_headers):
+    user = make_user()
+    admin = make_user(is_admin=True)
+    headers = auth_headers(user)
+    assert client.get("/users/me/", headers=headers).json()["is_developer"] is False
+    response = client.put(f"/admin/users/{user.id}/role", headers=auth_headers(admin), json={"is_developer": True})
+    assert response.status_code == 200
+    assert client.get("/users/me/", headers=headers).json()["is_developer"] is True
+
+
+def test_version_bump_elsewhere_drops_cached_principal(client, db, make_user, auth_headers):
+    user = make_user()
+    headers = auth_headers(user)
+    assert client.get("/users/me/", headers=headers).json()["is_developer"] is False
+    # Änderung durch einen anderen Prozess: kein invalidate_user, nur die gespeicherte Version steigt
+    db.get(models.User, user.id).is_developer = True
+    token_versions.bump_version(db, user.id)
+    db.commit()
+    token_versions.forget(user.id)
+    assert client.get("/users/me/", headers=headers).json()["is_developer"] is True
+
+
+def test_metrics_require_admin(client, make_user, auth_headers):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=auth_headers(make_user())).status_code == 403
+    response = client.get("/metrics", headers=auth_headers(make_user(is_admin=True)))
+    assert response.status_code == 200
+    assert "auth_cache" in response.json()
@@ -0,0 +1,41 @@
+import pytest
+
+import library_api
+
+
+def _batch(client, ids, method: str = "get"):
+    if method == "get":
+        return client.get(f"/library/batch?ids={','.join(map(str, ids))}")
+    return client.post("/library/batch", json={"ids": ids})
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_batch_keeps_order_and_reports_missing(client, make_game, catalog_mode, method):
+    first, second = make_game(), make_game()
+    draft = make_game(is_published=False)
+    unknown = 10 ** 9
+    response = _batch(client, [second.id, unknown, first.id, second.id, draft.id], method)
+    assert response.status_code == 200
+    body = response.json()
+    assert [game["id"] for game in body["games"]] == [second.id, first.id]
+    assert body["missing"] == [unknown, draft.id]
+    assert body["games"][0]["title"] == second.title
+
+
+def test_batch_falls_back_to_database_for_games_outside_the_snapshot(client, make_game, monkeypatch):
+    game = make_game()
+    monkeypatch.setattr(library_api.published_catalog.current(), "by_id", {})
+    assert [entry["id"] for entry in _batch(client, [game.id]).json()["games"]] == [game.id]
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_batch_limits(client, monkeypatch, method):
+    monkeypatch.setattr(library_api, "LIBRARY_BATCH_MAX_IDS", 3)
+    assert _batch(client, [1, 2, 3, 4], method).status_code == 400
+    # Duplikate zählen nicht gegen die Obergrenze
+    assert _batch(client, [1, 1, 2, 2, 3], method).status_code == 200
+    assert _batch(client, [], method).status_code == 400
+
+
+def test_batch_rejects_malformed_ids(client):
+    assert client.get("/library/batch?ids=1,zwei").status_code == 400
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+import library_api
+from catalog import CatalogSnapshot, PublishedCatalog, published_catalog
+from conftest import unique
+
+
+def _ids(response) -> list:
+    assert response.status_code == 200
+    return [game["id"] for game in response.json()]
+
+
+def test_latest_games_include_new_drafts(client, make_user, auth_headers):
+    headers = auth_headers(make_user(is_developer=True))
+    before = client.get("/games/")
+    created = client.post("/games/", json={"title": unique("Entwurf ")}, headers=headers)
+    assert created.status_code == 200
+    assert created.json()["is_published"] is False
+    latest = client.get("/games/", headers={"If-None-Match": before.headers["ETag"]})
+    assert latest.status_code == 200
+    assert _ids(latest)[0] == created.json()["id"]
+
+
+def test_library_listing_matches_database(client, make_game, monkeypatch):
+    genre = unique("Paritaet")
+    for _ in range(4):
+        make_game(genre=genre)
+    make_game(genre=genre, is_published=False)
+    url = f"/library/?genre={genre}&limit=3"
+    from_catalog = client.get(url)
+    monkeypatch.setattr(library_api, "CATALOG_ENABLED", False)
+    from_db = client.get(url)
+    assert _ids(from_catalog) == _ids(from_db)
+    assert from_catalog.headers["X-Total-Count"] == from_db.headers["X-Total-Count"] == "4"
+    assert from_catalog.headers["X-Next-Cursor"] == from_db.headers["X-Next-Cursor"]
+
+
+def test_details_match_database_and_drafts_stay_hidden(client, make_game, catalog_mode):
+    game, draft = make_game(), make_game(is_published=False)
+    response = client.get(f"/library/{game.id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == game.title
+    assert client.get(f"/library/{draft.id}").status_code == 404
+
+
+def test_unpublished_game_leaves_catalog(db, client, make_game):
+    game = make_game()
+    assert published_catalog.current().get(game.id) is not None
+    game = db.merge(game)
+    game.is_published = False
+    db.commit()
+    assert published_catalog.current().get(game.id) is None
+
+
+def test_developer_sees_own_update_immediately(client, db, make_user, make_game, auth_headers):
+    developer = make_user(is_developer=True)
+    game = make_game(developer=developer)
+    published_catalog.current()
+    title = unique("Neuer Titel ")
+    response = client.put(f"/library/developer/games/{game.id}", json={"title": title},
+                          headers=auth_headers(developer))
+    assert response.status_code == 200
+    assert client.get(f"/library/{game.id}").json()["title"] == title
+
+
+def test_incremental_update_matches_full_rebuild(db, make_game):
+    genre = unique("Inkrementell")
+    games = [make_game(genre=genre) for _ in range(3)]
+    moved = db.merge(games[1])
+    moved.genre = unique("Anderes")
+    db.merge(games[2]).is_published = False
+    db.commit()
+    make_game(genre=genre)
+    incremental = published_catalog.current()
+    rebuilt = CatalogSnapshot(incremental.version, dict(incremental.by_id))
+    assert incremental.fingerprint == rebuilt.fingerprint
+    assert incremental.source_fingerprint == rebuilt.source_fingerprint
+    assert [game.id for game in incremental.all.games] == [game.id for game in rebuilt.all.games]
+    assert incremental.by_genre.keys() == rebuilt.by_genre.keys()
+    for genre, listing in rebuilt.by_genre.items():
+        assert [game.id for game in incremental.by_genre[genre].games] == [game.id for game in listing.games]
+
+
+def test_verify_detects_developer_rename_from_other_process(db, make_game):
+    game = make_game()
+    published_catalog.verify()
+    assert published_catalog.verify() is False
+    # Umbenennung ohne refresh_developer, wie durch einen anderen Worker
+    db.merge(game).developer.username = unique("umbenannt")
+    db.commit()
+    assert published_catalog.verify() is True
+    assert published_catalog.current().get(game.id).developer_name == db.merge(game).developer.username
+
+
+@pytest.mark.asyncio
+async def test_missing_snapshot_is_built_off_the_event_loop():
+    catalog = PublishedCatalog(verify_seconds=0)
+    built_on = []
+    rebuild = catalog.rebuild
+    catalog.rebuild = lambda: built_on.append(threading.current_thread()) or rebuild()
+    snapshot = await catalog.current_async()
+    assert snapshot is catalog.current()
+    assert built_on and built_on[0] is not threading.main_thread()
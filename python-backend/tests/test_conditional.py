@@ -0,0 +1,64 @@
+import pytest
+
+from auth_cache import snapshot_user
+from catalog import CatalogGame, CatalogSnapshot, published_catalog
+from conftest import unique
+
+
+def _revalidate(client, url: str, etag: str, headers: dict = None) -> int:
+    return client.get(url, headers={**(headers or {}), "If-None-Match": etag}).status_code
+
+
+def test_snapshot_fingerprint_depends_on_content_not_version(db, make_game):
+    game = make_game()
+    entry = CatalogGame(game, snapshot_user(game.developer))
+    assert CatalogSnapshot(1, {}).fingerprint != CatalogSnapshot(1, {game.id: entry}).fingerprint
+    assert CatalogSnapshot(1, {game.id: entry}).fingerprint == CatalogSnapshot(7, {game.id: entry}).fingerprint
+
+
+def test_catalog_rebuild_keeps_etags(client, make_game):
+    make_game()
+    response = client.get("/library/")
+    published_catalog.rebuild()
+    assert client.get("/library/").headers["X-Catalog-Version"] != response.headers["X-Catalog-Version"]
+    assert _revalidate(client, "/library/", response.headers["ETag"]) == 304
+
+
+def test_catalog_and_database_agree_on_freshness(client, make_game, catalog_mode):
+    genre = unique("Etag")
+    game = make_game(genre=genre)
+    urls = [f"/library/?genre={genre}", f"/library/{game.id}", f"/library/batch?ids={game.id}",
+            f"/library/browse?genre={genre}"]
+    etags = {url: client.get(url).headers["ETag"] for url in urls}
+    assert all(_revalidate(client, url, etag) == 304 for url, etag in etags.items())
+    make_game(genre=genre)
+    assert all(_revalidate(client, url, etag) == 200 for url, etag in etags.items())
+
+
+def test_developer_rename_changes_catalog_etag(db, client, make_game):
+    game = make_game()
+    url = f"/library/{game.id}"
+    etag = client.get(url).headers["ETag"]
+    developer = db.merge(game).developer
+    developer.username = unique("renamed")
+    db.commit()
+    published_catalog.refresh_developer(developer.id)
+    assert _revalidate(client, url, etag) == 200
+    assert client.get(url).json()["developer"]["username"] == developer.username
+
+
+@pytest.mark.parametrize("url", ["/wishlist/", "/wishlist/overview"])
+def test_wishlist_etag_follows_entries_and_developer(db, client, make_user, make_game, auth_headers, url):
+    headers = auth_headers(make_user())
+    game = make_game()
+    assert client.post(f"/wishlist/{game.id}", headers=headers).status_code == 200
+    etag = client.get(url, headers=headers).headers["ETag"]
+    assert _revalidate(client, url, etag, headers) == 304
+    developer = db.merge(game).developer
+    developer.username = unique("renamed")
+    db.commit()
+    assert _revalidate(client, url, etag, headers) == 200
+    etag = client.get(url, headers=headers).headers["ETag"]
+    other = make_game()
+    assert client.post(f"/wishlist/{other.id}", headers=headers).status_code == 200
+    assert _revalidate(client, url, etag, headers) == 200
@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+import database
+from security import create_access_token
+
+
+def test_sqlite_connections_get_pragmas():
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == database.SQLITE_JOURNAL_MODE.lower()
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -database.SQLITE_CACHE_SIZE_KB
+
+
+def test_pool_stats_describe_engine():
+    stats = database.get_pool_stats()
+    assert stats["dialect"] == "sqlite"
+    assert "status" in stats and "pool_class" in stats
+
+
+class _Request:
+    def __init__(self, username: str = None, **claims):
+        token = create_access_token(dict(claims, sub=username)) if username else None
+        self.headers = {"authorization": f"Bearer {token}"} if token else {}
+
+
+class _DownReplica:
+    closed = False
+
+    def connection(self):
+        raise DBAPIError("SELECT 1", {}, Exception("replica down"))
+
+    def close(self):
+        _DownReplica.closed = True
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Primary-Sessions als "Replikat" verwenden"""
+    monkeypatch.setattr(database, "ReplicaSessionLocal", database.SessionLocal)
+    monkeypatch.setattr(database, "_replica_down_until", 0.0)
+    monkeypatch.setattr(database, "_recent_writes", {})
+    monkeypatch.setattr(database, "replica_stats", dict.fromkeys(database.replica_stats, 0))
+
+
+def _read(request):
+    dependency = database.get_sync_read_db(request)
+    db = next(dependency)
+    dependency.close()
+    return db
+
+
+def test_without_replica_reads_use_primary():
+    before = database.replica_stats["primary_reads"]
+    _read(_Request())
+    assert database.replica_stats["primary_reads"] == before + 1
+
+
+def test_reads_go_to_replica(replica):
+    _read(_Request("reader"))
+    assert database.replica_stats["replica_reads"] == 1
+
+
+def test_client_reads_own_writes_from_primary(replica):
+    database.note_write(_Request("writer"))
+    _read(_Request("writer"))
+    _read(_Request("someone-else"))
+    assert database.replica_stats["read_your_writes"] == 1
+    assert database.replica_stats["primary_reads"] == 1
+    assert database.replica_stats["replica_reads"] == 1
+
+
+def test_read_your_writes_survives_token_refresh(replica):
+    # Jeder Aufruf stellt ein neues Token (neue jti) für denselben Benutzer aus
+    database.note_write(_Request("writer", uid=7))
+    _read(_Request("writer", uid=7))
+    database.note_write(_Request("legacy"))
+    _read(_Request("legacy"))
+    assert database.replica_stats["read_your_writes"] == 2
+    assert database._client_key(_Request("writer", uid=7)) != database._client_key(_Request("writer", uid=8))
+
+
+def test_invalid_token_has_no_client_key():
+    request = _Request()
+    request.headers = {"authorization": "Bearer not-a-jwt"}
+    assert database._client_key(request) is None
+
+
+def test_failing_replica_falls_back_and_is_skipped(replica, monkeypatch):
+    monkeypatch.setattr(database, "ReplicaSessionLocal", _DownReplica)
+    _read(_Request())
+    assert database.replica_stats["replica_failures"] == 1
+    assert database.replica_stats["primary_reads"] == 1
+    assert _DownReplica.closed
+    assert database._use_replica(_Request()) is False
+
+
+def test_read_session_falls_back_to_primary(replica, monkeypatch):
+    monkeypatch.setattr(database, "ReplicaSessionLocal", _DownReplica)
+    with database.read_session() as db:
+        assert db.execute(text("SELECT 1")).scalar() == 1
+    assert database.replica_stats["replica_failures"] == 1
@@ -0,0 +1,75 @@
+import pytest
+
+import library_api
+from conftest import unique
+from facets import BrowseFilter, FacetCounter, price_bucket
+
+
+def _browse(client, query: str) -> dict:
+    response = client.get(f"/library/browse?{query}")
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def shelf(make_game):
+    """Spiele mit eigenem Tag, damit die Zahlen nicht von anderen Tests abhängen"""
+    tag = unique("regal")
+    rows = [
+        ("Puzzle", "USK 0", "Windows", 0.0),
+        ("Puzzle", "USK 12", "Linux", 4.99),
+        ("Action", "USK 12", "Windows", 19.99),
+        ("Action", "USK 18", "Windows", 59.0),
+    ]
+    for genre, usk, platform, price in rows:
+        make_game(genre=genre, usk_rating=usk, platform=platform, price=price, is_free=price == 0.0, tags=tag)
+    return tag
+
+
+def test_price_buckets():
+    assert [price_bucket(value) for value in (None, 0.0, 9.99, 10.0, 39.99, 40.0)] == \
+        ["0", "0", "0-10", "10-20", "20-40", "40+"]
+
+
+def test_counter_is_disjunctive():
+    counter = FacetCounter(BrowseFilter(genres=["Puzzle"], platforms=["Windows"]))
+    assert counter.add("Puzzle", "USK 0", "Windows", True, "0", True)
+    assert not counter.add("Action", "USK 0", "Windows", True, "0", True)
+    assert not counter.add("Puzzle", "USK 0", "Linux", True, "0", True)
+    assert not counter.add("Action", "USK 0", "Linux", True, "0", True)
+    facets = counter.facets()
+    assert counter.total == 1
+    assert facets["genre"] == {"Action": 1, "Puzzle": 1}
+    assert facets["platform"] == {"Linux": 1, "Windows": 1}
+    assert facets["usk_rating"] == {"USK 0": 1}
+
+
+def test_facets_ignore_their_own_filter(client, shelf):
+    body = _browse(client, f"tags={shelf}&genre=Puzzle&platform=Windows")
+    assert body["total"] == 1
+    assert body["facets"]["genre"] == {"Action": 2, "Puzzle": 1}
+    assert body["facets"]["platform"] == {"Linux": 1, "Windows": 1}
+    assert body["facets"]["price"] == {"0": 1}
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "genre=Action&genre=Puzzle",
+    "usk_rating=USK 12&is_free=false",
+    "min_price=1&max_price=20",
+    "platform=Windows&max_price=0",
+    "limit=1",
+])
+def test_catalog_and_database_agree(client, shelf, monkeypatch, query):
+    url = f"tags={shelf}&{query}"
+    from_catalog = _browse(client, url)
+    monkeypatch.setattr(library_api, "CATALOG_ENABLED", False)
+    assert _browse(client, url) == from_catalog
+
+
+def test_browse_pages_by_cursor(client, shelf, catalog_mode):
+    first = client.get(f"/library/browse?tags={shelf}&limit=3")
+    rest = client.get(f"/library/browse?tags={shelf}&limit=3&cursor={first.headers['X-Next-Cursor']}")
+    ids = [game["id"] for game in first.json()["games"] + rest.json()["games"]]
+    assert len(ids) == len(set(ids)) == 4
+    assert rest.json()["total"] == 4
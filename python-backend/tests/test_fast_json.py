@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+import fast_json
+import library_api
+import main
+import schemas
+from conftest import unique
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    """Liefert eine Funktion, die den schnellen JSON-Pfad an- bzw. abschaltet"""
+    def _fast(enabled: bool):
+        monkeypatch.setattr(main, "FAST_JSON", enabled)
+        monkeypatch.setattr(library_api, "FAST_JSON", enabled)
+    return _fast
+
+
+def _both(client, fast, url: str, headers: dict = None):
+    fast(False)
+    standard = client.get(url, headers=headers)
+    fast(True)
+    optimized = client.get(url, headers=headers)
+    assert standard.status_code == optimized.status_code == 200
+    return standard, optimized
+
+
+def test_dump_list_matches_pydantic(db, make_game):
+    game = make_game(price=4.5, is_free=False, release_date=datetime(2024, 5, 1, 12, 30, 15, 250000))
+    game = db.merge(game)
+    expected = [schemas.Game.model_validate(game).model_dump(mode="json")]
+    assert fast_json.dumps(expected) == fast_json.dump_list(schemas.Game, [game])
+
+
+@pytest.mark.parametrize("path", ["/games/", "/library/?genre={genre}&limit=2"])
+def test_list_endpoints_return_identical_json(client, make_game, fast, catalog_mode, path):
+    genre = unique("Json")
+    for _ in range(3):
+        make_game(genre=genre, tags="koop, pixel art", description="Ä ö ü ß ☃")
+    standard, optimized = _both(client, fast, path.format(genre=genre))
+    assert standard.json() == optimized.json()
+    for header in ("ETag", "X-Next-Cursor", "X-Total-Count"):
+        assert standard.headers.get(header) == optimized.headers.get(header)
+
+
+def test_developer_listing_identical_json(client, make_user, make_game, auth_headers, fast):
+    developer = make_user(is_developer=True)
+    for _ in range(2):
+        make_game(developer=developer)
+    make_game(developer=developer, is_published=False)
+    standard, optimized = _both(client, fast, "/library/developer/games", auth_headers(developer))
+    assert standard.json() == optimized.json()
+    assert len(optimized.json()) == 3
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import select
+
+import database
+import game_tags
+import library_api
+import models
+from conftest import unique
+
+
+def _tag_rows(db, game_id: int) -> set:
+    return {name for name, in db.execute(
+        select(models.Tag.name).join(models.game_tags_table, models.game_tags_table.c.tag_id == models.Tag.id)
+        .where(models.game_tags_table.c.game_id == game_id)
+    )}
+
+
+def _browse_ids(client, tags: str, mode: str) -> set:
+    response = client.get(f"/library/browse?tags={tags}&tag_mode={mode}")
+    assert response.status_code == 200
+    return {game["id"] for game in response.json()["games"]}
+
+
+def test_parse_tags_normalizes_and_deduplicates():
+    assert game_tags.parse_tags(" Pixel  Art, KOOP,,koop , Rätsel ") == ["pixel art", "koop", "rätsel"]
+    assert game_tags.parse_tags(None) == []
+
+
+def test_tags_match_in_memory():
+    tag_set = frozenset({"koop", "pixel art"})
+    assert game_tags.tags_match(tag_set, ["Koop", "pixel  art"])
+    assert not game_tags.tags_match(tag_set, ["koop", "horror"])
+    assert game_tags.tags_match(tag_set, ["koop", "horror"], match_all=False)
+
+
+@pytest.mark.parametrize("mode", ["all", "any"])
+def test_and_or_filters_match_between_catalog_and_database(client, make_game, monkeypatch, mode):
+    a, b = unique("tag-a"), unique("tag-b")
+    both = make_game(tags=f"{a}, {b}")
+    only_a = make_game(tags=a)
+    make_game(tags=b.upper())
+    make_game(tags=f"{a}, {b}", is_published=False)
+    from_catalog = _browse_ids(client, f"{a},{b}", mode)
+    monkeypatch.setattr(library_api, "CATALOG_ENABLED", False)
+    from_db = _browse_ids(client, f"{a},{b}", mode)
+    assert from_catalog == from_db
+    if mode == "all":
+        assert from_db == {both.id}
+    else:
+        assert len(from_db) == 3 and {both.id, only_a.id} <= from_db
+
+
+def test_index_follows_edits_and_deletes(db, make_game):
+    old, new = unique("alt"), unique("neu")
+    game = db.merge(make_game(tags=f"{old}, Koop"))
+    assert _tag_rows(db, game.id) == {old, "koop"}
+    game.tags = f"{new}, koop"
+    db.commit()
+    assert _tag_rows(db, game.id) == {new, "koop"}
+    game_id = game.id
+    db.delete(game)
+    db.commit()
+    assert _tag_rows(db, game_id) == set()
+
+
+def test_rebuild_restores_postings(db, make_game):
+    tag = unique("rebuild")
+    game = make_game(tags=tag)
+    db.execute(models.game_tags_table.delete().where(models.game_tags_table.c.game_id == game.id))
+    db.commit()
+    assert _tag_rows(db, game.id) == set()
+    assert game_tags.rebuild(database.engine) >= 1
+    assert _tag_rows(db, game.id) == {tag}
@@ -0,0 +1,80 @@
+import pytest
+
+import async_crud
+import library_stats
+import models
+from conftest import unique
+
+
+def _assert_no_drift(db):
+    db.expire_all()
+    stored = {(row.scope, row.name): row.value for row in db.query(models.StatCounter) if row.value}
+    expected = {key: value for key, value in library_stats.compute_counters(db).items() if value}
+    assert stored == expected
+
+
+def test_counters_follow_game_lifecycle(db, make_game):
+    game = make_game(genre=unique("Genre"), is_published=False)
+    _assert_no_drift(db)
+    game.is_published = True
+    db.commit()
+    _assert_no_drift(db)
+    game.genre, game.usk_rating = unique("Genre"), "USK 12"
+    db.commit()
+    _assert_no_drift(db)
+    db.delete(game)
+    db.commit()
+    _assert_no_drift(db)
+
+
+def test_setting_expired_attributes_keeps_counters_exact(db, make_user, make_game):
+    # Nach dem Commit sind alle Attribute abgelaufen; die Altwerte kennt nur die Datenbank
+    game = make_game(genre=None)
+    db.expire(game)
+    game.genre = unique("Genre")
+    db.commit()
+    _assert_no_drift(db)
+    db.expire(game)
+    game.is_published = False
+    db.commit()
+    _assert_no_drift(db)
+    db.expire(game)
+    game.developer_id = make_user(is_developer=True).id
+    db.commit()
+    _assert_no_drift(db)
+
+
+def test_developer_flag_on_expired_user(db, make_user):
+    user = make_user(is_developer=True)
+    db.expire(user)
+    user.is_developer = True
+    db.commit()
+    _assert_no_drift(db)
+    db.expire(user)
+    user.is_developer = False
+    db.commit()
+    _assert_no_drift(db)
+
+
+def test_reconcile_repairs_bulk_updates(db, make_game):
+    game = make_game(genre=unique("Genre"))
+    db.query(models.Game).filter(models.Game.id == game.id).update({models.Game.is_published: False})
+    db.commit()
+    assert library_stats.reconcile(db) >= 1
+    _assert_no_drift(db)
+
+
+def test_overview_etag_comes_from_counters(client, make_game, monkeypatch):
+    async def no_fingerprint(db):
+        raise AssertionError("Fingerabdruck-Abfrage nicht erwartet")
+
+    monkeypatch.setattr(async_crud, "get_catalog_fingerprint", no_fingerprint)
+    response = client.get("/library/stats/overview")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert client.get("/library/stats/overview", headers={"If-None-Match": etag}).status_code == 304
+    genre = unique("Genre")
+    make_game(genre=genre)
+    changed = client.get("/library/stats/overview", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["genre_distribution"][genre] == 1
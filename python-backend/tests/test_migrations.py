@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _indexes(engine, table: str) -> set:
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_upgrade_applies_all_migrations_once(fresh_engine):
+    applied = migrations.upgrade(fresh_engine)
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(fresh_engine) == []
+    assert all(done for _, _, done in migrations.status(fresh_engine))
+
+
+def test_hot_path_indexes_exist(fresh_engine):
+    migrations.upgrade(fresh_engine)
+    assert {"ix_games_published_release", "ix_games_developer_created", "ix_games_browse_facets"} <= _indexes(fresh_engine, "games")
+    assert "ix_wishlist_game_id" in _indexes(fresh_engine, "wishlist")
+
+
+def test_legacy_games_table_gets_new_columns_and_backfill(fresh_engine):
+    with fresh_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE games (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, description TEXT, genre VARCHAR, "
+            "platform VARCHAR, price FLOAT, is_free BOOLEAN, image_url VARCHAR, release_date DATETIME, "
+            "created_at DATETIME, updated_at DATETIME, developer_id INTEGER NOT NULL, is_published BOOLEAN, "
+            "download_url VARCHAR, screenshot_urls VARCHAR, tags VARCHAR)"
+        ))
+        conn.execute(text(
+            "INSERT INTO games (id, title, developer_id, is_published, release_date, tags) "
+            "VALUES (1, 'Legacy', 1, 1, '2020-01-01 00:00:00.000000', 'Retro, Pixel')"
+        ))
+    migrations.upgrade(fresh_engine)
+    with fresh_engine.connect() as conn:
+        row = conn.execute(text("SELECT version, usk_rating, created_at FROM games WHERE id = 1")).one()
+        tags = conn.execute(text(
+            "SELECT t.name FROM game_tags g JOIN tags t ON t.id = g.tag_id WHERE g.game_id = 1 ORDER BY t.name"
+        )).scalars().all()
+    assert row.version == "1.0.0" and row.usk_rating == "USK 6"
+    assert row.created_at is not None
+    assert tags == ["pixel", "retro"]
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import unique
+from pagination import DATE_CURSOR, SCORE_CURSOR, InvalidCursor, decode_cursor, encode_cursor, next_cursor
+
+
+def _walk(client, url: str, headers: dict = None) -> list:
+    """Alle Seiten über X-Next-Cursor abrufen"""
+    pages, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200
+        pages.append([game["id"] for game in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_cursor_round_trip():
+    stamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(stamp, 42), DATE_CURSOR) == (stamp, 42)
+    assert decode_cursor(None, DATE_CURSOR) is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "W10", "bnVsbA"])
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, DATE_CURSOR)
+
+
+def test_next_cursor_only_for_full_pages():
+    class Row:
+        id, release_date = 7, datetime(2024, 1, 1)
+    assert next_cursor([Row()], 2, "release_date") is None
+    assert decode_cursor(next_cursor([Row(), Row()], 2, "release_date"), DATE_CURSOR) == (Row.release_date, 7)
+
+
+def test_cursor_pages_cover_listing_without_overlap(client, make_game, catalog_mode):
+    genre = unique("Keyset")
+    base = datetime(2023, 1, 1)
+    games = [make_game(genre=genre, release_date=base + timedelta(days=day)) for day in (1, 2, 2, 3, 4)]
+    make_game(genre=genre, is_published=False)
+    pages = _walk(client, f"/library/?genre={genre}&limit=2")
+    ids = [game_id for page in pages for game_id in page]
+    expected = [game.id for game in sorted(games, key=lambda g: (g.release_date, g.id), reverse=True)]
+    assert ids == expected
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+def test_null_cursor_round_trip():
+    assert decode_cursor(encode_cursor(None, 9), DATE_CURSOR) == (None, 9)
+
+
+def _without(db, column: str, games: list) -> list:
+    """Sortierspalte nachträglich leeren (das Model setzt beim Anlegen einen Default)"""
+    games = [db.merge(game) for game in games]
+    for game in games:
+        setattr(game, column, None)
+    db.commit()
+    return games
+
+
+def test_games_without_release_date_are_paged_last(client, db, make_game, catalog_mode):
+    genre = unique("Undatiert")
+    dated = [make_game(genre=genre, release_date=datetime(2023, 1, day)) for day in (1, 2)]
+    undated = _without(db, "release_date", [make_game(genre=genre) for _ in range(3)])
+    pages = _walk(client, f"/library/?genre={genre}&limit=2")
+    assert [game_id for page in pages for game_id in page] == \
+        [game.id for game in reversed(dated)] + [game.id for game in reversed(undated)]
+
+
+def test_developer_listing_with_null_created_at(client, db, make_user, make_game, auth_headers):
+    developer = make_user(is_developer=True)
+    dated = make_game(developer, created_at=datetime(2022, 1, 1))
+    undated = _without(db, "created_at", [make_game(developer) for _ in range(2)])
+    pages = _walk(client, "/library/developer/games?limit=1", auth_headers(developer))
+    assert [game_id for page in pages for game_id in page] == [dated.id, undated[1].id, undated[0].id]
+
+
+def test_total_count_header(client, make_game, catalog_mode):
+    genre = unique("Counted")
+    for _ in range(3):
+        make_game(genre=genre)
+    response = client.get(f"/library/?genre={genre}&limit=1")
+    assert response.headers["X-Total-Count"] == "3"
+
+
+def test_developer_listing_pages_by_created_at(client, make_user, make_game, auth_headers):
+    developer = make_user(is_developer=True)
+    base = datetime(2022, 6, 1)
+    games = [make_game(developer, created_at=base + timedelta(hours=hour), is_published=hour % 2 == 0)
+             for hour in range(5)]
+    pages = _walk(client, "/library/developer/games?limit=2", auth_headers(developer))
+    assert [game_id for page in pages for game_id in page] == [game.id for game in reversed(games)]
+
+
+def test_invalid_cursor_returns_400(client):
+    response = client.get("/library/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def _legacy_cursor(sort_value, row_id) -> str:
+    import base64, json
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode().rstrip("=")
+
+
+def test_score_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1.5, 10), SCORE_CURSOR) == (1.5, 10)
+
+
+def test_cursor_of_other_kind_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(1.5, 10), DATE_CURSOR)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(datetime(2024, 1, 1), 10), SCORE_CURSOR)
+
+
+def test_legacy_cursor_kind_is_inferred():
+    assert decode_cursor(_legacy_cursor("2024-01-01T00:00:00", 3), DATE_CURSOR) == (datetime(2024, 1, 1), 3)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_legacy_cursor(1.5, 10), DATE_CURSOR)
+
+
+@pytest.mark.parametrize("path", ["/library/?", "/library/browse?"])
+def test_score_cursor_on_date_listing_returns_400(client, catalog_mode, path):
+    response = client.get(f"{path}cursor={encode_cursor(1.5, 10)}")
+    assert response.status_code == 400
+
+
+def test_date_cursor_on_ranked_search_returns_400(client, make_game):
+    word = unique("zyklop")
+    make_game(title=f"{word} Abenteuer")
+    cursor = encode_cursor(datetime(2024, 1, 1), 10)
+    assert client.get(f"/library/?search={word}&cursor={cursor}").status_code == 400
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import security
+from password_pool import PasswordHashPool, PasswordPoolFull, password_pool
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_run_on_pool():
+    pool = PasswordHashPool(workers=2, queue_limit=2)
+    hashed = await pool.get_password_hash("secret")
+    assert await pool.verify_password("secret", hashed) is True
+    assert await pool.verify_password("wrong", hashed) is False
+    assert pool.stats()["completed"] == 3
+
+
+def test_full_pool_rejects_immediately():
+    pool = PasswordHashPool(workers=1, queue_limit=0)
+    release = threading.Event()
+    running = pool._submit(release.wait)
+    try:
+        with pytest.raises(PasswordPoolFull):
+            pool._submit(security.verify_password, "secret", "hash")
+        assert pool.rejected == 1
+    finally:
+        release.set()
+        running.result(timeout=5)
+    # Nach Abschluss ist wieder Platz
+    assert pool._submit(lambda: True).result(timeout=5) is True
+
+
+def test_login_returns_503_with_retry_after_when_pool_is_full(client, make_user, monkeypatch):
+    user = make_user(password="secret")
+
+    def full(*args):
+        raise PasswordPoolFull(retry_after=7)
+
+    monkeypatch.setattr(password_pool, "_submit", full)
+    response = client.post("/login-json", json={"username": user.username, "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import unique
+from projections import FIELD_SETS, InvalidFields, parse_fields
+
+
+def test_parse_fields_keeps_schema_order_and_adds_id():
+    assert parse_fields(None) is None
+    assert parse_fields(" ") is None
+    assert parse_fields("price, title") == ("id", "title", "price")
+    assert parse_fields("card") == FIELD_SETS["card"]
+    with pytest.raises(InvalidFields):
+        parse_fields("title,hashed_password")
+
+
+def test_unknown_field_returns_400(client):
+    response = client.get("/games/?fields=title,secret")
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+
+
+def test_projection_matches_full_response(client, make_game):
+    make_game(title=unique("Projektion "), price=9.99, is_free=False)
+    full = {game["id"]: game for game in client.get("/games/").json()}
+    projected = client.get("/games/?fields=title,price,developer").json()
+    assert len(projected) == len(full)
+    for row in projected:
+        assert set(row) == {"id", "title", "price", "developer"}
+        game = full[row["id"]]
+        assert (row["title"], row["price"]) == (game["title"], game["price"])
+        assert row["developer"] == {"id": game["developer"]["id"], "username": game["developer"]["username"]}
+
+
+def test_developer_listing_projection_pages_by_cursor(client, make_user, make_game, auth_headers):
+    developer = make_user(is_developer=True)
+    ids = {make_game(developer=developer).id for _ in range(3)}
+    headers = auth_headers(developer)
+    first = client.get("/library/developer/games?fields=card&limit=2", headers=headers)
+    assert first.status_code == 200
+    assert set(first.json()[0]) == set(FIELD_SETS["card"])
+    rest = client.get(f"/library/developer/games?fields=card&limit=2&cursor={first.headers['X-Next-Cursor']}",
+                      headers=headers)
+    assert {game["id"] for game in first.json() + rest.json()} == ids
+
+
+def test_admin_projection_requires_admin(client, make_user, auth_headers):
+    assert client.get("/admin/games/?fields=card", headers=auth_headers(make_user())).status_code == 403
+    response = client.get("/admin/games/?fields=title", headers=auth_headers(make_user(is_admin=True)))
+    assert response.status_code == 200
+    assert all(set(game) == {"id", "title"} for game in response.json())
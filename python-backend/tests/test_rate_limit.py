@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+from conftest import unique
+from rate_limit import LoginRateLimited, LoginRateLimiter, MemoryRateLimitBackend, SqlRateLimitBackend
+
+
+@pytest.fixture(params=["memory", "sql"])
+def backend(request):
+    return MemoryRateLimitBackend() if request.param == "memory" else SqlRateLimitBackend()
+
+
+def test_user_is_blocked_after_max_failures(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=300, max_per_user=3, max_per_ip=100)
+    username = unique("victim")
+    for _ in range(3):
+        limiter.begin(username, "10.0.0.1")
+    with pytest.raises(LoginRateLimited) as blocked:
+        limiter.begin(username, "10.0.0.2")
+    assert 1 <= blocked.value.retry_after <= 300
+    # Andere Benutzer von derselben IP sind nicht betroffen
+    limiter.begin(unique("other"), "10.0.0.1")
+
+
+def test_ip_is_blocked_across_usernames(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=300, max_per_user=100, max_per_ip=3)
+    ip = unique("10.1.0.")
+    for _ in range(3):
+        limiter.begin(unique("stuffing"), ip)
+    with pytest.raises(LoginRateLimited):
+        limiter.begin(unique("stuffing"), ip)
+
+
+def test_success_resets_username_and_is_not_counted_for_ip(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=300, max_per_user=2, max_per_ip=2)
+    username, ip = unique("user"), unique("10.2.0.")
+    limiter.begin(username, ip)
+    limiter.record_success(limiter.begin(username, None))
+    # Ein erfolgreicher Login belegt keinen IP-Versuch
+    limiter.record_success(limiter.begin(username, ip))
+    limiter.begin(unique("user"), ip)
+    with pytest.raises(LoginRateLimited):
+        limiter.begin(None, ip)
+
+
+def test_rejected_attempts_do_not_extend_the_block(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=300, max_per_user=1, max_per_ip=100)
+    username = unique("retry")
+    limiter.begin(username, None)
+    for _ in range(3):
+        with pytest.raises(LoginRateLimited):
+            limiter.begin(username, None)
+    window = int(time.time() // 300)
+    assert backend.get_counts(f"user:{username}", (window - 1, window))[1] == 1
+
+
+def test_concurrent_burst_cannot_exceed_limit(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=300, max_per_user=5, max_per_ip=100)
+    username = unique("burst")
+
+    def attempt(_):
+        try:
+            limiter.begin(username, None)
+            return True
+        except LoginRateLimited:
+            return False
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(attempt, range(40)))
+    assert sum(results) == 5
+
+
+def test_previous_window_is_weighted_by_remaining_time(backend):
+    limiter = LoginRateLimiter(backend, window_seconds=100, max_per_user=10, max_per_ip=10)
+    key = f"user:{unique('sliding')}"
+    backend.increment(key, 9)
+    backend.increment(key, 9)
+    assert backend.increment(key, 10) == 1
+    # 25 % des aktuellen Fensters vergangen: 2 * 0.75 + 1
+    assert limiter._estimate(key, 1025.0) == pytest.approx(2.5)
+
+
+def test_login_returns_429_after_repeated_failures(client, make_user, monkeypatch):
+    monkeypatch.setattr(main, "login_rate_limiter",
+                        LoginRateLimiter(MemoryRateLimitBackend(), max_per_user=2, max_per_ip=100))
+    user = make_user(password="secret")
+    for _ in range(2):
+        response = client.post("/login-json", json={"username": user.username, "password": "wrong"})
+        assert response.status_code == 401
+    response = client.post("/login-json", json={"username": user.username, "password": "secret"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
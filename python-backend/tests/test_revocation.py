@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timedelta
+
+import models
+from revocation import BloomFilter, RevocationStore
+
+
+def _jti() -> str:
+    return uuid.uuid4().hex
+
+
+def _later() -> datetime:
+    return datetime.utcnow() + timedelta(minutes=30)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [_jti() for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(_jti() in bloom for _ in range(2000))
+    assert false_positives < 100
+
+
+def test_revoked_token_is_confirmed_by_database(db):
+    store = RevocationStore(capacity=1000)
+    jti = _jti()
+    store.revoke(db, jti, _later())
+    assert store.is_revoked(db, jti) is True
+    assert store.is_revoked(db, _jti()) is False
+    assert store.is_revoked(db, None) is False
+    assert store.confirmed == 1
+
+
+def test_revoke_during_rebuild_reaches_new_filter(db):
+    store = RevocationStore(capacity=1000, refresh_seconds=3600)
+    store.rebuild()
+    jti = _jti()
+    build = store._build
+
+    def build_after_concurrent_revoke(jtis):
+        # revoke() nach dem Lesen der Tabelle, vor dem Austausch des Filters
+        store.revoke(db, jti, _later())
+        return build(jtis)
+
+    store._build = build_after_concurrent_revoke
+    store.rebuild()
+    assert jti in store._filter
+    assert store.is_revoked(db, jti) is True
+
+
+def test_rebuild_skips_expired_and_sweep_deletes_them(db):
+    store = RevocationStore(capacity=1000)
+    expired, valid = _jti(), _jti()
+    db.add(models.RevokedToken(jti=expired, expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.add(models.RevokedToken(jti=valid, expires_at=_later()))
+    db.commit()
+    store.rebuild()
+    assert valid in store._filter
+    assert db.get(models.RevokedToken, expired) is not None
+    assert store.sweep_expired(db) >= 1
+    db.expire_all()
+    assert db.get(models.RevokedToken, expired) is None
+    assert db.get(models.RevokedToken, valid) is not None
+
+
+def test_logged_out_token_is_rejected(client, make_user, auth_headers):
+    headers = auth_headers(make_user())
+    assert client.get("/users/me/", headers=headers).status_code == 200
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.get("/users/me/", headers=headers).status_code == 401
@@ -0,0 +1,61 @@
+import pytest
+
+import search_index
+from conftest import unique
+
+
+def _titles(response) -> list:
+    assert response.status_code == 200
+    return [game["title"] for game in response.json()]
+
+
+def test_tokenize_folds_umlauts_and_stems():
+    assert search_index.tokenize("Größere Abenteuer!") == ["groesser", "abenteu"]
+    assert search_index.normalize("Straßen") == search_index.normalize("strassen")
+    assert search_index.tokenize(None) == []
+
+
+@pytest.mark.skipif(not search_index.ENABLED, reason="SQLite ohne FTS5")
+def test_title_hits_rank_above_description_hits(client, make_game):
+    word = unique("quasar")
+    in_description = make_game(description=f"Am Ende wartet ein {word}")
+    in_title = make_game(title=f"{word} Legenden")
+    titles = _titles(client.get(f"/library/?search={word}"))
+    assert titles == [in_title.title, in_description.title]
+
+
+@pytest.mark.skipif(not search_index.ENABLED, reason="SQLite ohne FTS5")
+def test_search_matches_inflected_forms_and_skips_drafts(client, make_game):
+    word = unique("drach")
+    published = make_game(title=f"Die {word}en von Übersee")
+    make_game(title=f"{word}en Entwurf", is_published=False)
+    assert _titles(client.get(f"/library/?search={word}e uebersee")) == [published.title]
+
+
+@pytest.mark.skipif(not search_index.ENABLED, reason="SQLite ohne FTS5")
+def test_index_follows_updates_and_deletes(db, client, make_game):
+    old, new = unique("alt"), unique("neu")
+    game = make_game(title=f"{old} Spiel")
+    game.title = f"{new} Spiel"
+    db.merge(game)
+    db.commit()
+    assert _titles(client.get(f"/library/?search={old}")) == []
+    assert _titles(client.get(f"/library/?search={new}")) == [game.title]
+    db.delete(db.merge(game))
+    db.commit()
+    assert _titles(client.get(f"/library/?search={new}")) == []
+
+
+@pytest.mark.skipif(not search_index.ENABLED, reason="SQLite ohne FTS5")
+def test_ranked_search_pages_by_cursor_without_gaps(client, make_game):
+    word = unique("nebel")
+    expected = {make_game(title=f"{word} Teil {n}").title for n in range(5)}
+    seen, cursor = [], None
+    while True:
+        url = f"/library/?search={word}&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        seen += _titles(response)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) and set(seen) == expected
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+import auth
+import models
+import security
+
+
+@pytest.fixture
+def context(monkeypatch):
+    """Eigene Kopie von pwd_context, damit Kalibrierungen andere Tests nicht beeinflussen"""
+    monkeypatch.setattr(security, "pwd_context", security.pwd_context.copy())
+    monkeypatch.setattr(security, "BCRYPT_MIN_ROUNDS", 4)
+    monkeypatch.setattr(security, "BCRYPT_MAX_ROUNDS", 6)
+    return security.pwd_context
+
+
+def _hash(rounds: int, password: str = "secret") -> str:
+    return security.pwd_context.handler("bcrypt").using(rounds=rounds).hash(password)
+
+
+def test_bcrypt_rounds_parses_cost():
+    assert security.bcrypt_rounds(_hash(5)) == 5
+    assert security.bcrypt_rounds("simple_hash_secret") is None
+    assert security.bcrypt_rounds("") is None
+
+
+def test_calibration_stays_within_bounds(context):
+    assert security.calibrate_bcrypt_rounds(budget_ms=0.0001) == 4
+    assert security.calibrate_bcrypt_rounds(budget_ms=10 ** 9) == 6
+    assert security.current_bcrypt_rounds() == 6
+
+
+def test_calibration_never_flags_stronger_hashes(context):
+    context.update(bcrypt__default_rounds=6, bcrypt__min_rounds=6)
+    strong = _hash(6)
+    assert security.calibrate_bcrypt_rounds(budget_ms=0.0001) == 4
+    assert security.needs_rehash(strong) is False
+    assert security.needs_rehash(_hash(4)) is False
+
+
+def test_weaker_and_simple_hashes_need_rehash(context):
+    context.update(bcrypt__default_rounds=5, bcrypt__min_rounds=5)
+    assert security.needs_rehash(_hash(4)) is True
+    assert security.needs_rehash("simple_hash_secret") is True
+
+
+def test_rehash_never_stores_lower_cost(context, db, make_user):
+    strong = _hash(6)
+    user = make_user()
+    user.hashed_password = strong
+    db.commit()
+    context.update(bcrypt__default_rounds=4, bcrypt__min_rounds=4)
+    asyncio.run(auth.rehash_password(user.id, strong, "secret"))
+    db.expire_all()
+    assert db.get(models.User, user.id).hashed_password == strong
+
+
+def test_login_upgrades_simple_hash(client, db, make_user):
+    user = make_user(password="secret")
+    response = client.post("/login-json", json={"username": user.username, "password": "secret"})
+    assert response.status_code == 200
+    db.expire_all()
+    stored = db.get(models.User, user.id).hashed_password
+    assert stored.startswith("$2b$")
+    assert security.verify_password("secret", stored)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+import session_store
+from session_store import InvalidRefreshToken
+
+
+def _login(client, user) -> dict:
+    response = client.post("/login-json", json={"username": user.username, "password": "secret"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_refresh_rotates_token(client, make_user):
+    tokens = _login(client, make_user())
+    response = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/users/me/", headers={"Authorization": f"Bearer {rotated['access_token']}"}).status_code == 200
+
+
+def test_reuse_of_rotated_token_revokes_family(client, make_user):
+    first = _login(client, make_user())["refresh_token"]
+    second = client.post("/token/refresh", json={"refresh_token": first}).json()["refresh_token"]
+    assert client.post("/token/refresh", json={"refresh_token": first}).status_code == 401
+    # Auch das zuletzt ausgestellte Token der Familie ist gesperrt
+    assert client.post("/token/refresh", json={"refresh_token": second}).status_code == 401
+
+
+def test_other_families_survive_reuse_detection(db, make_user):
+    user = make_user()
+    stolen = session_store.create_refresh_session(db, user.id)
+    other = session_store.create_refresh_session(db, user.id)
+    session_store.rotate_refresh_session(db, stolen)
+    with pytest.raises(InvalidRefreshToken):
+        session_store.rotate_refresh_session(db, stolen)
+    rotated_user, _ = session_store.rotate_refresh_session(db, other)
+    assert rotated_user.id == user.id
+
+
+def test_unknown_and_expired_tokens_are_rejected(db, make_user):
+    with pytest.raises(InvalidRefreshToken):
+        session_store.rotate_refresh_session(db, "unknown")
+    raw = session_store.create_refresh_session(db, make_user().id)
+    db.query(models.RefreshSession).filter(
+        models.RefreshSession.token_hash == session_store._hash_token(raw)
+    ).update({models.RefreshSession.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    with pytest.raises(InvalidRefreshToken):
+        session_store.rotate_refresh_session(db, raw)
+
+
+def test_logout_revokes_refresh_family(client, make_user):
+    tokens = _login(client, make_user())
+    response = client.post("/logout", json={"refresh_token": tokens["refresh_token"]},
+                           headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 200
+    assert client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_sweep_deletes_only_expired_sessions(db, make_user):
+    user = make_user()
+    expired = session_store.create_refresh_session(db, user.id)
+    valid = session_store.create_refresh_session(db, user.id)
+    db.query(models.RefreshSession).filter(
+        models.RefreshSession.token_hash == session_store._hash_token(expired)
+    ).update({models.RefreshSession.expires_at: datetime.utcnow() - timedelta(days=1)})
+    db.commit()
+    assert session_store.sweep_expired_sessions(db, batch_size=1) >= 1
+    hashes = {row.token_hash for row in db.query(models.RefreshSession.token_hash)}
+    assert session_store._hash_token(expired) not in hashes
+    assert session_store._hash_token(valid) in hashes
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import main
+import sql_instrumentation
+from database import engine
+from sql_instrumentation import RequestQueryStats, SqlMetrics, begin_request, statement_shape
+
+
+@pytest.fixture
+def request_stats():
+    sql_instrumentation.install()
+    stats = begin_request()
+    yield stats
+    sql_instrumentation._current.set(None)
+
+
+def test_statement_shape_hides_literals():
+    assert statement_shape("SELECT * FROM games WHERE id = 12 AND title = 'x'  AND id IN (1, 2, 3)") == \
+        "SELECT * FROM games WHERE id = ? AND title = ? AND id IN (?)"
+
+
+def test_repeated_statements_are_n_plus_one_suspects():
+    stats = RequestQueryStats()
+    stats.shapes["SELECT users WHERE id = ?"] = 7
+    stats.shapes["SELECT games"] = 1
+    assert stats.n_plus_one_suspects(threshold=5) == [("SELECT users WHERE id = ?", 7)]
+    metrics = SqlMetrics()
+    metrics.record_request("/library/", stats)
+    assert metrics.stats()["n_plus_one_requests"] == 1
+
+
+def test_statements_are_counted_per_request(request_stats):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert request_stats.count == 2
+    assert request_stats.shapes["SELECT ?"] == 2
+
+
+def test_failed_statement_does_not_leave_start_time(request_stats):
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert not conn.info.get("query_start")
+        conn.execute(text("SELECT 1"))
+        assert not conn.info.get("query_start")
+    assert request_stats.count == 2
+
+
+def _instrumented_client() -> TestClient:
+    sql_instrumentation.install()
+    app = FastAPI()
+    app.middleware("http")(main.instrument_sql)
+
+    @app.get("/ping")
+    def ping():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {}
+
+    return TestClient(app)
+
+
+def test_instrumentation_is_opt_in(client):
+    assert sql_instrumentation.SQL_INSTRUMENTATION is False
+    assert "Server-Timing" not in client.get("/library/stats/overview").headers
+
+
+def test_server_timing_only_in_debug_mode(monkeypatch):
+    client = _instrumented_client()
+    requests = sql_instrumentation.sql_metrics.requests
+    assert "Server-Timing" not in client.get("/ping").headers
+    assert sql_instrumentation.sql_metrics.requests == requests + 1
+    monkeypatch.setattr(sql_instrumentation, "SQL_SERVER_TIMING", True)
+    assert "1 queries" in client.get("/ping").headers["Server-Timing"]
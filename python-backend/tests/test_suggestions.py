@@ -0,0 +1,136 @@
+import random
+
+import pytest
+
+import library_api
+import suggestions
+from catalog import published_catalog
+from conftest import unique
+from suggestions import MAX_SUGGESTIONS, SuggestionIndex, suggestion_index
+
+_WORDS = ["the", "thief", "theme", "tower", "dark", "dawn", "dust", "a", "ab", "abyss"]
+
+
+class _Game:
+    """Katalog-Eintrag mit den Feldern, die der Index liest"""
+
+    def __init__(self, game_id: int, rng: random.Random):
+        self.id = game_id
+        self.title = " ".join(rng.choices(_WORDS, k=rng.randint(1, 3))).title()
+        self.tag_set = frozenset(rng.sample(["koop", "korsar", "krimi", "dark"], 2))
+        self.developer_id = 10 ** 6 + game_id % 5
+        self.developer_name = f"Thor {game_id % 5}"
+
+
+class _Snapshot:
+    def __init__(self, version: int, games: dict, changed=None):
+        self.version, self.by_id, self.changed = version, games, changed
+
+
+def _prefixes(index: SuggestionIndex) -> set:
+    # Anfragen werden wie die Schlüssel normalisiert (u.a. ohne Leerzeichen am Ende)
+    return {suggestions.fold(key[:length])
+            for key, _, _ in index._lists.entries for length in range(1, len(key) + 1)}
+
+
+def _assert_matches_scan(index: SuggestionIndex):
+    for prefix in _prefixes(index):
+        expected = [(kind, ref) for _, kind, ref in index._lists.scan(prefix, index._lists.size)]
+        actual = [(item["type"], item["game_id"] or item["developer_id"] or item["label"])
+                  for item in index.suggest(prefix, index._lists.size)]
+        assert actual == expected, prefix
+
+
+@pytest.fixture
+def index(monkeypatch):
+    # Kleine Grenzen, damit auch verfeinerte lange Präfixe und volle Listen vorkommen
+    index = SuggestionIndex(popularity_seconds=0, prefix_length=1, top_size=3, scan_limit=8)
+    monkeypatch.setattr(index, "refresh_popularity", lambda: None)
+    return index
+
+
+def test_precomputed_lists_stay_exact_under_changes(index, monkeypatch):
+    rng = random.Random(7)
+    games = {game_id: _Game(game_id, rng) for game_id in range(1, 61)}
+    index._popularity = {game_id: rng.randint(0, 5) for game_id in games}
+    index.sync(_Snapshot(1, dict(games)))
+    assert any(len(prefix) > 1 for prefix in index._lists.top)
+    _assert_matches_scan(index)
+    for version in range(2, 40):
+        changed = set(rng.sample(sorted(games), 3))
+        for game_id in changed:
+            if rng.random() < 0.3:
+                games.pop(game_id)
+            else:
+                games[game_id] = _Game(game_id, rng)
+                index._popularity[game_id] = rng.randint(0, 9)
+        index.sync(_Snapshot(version, dict(games), frozenset(changed)))
+        _assert_matches_scan(index)
+
+
+def test_popularity_orders_suggestions(index):
+    rng = random.Random(1)
+    games = {1: _Game(1, rng), 2: _Game(2, rng)}
+    games[1].title, games[2].title = "Dust Devil", "Dust Storm"
+    index._popularity = {2: 5}
+    index.sync(_Snapshot(1, games))
+    assert [item["label"] for item in index.suggest("dust", 2)] == ["Dust Storm", "Dust Devil"]
+    assert [item["label"] for item in index.suggest("storm", 2)] == ["Dust Storm"]
+    assert index.suggest("  ", 2) == []
+
+
+def test_older_snapshots_are_ignored(index):
+    rng = random.Random(3)
+    games = {1: _Game(1, rng)}
+    index.sync(_Snapshot(2, dict(games)))
+    index.sync(_Snapshot(1, {}))
+    assert index.stats()["catalog_version"] == 2 and index.stats()["entries"] > 0
+
+
+class _Catalog:
+    def __init__(self, snapshot):
+        self.snapshot, self.calls = snapshot, 0
+
+    def current(self):
+        self.calls += 1
+        return self.snapshot
+
+
+def test_follow_only_updates_a_built_index(index):
+    rng = random.Random(5)
+    index._catalog = catalog = _Catalog(_Snapshot(1, {1: _Game(1, rng)}))
+    index.follow(_Snapshot(2, {2: _Game(2, rng)}))
+    assert not index.ready and index.suggest("t") == [] and catalog.calls == 0
+    index.build()
+    assert index.ready and index.stats()["catalog_version"] == 1
+    index.follow(_Snapshot(2, {1: catalog.snapshot.by_id[1], 2: _Game(2, rng)}, frozenset({2})))
+    assert index.stats()["catalog_version"] == 2 and 2 in index._games
+
+
+def test_suggest_endpoint(client, make_game):
+    # Aufbau wie im Startup-Job; danach führt der Commit-Hook den Index nach
+    suggestion_index.build()
+    word = unique("kobold")
+    game = make_game(title=f"{word} Jagd", tags=f"{word}-tag")
+    response = client.get(f"/library/suggest?q={word.upper()}")
+    assert response.status_code == 200
+    labels = {(item["type"], item["label"]) for item in response.json()}
+    assert ("game", game.title) in labels and ("tag", f"{word}-tag") in labels
+    assert client.get(f"/library/suggest?q={word}&limit={MAX_SUGGESTIONS + 1}").status_code == 422
+
+
+def test_suggest_requires_catalog(client, monkeypatch):
+    monkeypatch.setattr(library_api, "CATALOG_ENABLED", False)
+    assert client.get("/library/suggest?q=a").status_code == 503
+
+
+def test_suggest_never_builds_on_the_request_path(client, monkeypatch):
+    monkeypatch.setattr(library_api, "suggestion_index", SuggestionIndex(popularity_seconds=0))
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError("Katalog im Request gelesen")
+
+    monkeypatch.setattr(published_catalog, "current", forbidden)
+    response = client.get("/library/suggest?q=a")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
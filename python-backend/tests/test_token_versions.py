@@ -0,0 +1,84 @@
+import os
+
+from jose import jwt
+
+import admin_manager
+import auth
+import token_versions
+from auth_cache import principal_cache
+from security import ALGORITHM, SECRET_KEY, identity_claims
+
+
+def _claims_token(db, user, monkeypatch) -> dict:
+    monkeypatch.setattr(auth, "TOKEN_IDENTITY_CLAIMS", True)
+    return {"Authorization": f"Bearer {auth.create_user_access_token(db, user)}"}
+
+
+def test_identity_claims_carry_roles_but_no_secrets(make_user):
+    user = make_user(is_developer=True)
+    claims = identity_claims(user, 3)
+    assert claims["uid"] == user.id and claims["dev"] is True and claims["ver"] == 3
+    assert not any("password" in key or "hash" in key for key in claims)
+    # Keine Profildaten im Token
+    assert "email" not in claims and "avatar" not in claims
+
+
+def test_token_contains_current_version(db, make_user, monkeypatch):
+    user = make_user()
+    headers = _claims_token(db, user, monkeypatch)
+    payload = jwt.decode(headers["Authorization"][7:], SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["ver"] == token_versions.get_version(db, user.id)
+
+
+def test_claims_token_authorizes_without_loading_user(client, db, make_user, monkeypatch):
+    user = make_user()
+    headers = _claims_token(db, user, monkeypatch)
+    monkeypatch.setattr(auth.crud, "get_user_by_username", lambda *args, **kwargs: None)
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == user.id
+
+
+def test_version_bump_invalidates_claims(client, db, make_user, auth_headers, monkeypatch):
+    user = make_user()
+    admin = make_user(is_admin=True)
+    headers = _claims_token(db, user, monkeypatch)
+    version = token_versions.get_version(db, user.id)
+    client.put(f"/admin/users/{user.id}/role", headers=auth_headers(admin), json={"is_developer": True})
+    assert token_versions.get_version(db, user.id) == version + 1
+    principal_cache.clear()
+    # Veraltete Claims (dev=False) gelten nicht mehr, der Benutzer wird aus der DB geladen
+    assert client.get("/users/me/", headers=headers).json()["is_developer"] is True
+
+
+def test_claims_principal_profile_is_loaded_from_database(client, db, make_user, monkeypatch):
+    user = make_user()
+    headers = _claims_token(db, user, monkeypatch)
+    response = client.get("/users/me/", headers=headers)
+    assert response.json()["email"] == user.email
+    # Eigene, unveränderte E-Mail gilt nicht als vergeben
+    response = client.put("/users/me/", headers=headers, json={"email": user.email})
+    assert response.status_code == 200
+
+
+def test_admin_claim_is_checked_against_database(client, db, make_user, monkeypatch):
+    admin = make_user(is_admin=True)
+    headers = _claims_token(db, admin, monkeypatch)
+    assert client.get("/metrics", headers=headers).status_code == 200
+    # Entzug direkt in der Datenbank (wie admin_manager), ohne Versionserhöhung
+    admin.is_admin = False
+    db.commit()
+    principal_cache.clear()
+    assert client.get("/metrics", headers=headers).status_code == 403
+
+
+def test_admin_manager_bumps_token_version(db, make_user, monkeypatch):
+    user = make_user(is_admin=True)
+    version = token_versions.get_version(db, user.id)
+    monkeypatch.setattr(admin_manager, "DB_PATH", os.path.abspath("test.db"))
+    monkeypatch.setattr("builtins.input", lambda prompt: "j")
+    monkeypatch.setattr(admin_manager.AdminManager, "log_action", lambda self, action: None)
+    with admin_manager.AdminManager() as manager:
+        assert manager.revoke_admin(str(user.id))
+    token_versions.forget(user.id)
+    assert token_versions.get_version(db, user.id) == version + 1
@@ -0,0 +1,84 @@
+import async_crud
+import wishlist_api
+
+
+def _add(client, headers, game_id: int):
+    return client.post(f"/wishlist/{game_id}", headers=headers)
+
+
+def test_add_check_and_remove(client, make_user, make_game, auth_headers):
+    headers = auth_headers(make_user())
+    game = make_game()
+    assert client.get(f"/wishlist/check/{game.id}", headers=headers).json()["in_wishlist"] is False
+    assert _add(client, headers, game.id).status_code == 200
+    assert _add(client, headers, game.id).status_code == 400
+    assert client.get(f"/wishlist/check/{game.id}", headers=headers).json()["in_wishlist"] is True
+    assert client.delete(f"/wishlist/{game.id}", headers=headers).status_code == 200
+    assert client.delete(f"/wishlist/{game.id}", headers=headers).status_code == 400
+    assert client.get(f"/wishlist/check/{game.id}", headers=headers).json()["in_wishlist"] is False
+
+
+def test_drafts_and_unknown_games_cannot_be_added(client, make_user, make_game, auth_headers):
+    headers = auth_headers(make_user())
+    assert _add(client, headers, make_game(is_published=False).id).status_code == 404
+    assert _add(client, headers, 10 ** 9).status_code == 404
+    assert client.get(f"/wishlist/check/{10 ** 9}", headers=headers).status_code == 404
+
+
+def test_bulk_check_keeps_order_and_is_per_user(client, make_user, make_game, auth_headers):
+    headers, other = auth_headers(make_user()), auth_headers(make_user())
+    first, second, third = make_game(), make_game(), make_game()
+    _add(client, headers, first.id)
+    _add(client, headers, third.id)
+    _add(client, other, second.id)
+    response = client.post("/wishlist/check", json={"game_ids": [third.id, second.id, third.id, first.id, 10 ** 9]},
+                           headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "game_ids": [third.id, second.id, first.id, 10 ** 9],
+        "in_wishlist": [True, False, True, False],
+    }
+    assert client.post("/wishlist/check", json={"game_ids": []}, headers=headers).json()["in_wishlist"] == []
+
+
+def test_bulk_check_limit(client, make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(wishlist_api, "WISHLIST_CHECK_MAX_IDS", 2)
+    headers = auth_headers(make_user())
+    assert client.post("/wishlist/check", json={"game_ids": [1, 2, 3]}, headers=headers).status_code == 400
+    # Duplikate zählen nicht gegen die Obergrenze
+    assert client.post("/wishlist/check", json={"game_ids": [1, 1, 2]}, headers=headers).status_code == 200
+
+
+def test_wishlist_requires_login(client):
+    assert client.post("/wishlist/check", json={"game_ids": [1]}).status_code == 401
+
+
+def test_stats_aggregate_matches_overview(client, make_user, make_game, auth_headers):
+    headers = auth_headers(make_user())
+    empty = client.get("/wishlist/stats", headers=headers).json()
+    assert empty == {"total_games": 0, "free_games": 0, "paid_games": 0, "total_value": 0.0}
+    for game in (make_game(is_free=True, price=0.0), make_game(is_free=False, price=19.99),
+                 make_game(is_free=False, price=5.01), make_game(is_free=False, price=None)):
+        _add(client, headers, game.id)
+    stats = client.get("/wishlist/stats", headers=headers).json()
+    assert stats == {"total_games": 4, "free_games": 1, "paid_games": 3, "total_value": 25.0}
+    overview = client.get("/wishlist/overview", headers=headers).json()
+    assert overview["stats"] == stats
+    assert len(overview["games"]) == 4
+
+
+
+def test_overview_stats_use_the_stats_aggregate(client, make_user, make_game, auth_headers, monkeypatch):
+    headers = auth_headers(make_user())
+    _add(client, headers, make_game(is_free=False, price=5.0).id)
+    stats = client.get("/wishlist/stats", headers=headers).json()
+    calls = []
+    get_wishlist_stats = async_crud.get_wishlist_stats
+
+    async def counted(db, user_id):
+        calls.append(user_id)
+        return await get_wishlist_stats(db, user_id)
+
+    monkeypatch.setattr(async_crud, "get_wishlist_stats", counted)
+    assert client.get("/wishlist/overview", headers=headers).json()["stats"] == stats
+    assert len(calls) == 1
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Token-Versionen für zustandslose Identitäts-Claims
+Jeder Benutzer hat eine Versionsnummer; Tokens mit älterer Version werden
+nicht mehr allein anhand ihrer Claims autorisiert, sondern gegen die Datenbank geprüft
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+
+# Wie lange eine gelesene Version als aktuell gilt (Obergrenze für Replikat-übergreifende Verzögerung)
+TOKEN_VERSION_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_TTL_SECONDS", "30"))
+
+_versions: Dict[int, Tuple[int, float]] = {}
+_lock = threading.Lock()
+
+
+def get_version(db: Session, user_id: int) -> int:
+    """Aktuelle Token-Version eines Benutzers (aus dem Prozess-Cache oder per Primärschlüssel)"""
+    now = time.monotonic()
+    with _lock:
+        cached = _versions.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    row = db.get(models.UserTokenVersion, user_id)
+    version = row.version if row else 0
+    remember(user_id, version)
+    return version
+
+
+def bump_version(db: Session, user_id: int) -> int:
+    """
+    Erhöht die Token-Version eines Benutzers innerhalb der laufenden Transaktion
+
+    Der Aufrufer committet; danach sollte ``remember`` mit dem Rückgabewert
+    aufgerufen werden, damit dieser Prozess die neue Version sofort kennt.
+    """
+    row = db.get(models.UserTokenVersion, user_id)
+    if row is None:
+        row = models.UserTokenVersion(user_id=user_id, version=0)
+        db.add(row)
+    row.version = (row.version or 0) + 1
+    return row.version
+
+
+def remember(user_id: int, version: int):
+    with _lock:
+        _versions[user_id] = (version, time.monotonic() + TOKEN_VERSION_TTL_SECONDS)
+
+
+def forget(user_id: int):
+    with _lock:
+        _versions.pop(user_id, None)
@@ -4,18 +4,25 @@ Wunschliste API für Indie Game Platform
 Verwaltet Benutzer-Wunschlisten mit Spielen
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 import models
 import schemas
-from database import get_db
+from database import get_db, get_read_db
+import async_crud
+import game_crud
 from auth import get_current_user
+from conditional import is_not_modified, make_etag, not_modified, set_validators
 
 router = APIRouter(prefix="/wishlist", tags=["Wishlist"])
 
+WISHLIST_CHECK_MAX_IDS = int(os.getenv("WISHLIST_CHECK_MAX_IDS", "500"))
+
 # Einfaches Schema für Wunschliste-Spiele
 class WishlistGame(BaseModel):
     id: int
@@ -32,38 +39,103 @@ class WishlistGame(BaseModel):
     class Config:
         from_attributes = True
 
+class WishlistStats(BaseModel):
+    total_games: int
+    free_games: int
+    paid_games: int
+    total_value: float
+
+# Liste und Statistik in einer Antwort (GET /wishlist/overview)
+class WishlistOverview(BaseModel):
+    games: List[WishlistGame]
+    stats: WishlistStats
+
+# Spiel-IDs für die Sammelprüfung (POST /wishlist/check)
+class WishlistCheck(BaseModel):
+    game_ids: List[int]
+
 @router.get("/", response_model=List[WishlistGame])
-def get_user_wishlist(
+async def get_user_wishlist(
+    request: Request,
+    response: Response,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db = Depends(get_read_db)
 ):
     """
     Alle Spiele aus der Wunschliste des aktuellen Benutzers abrufen
+    (304 bei passendem If-None-Match)
     """
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Benutzer nicht gefunden"
-        )
+    # ETag aus Spiel-IDs, Änderungszeiten und Entwicklernamen
+    fingerprint = await async_crud.get_wishlist_fingerprint(db, current_user.id)
+    etag = make_etag("wishlist", current_user.id, fingerprint)
+    if is_not_modified(request, etag):
+        return not_modified(etag, private=True)
+    set_validators(response, etag, private=True)
     
-    # Konvertiere zu WishlistGame für bessere Kompatibilität
-    wishlist_games = []
-    for game in user.wishlist:
-        wishlist_games.append(WishlistGame(
-            id=game.id,
-            title=game.title,
-            genre=game.genre,
-            price=game.price,
-            is_free=game.is_free,
-            platform=game.platform,
-            description=game.description,
-            image_url=game.image_url,
-            download_url=game.download_url,
-            developer_name=game.developer.username if game.developer else "Unbekannt"
-        ))
+    # Eine Abfrage inkl. Entwickler statt Lazy Loading je Spiel
+    games = await async_crud.get_wishlist_games(db, current_user.id)
+    
+    return [_wishlist_game(game) for game in games]
+
+@router.get("/overview", response_model=WishlistOverview)
+async def get_wishlist_overview(
+    request: Request,
+    response: Response,
+    current_user: schemas.User = Depends(get_current_user),
+    db = Depends(get_read_db)
+):
+    """
+    Wunschliste und Statistik in einer Anfrage
+    Die Statistik stammt aus demselben SQL-Aggregat wie /wishlist/stats, damit beide
+    Endpunkte dieselben Zahlen liefern.
+    """
+    fingerprint = await async_crud.get_wishlist_fingerprint(db, current_user.id)
+    etag = make_etag("wishlist-overview", current_user.id, fingerprint)
+    if is_not_modified(request, etag):
+        return not_modified(etag, private=True)
+    set_validators(response, etag, private=True)
+    
+    games = await async_crud.get_wishlist_games(db, current_user.id)
+    stats = await async_crud.get_wishlist_stats(db, current_user.id)
+    return {"games": [_wishlist_game(game) for game in games], "stats": stats}
+
+def _wishlist_game(game: models.Game) -> WishlistGame:
+    """Konvertiere zu WishlistGame für bessere Kompatibilität"""
+    return WishlistGame(
+        id=game.id,
+        title=game.title,
+        genre=game.genre,
+        price=game.price,
+        is_free=game.is_free,
+        platform=game.platform,
+        description=game.description,
+        image_url=game.image_url,
+        download_url=game.download_url,
+        developer_name=game.developer.username if game.developer else "Unbekannt"
+    )
+
+@router.post("/check")
+async def check_many_in_wishlist(
+    check: WishlistCheck,
+    current_user: schemas.User = Depends(get_current_user),
+    db = Depends(get_read_db)
+):
+    """
+    Für mehrere Spiele prüfen, ob sie in der Wunschliste sind (eine Abfrage)
     
-    return wishlist_games
+    in_wishlist enthält je angefragter ID (gleiche Reihenfolge) true oder false.
+    """
+    game_ids = list(dict.fromkeys(check.game_ids))
+    if len(game_ids) > WISHLIST_CHECK_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximal {WISHLIST_CHECK_MAX_IDS} Spiel-IDs pro Abfrage"
+        )
+    members = await async_crud.get_wishlist_membership(db, current_user.id, game_ids) if game_ids else set()
+    return {
+        "game_ids": game_ids,
+        "in_wishlist": [game_id in members for game_id in game_ids]
+    }
 
 @router.post("/{game_id}")
 def add_to_wishlist(
@@ -75,7 +147,7 @@ def add_to_wishlist(
     Spiel zur Wunschliste hinzufügen
     """
     # Prüfe, ob das Spiel existiert und veröffentlicht ist
-    game = db.query(models.Game).filter(
+    game = db.query(models.Game.id, models.Game.title).filter(
         models.Game.id == game_id,
         models.Game.is_published == True
     ).first()
@@ -86,25 +158,13 @@ def add_to_wishlist(
             detail="Spiel nicht gefunden oder nicht veröffentlicht"
         )
     
-    # Lade den Benutzer mit Wunschliste
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Benutzer nicht gefunden"
-        )
-    
-    # Prüfe, ob das Spiel bereits in der Wunschliste ist
-    if game in user.wishlist:
+    # Eintrag direkt in der Zuordnungstabelle statt über user.wishlist (lädt sonst alle Spiele)
+    if not game_crud.add_to_wishlist(db, current_user.id, game_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Spiel ist bereits in der Wunschliste"
         )
     
-    # Füge das Spiel zur Wunschliste hinzu
-    user.wishlist.append(game)
-    db.commit()
-    
     return {"message": f"'{game.title}' wurde zur Wunschliste hinzugefügt"}
 
 @router.delete("/{game_id}")
@@ -116,32 +176,19 @@ def remove_from_wishlist(
     """
     Spiel aus der Wunschliste entfernen
     """
-    # Lade den Benutzer mit Wunschliste
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Benutzer nicht gefunden"
-        )
-    
-    # Prüfe, ob das Spiel in der Wunschliste ist
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = db.query(models.Game.id, models.Game.title).filter(models.Game.id == game_id).first()
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Spiel nicht gefunden"
         )
     
-    if game not in user.wishlist:
+    if not game_crud.remove_from_wishlist(db, current_user.id, game_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Spiel ist nicht in der Wunschliste"
         )
     
-    # Entferne das Spiel aus der Wunschliste
-    user.wishlist.remove(game)
-    db.commit()
-    
     return {"message": f"'{game.title}' wurde aus der Wunschliste entfernt"}
 
 @router.get("/check/{game_id}")
@@ -153,52 +200,26 @@ def check_in_wishlist(
     """
     Prüfe, ob ein Spiel in der Wunschliste ist
     """
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Benutzer nicht gefunden"
-        )
-    
-    game = db.query(models.Game).filter(models.Game.id == game_id).first()
+    game = db.query(models.Game.id, models.Game.title).filter(models.Game.id == game_id).first()
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Spiel nicht gefunden"
         )
     
-    is_in_wishlist = game in user.wishlist
-    
     return {
         "game_id": game_id,
         "game_title": game.title,
-        "in_wishlist": is_in_wishlist
+        "in_wishlist": game_crud.is_in_wishlist(db, current_user.id, game_id)
     }
 
-@router.get("/stats")
-def get_wishlist_stats(
+@router.get("/stats", response_model=WishlistStats)
+async def get_wishlist_stats(
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db = Depends(get_read_db)
 ):
     """
     Statistiken zur Wunschliste des Benutzers
+    (ein Aggregat in SQL statt alle Spiele als Objekte zu laden)
     """
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Benutzer nicht gefunden"
-        )
-    
-    wishlist_games = user.wishlist
-    total_games = len(wishlist_games)
-    free_games = sum(1 for game in wishlist_games if game.is_free)
-    paid_games = total_games - free_games
-    total_value = sum(game.price for game in wishlist_games if not game.is_free)
-    
-    return {
-        "total_games": total_games,
-        "free_games": free_games,
-        "paid_games": paid_games,
-        "total_value": round(total_value, 2)
-    }
\ No newline at end of file
+    return await async_crud.get_wishlist_stats(db, current_user.id)